@@ -1,5 +1,7 @@
-import numpy as np
-from scipy.stats import norm
+from bs_core import bs_price
+import bs_iv
+from sabr_hagan import hagan_vol
+from sabr_mc import sabr_mc_price
 
 # SABR model parameters
 F = 100     # Forward price
@@ -11,51 +13,27 @@ nu = 0.4
 rho = -0.3
 dt = 1/252   # Time step (daily)
 
-# Simulate the SABR process using Euler-Maruyama
-np.random.seed(42)  # For reproducibility
+# Simulate the SABR process: all paths at once, correlated drivers (see sabr_mc)
 n_steps = int(T / dt)  # Number of time steps
+n_paths = 200_000
 
-# Initialize forward price and volatility
-F_t = F
-sigma_t = alpha
-F_paths = []
-sigma_paths = []
-
-# Simulate paths for F and sigma
-for _ in range(n_steps):
-    dW1 = np.random.normal(0, np.sqrt(dt))
-    dW2 = np.random.normal(0, np.sqrt(dt))
-    
-    # Update forward price and volatility using Euler-Maruyama
-    F_t += sigma_t * F_t**beta * np.sqrt(dt) * dW1
-    sigma_t += nu * sigma_t * np.sqrt(dt) * dW2
-    
-    # Store the paths
-    F_paths.append(F_t)
-    sigma_paths.append(sigma_t)
-
-# Final values at maturity
-F_final = F_paths[-1]
-sigma_final = sigma_paths[-1]
-
-# Calculate the option price (European call)
-call_price = max(F_final - K, 0)
+# Price the European call from the simulated terminal forwards
+call_price, call_stderr = sabr_mc_price(F, K, T, alpha, beta, nu, rho, n_paths=n_paths,
+                                        n_steps=n_steps, antithetic=True, seed=42)
 
 # Black-Scholes formula to find implied volatility
 def black_scholes_call(F, K, T, sigma):
-    d1 = (np.log(F / K) + 0.5 * sigma**2 * T) / (sigma * np.sqrt(T))
-    d2 = d1 - sigma * np.sqrt(T)
-    return F * norm.cdf(d1) - K * norm.cdf(d2)
+    # Undiscounted Black-76 call: Black-Scholes on the forward with r = 0
+    return bs_price(F, K, T, 0.0, sigma, 'C')
 
 # Find implied volatility by solving Black-Scholes equation
 def implied_volatility(F, K, T, market_price):
-    # Use a numerical solver to find the implied volatility
-    from scipy.optimize import fmin
-    objective = lambda sigma: np.abs(black_scholes_call(F, K, T, sigma) - market_price)
-    return fmin(objective, 0.2)[0]
+    # Batch solver on the forward (r = 0); NaN if the price is outside the call bounds
+    return bs_iv.implied_vol(market_price, F, K, T, 0.0, 'C')[0]
 
 # Find implied volatility from the simulated call price
-implied_vol = implied_volatility(F_final, K, T, call_price)
+implied_vol = implied_volatility(F, K, T, call_price)
 
-print(f"Simulated Call Option Price: {call_price}")
+print(f"Simulated Call Option Price: {call_price:.4f} (std err {call_stderr:.4f})")
 print(f"Implied Volatility: {implied_vol}")
+print(f"Hagan Implied Volatility: {hagan_vol(F, K, T, alpha, beta, rho, nu)}")
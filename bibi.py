@@ -1,7 +1,9 @@
 import numpy as np
-import plotly.graph_objs as go
 import plotly.io as pio
 
+from sim_plots import fan_chart, save_figure
+from tbill_sim import simulate_tbills
+
 # Set your renderer (you can choose "browser" or "notebook" depending on your environment)
 pio.renderers.default = "browser"
 
@@ -13,40 +15,22 @@ maturities = {
     "Tbill12M": 12/12   # 1.0 year
 }
 
-# Create an empty Plotly figure
-fig = go.Figure()
+# Calibrate and simulate every bucket in one call; df_yields holds the daily
+# T-bill yields (decimal), one column per bucket. Paths are cached on disk.
+simulated_rates, cir_params = simulate_tbills(df_yields, maturities, n_paths=10_000, seed=42,
+                                              cache_dir="sim_cache")
 
-# Loop through each T-Bill bucket
+# Fan chart per T-Bill bucket: quantile bands plus a few representative paths,
+# decimated, so the figure stays small however many paths were simulated
+fig = None
 for tbill, T in maturities.items():
     sim_paths = simulated_rates[tbill]  # shape: (N_simulations, N_steps+1)
-    N_steps = sim_paths.shape[1] - 1
-    time_axis = np.linspace(0, T, N_steps + 1)
-    
-    # Plot a subset (e.g., 10 sample paths) to avoid cluttering the plot
-    for i in range(min(10, sim_paths.shape[0])):
-        fig.add_trace(
-            go.Scatter(
-                x=time_axis, 
-                y=sim_paths[i],
-                mode='lines',
-                name=f'{tbill} Path {i+1}',
-                line=dict(width=1),
-                opacity=0.7,
-                showlegend=False  # Hide individual path legends
-            )
-        )
-    
+    time_axis = np.linspace(0, T, sim_paths.shape[1])
+
     # Overlay a horizontal line for the market yield for this T-Bill (using the last observed yield)
     market_yield = df_yields[tbill].iloc[-1]
-    fig.add_trace(
-        go.Scatter(
-            x=[0, T],
-            y=[market_yield, market_yield],
-            mode='lines',
-            name=f'{tbill} Market Yield',
-            line=dict(dash='dash', width=2)
-        )
-    )
+    fig = fan_chart(time_axis, sim_paths, name=tbill, fig=fig, n_paths=3,
+                    reference={f'{tbill} Market Yield': market_yield})
 
 # Update layout for clarity
 fig.update_layout(
@@ -56,8 +40,9 @@ fig.update_layout(
     template="plotly_dark"
 )
 
-# Show the interactive plot
+# Show the interactive plot, and keep a static copy for reports (no browser needed)
 fig.show()
+save_figure(fig, "tbill_fan.png")
 
 
 
@@ -65,6 +50,9 @@ fig.show()
 import numpy as np
 import matplotlib.pyplot as plt
 
+from mc_tools import make_rng, normals, RunningStats
+from cir_sim import cir_path_stats
+
 # --- 1. Define Simulation Settings ---
 r0 = 0.05                  # Current rate, e.g., 5% (in decimal)
 cut_threshold = r0 - 0.0025  # Define a cut as a drop of 25bps (0.25%)
@@ -78,7 +66,7 @@ theta = 0.05               # Long-term mean rate; here assumed equal to r0 for s
 sigma = 0.1                # Volatility (annualized)
 
 # --- 2. Define the CIR Simulation Function ---
-def simulate_cir_paths(r0, kappa, theta, sigma, T, N_steps, N_sim):
+def simulate_cir_paths(r0, kappa, theta, sigma, T, N_steps, N_sim, rng=None, antithetic=False):
     """
     Simulate short-rate paths using the CIR model.
     
@@ -90,16 +78,19 @@ def simulate_cir_paths(r0, kappa, theta, sigma, T, N_steps, N_sim):
         T: Time horizon (in years).
         N_steps: Number of time steps.
         N_sim: Number of simulations.
+        rng: Seed or numpy Generator (see mc_tools.make_rng / spawn_rngs).
+        antithetic: Pair each path with one driven by the negated shocks (N_sim even).
     
     Returns:
         rates: A NumPy array of shape (N_sim, N_steps+1) containing the simulated rate paths.
     """
+    rng = make_rng(rng)
     dt = T / N_steps
     rates = np.zeros((N_sim, N_steps + 1))
     rates[:, 0] = r0
     
     for i in range(1, N_steps + 1):
-        dW = np.random.normal(0, np.sqrt(dt), N_sim)
+        dW = np.sqrt(dt) * normals(rng, N_sim, antithetic)
         # Ensure non-negative rates using np.maximum:
         rates[:, i] = np.maximum(
             rates[:, i-1] + kappa * (theta - rates[:, i-1]) * dt + sigma * np.sqrt(np.maximum(rates[:, i-1], 0)) * dW,
@@ -108,44 +99,33 @@ def simulate_cir_paths(r0, kappa, theta, sigma, T, N_steps, N_sim):
     return rates
 
 # --- 3. Run the Simulation ---
-simulated_paths = simulate_cir_paths(r0, kappa, theta, sigma, T, N_steps, N_sim)
+# Exact CIR transitions in chunks; only per-path statistics are kept
+path_stats = cir_path_stats(r0, kappa, theta, sigma, T, N_steps, N_sim, barriers=[cut_threshold],
+                            seed=42)
+# A subset of full paths for the fan chart below
+simulated_paths = simulate_cir_paths(r0, kappa, theta, sigma, T, N_steps, min(1000, N_sim), rng=42)
 
 # --- 4. Assess the Cut Probability ---
-# For each simulated path, compute the minimum rate over the time horizon.
-min_rates = simulated_paths.min(axis=1)
+# A path sees a cut when its running minimum drops below the cut threshold.
+cut = path_stats['min'].to_numpy() < cut_threshold
 
 # Calculate the probability that the rate falls below the cut threshold at any time.
-prob_cut = np.mean(min_rates < cut_threshold)
-print(f"Estimated probability of a Fed rate cut (≥25bps) within 1 year: {prob_cut:.2%}")
+prob_cut = np.mean(cut)
+prob_cut_se = RunningStats().update(cut).stderr
+print(f"Estimated probability of a Fed rate cut (≥25bps) within 1 year: {prob_cut:.2%} "
+      f"(std err {prob_cut_se:.2%})")
+print(f"Median time to the cut, given a cut: {path_stats[f'hit_{cut_threshold:g}'].median():.2f} years")
 
 # --- 5. Visualize Some Sample Paths ---
-import plotly.graph_objs as go
 import plotly.io as pio
 pio.renderers.default = "browser"
 
 # Generate a time axis (in years)
 time_axis = np.linspace(0, T, N_steps+1)
 
-fig = go.Figure()
-# Plot a few sample paths (e.g., 20 paths)
-for i in range(min(20, N_sim)):
-    fig.add_trace(go.Scatter(
-        x=time_axis, 
-        y=simulated_paths[i],
-        mode='lines',
-        name=f'Path {i+1}',
-        opacity=0.6,
-        showlegend=False
-    ))
-
-# Add a horizontal line for the cut threshold
-fig.add_trace(go.Scatter(
-    x=[0, T],
-    y=[cut_threshold, cut_threshold],
-    mode='lines',
-    name='Cut Threshold',
-    line=dict(dash='dash', color='red')
-))
+# Fan chart of the sample paths, with a horizontal line for the cut threshold
+fig = fan_chart(time_axis, simulated_paths, name='CIR', n_paths=10,
+                reference={'Cut Threshold': cut_threshold})
 
 fig.update_layout(
     title="Sample CIR Simulated Short-Rate Paths with Cut Threshold",
@@ -157,35 +137,14 @@ fig.show()
 
 
 from scipy.optimize import minimize
+from cir_mle import cir_nll, cir_initial_guess, BOUNDS
 
-def cir_log_likelihood(params, rates, dt):
-    """
-    Compute the negative log-likelihood for CIR model.
-
-    Parameters:
-        params: Tuple (kappa, theta, sigma) to be estimated
-        rates: Historical interest rate data (Pandas Series)
-        dt: Time step (e.g., 1/252 for daily data)
-
-    Returns:
-        Negative log-likelihood value
-    """
-    kappa, theta, sigma = params
-    n = len(rates)
-    ll = 0.0
-
-    for t in range(1, n):
-        mean = rates[t-1] + kappa * (theta - rates[t-1]) * dt
-        variance = sigma**2 * rates[t-1] * dt
-        ll += -0.5 * np.log(2 * np.pi * variance) - 0.5 * ((rates[t] - mean) ** 2 / variance)
-
-    return -ll  # Negative for minimization
+# Initial guess for parameters (closed-form OLS on the Euler scheme)
+initial_params = cir_initial_guess(daily_yields, 1/252)
 
-# Initial guess for parameters
-initial_params = [0.1, np.mean(daily_yields), np.std(np.diff(daily_yields))]
-
-# Minimize the negative log-likelihood
-res = minimize(cir_log_likelihood, initial_params, args=(daily_yields, 1/252), method='L-BFGS-B')
+# Minimize the negative log-likelihood, with its analytic gradient
+res = minimize(cir_nll, initial_params, args=(daily_yields, 1/252, 'euler', True), jac=True,
+               method='L-BFGS-B', bounds=BOUNDS)
 
 # Extract estimated parameters
 kappa_mle, theta_mle, sigma_mle = res.x
@@ -315,14 +274,16 @@ here
 
 
 import numpy as np
-from scipy.optimize import brentq
+
+import bond_core
+from bond_risk import bond_risk
 
 def bond_price_dirty(ytm, face_value, coupon, years_to_maturity, frequency):
     """
     Computes the theoretical dirty price of a bond given a periodic yield (r = ytm/frequency),
     using the formula:
     
-    P_dirty = sum_{i=1}^{floor(N)} [coupon / (1 + r)^i] + (coupon + face_value) / (1 + r)^N
+    P_dirty = sum_{i=1}^{ceil(N)-1} [coupon / (1 + r)^i] + (coupon + face_value) / (1 + r)^N
 
     Parameters:
         ytm: periodic yield (not annualized)
@@ -334,19 +295,9 @@ def bond_price_dirty(ytm, face_value, coupon, years_to_maturity, frequency):
     Returns:
         The theoretical dirty price.
     """
-    N = years_to_maturity * frequency  # total number of coupon periods (fractional allowed)
-    integer_N = int(np.floor(N))
-    fractional_N = N - integer_N
-
-    # Present value of coupons for the full periods
-    pv_coupons = sum([coupon / (1 + ytm)**i for i in range(1, integer_N + 1)])
-
-    # Discounting the final cash flow (coupon + face value) for the fractional period:
-    # We discount it for the entire N periods (which is fractional)
-    pv_final = (coupon + face_value) / (1 + ytm)**(N)
-
-    price_dirty = pv_coupons + pv_final
-    return price_dirty
+    # Closed-form annuity (bond_core); coupons at periods 1..ceil(N)-1, coupon + face at N
+    return bond_core.bond_price(ytm * frequency, face_value, coupon * frequency / face_value,
+                                years_to_maturity, frequency)
 
 def compute_ytm_dirty(price_dirty, face_value, coupon, years_to_maturity, frequency):
     """
@@ -362,15 +313,12 @@ def compute_ytm_dirty(price_dirty, face_value, coupon, years_to_maturity, freque
     Returns:
         Annualized YTM as a decimal.
     """
-    # Define the function whose root we need (difference between calculated and market price)
-    f = lambda r: bond_price_dirty(r, face_value, coupon, years_to_maturity, frequency) - price_dirty
-    
-    # Solve for the periodic yield r using Brent's method.
-    # We choose bounds that make sense (e.g., between 0% and 20% periodic yield)
-    r_solution = brentq(f, 0.000001, 0.2)
-    
-    # Convert periodic yield to annualized yield
-    ytm_annualized = r_solution * frequency
+    # Vectorized Newton on the periodic yield with the analytic price derivative (bond_core)
+    ytm_annualized, converged = bond_core.bond_ytm(price_dirty, face_value,
+                                                   coupon * frequency / face_value,
+                                                   years_to_maturity, frequency)
+    if not np.all(converged):
+        raise ValueError("No yield reproduces the dirty price.")
     return ytm_annualized
 
 def compute_ytm_clean(price_clean, accrued_interest, face_value, coupon, years_to_maturity, frequency):
@@ -415,3 +363,7 @@ print("Computed YTM from Dirty Price: {:.5f}%".format(ytm_from_dirty * 100))
 # ----- Compute YTM Using Clean Price -----
 ytm_from_clean = compute_ytm_clean(price_clean, accrued_interest, face_value, coupon, years_to_maturity, frequency)
 print("Computed YTM from Clean Price: {:.5f}%".format(ytm_from_clean * 100))
+
+# ----- Risk at the solved yield (analytic, no bump-and-reprice) -----
+risk = bond_risk(price_dirty, face_value, annual_coupon_rate, years_to_maturity, frequency)
+print(risk[['ytm', 'mod_duration', 'mac_duration', 'dv01', 'convexity']])
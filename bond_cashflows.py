@@ -0,0 +1,163 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+from bond_core import coupon_periods, price_bounds, ytm_from_terms
+
+
+class ScheduleSet:
+    """
+    Cash-flow schedules of a set of bonds, flattened: one entry per cash flow
+    with its bond, time (in coupon periods) and amount.
+
+    Price, duration and convexity are one pass over the flat arrays:
+    discount factors (1 + r)^-t for each bond's periodic yield r, then
+    per-bond sums with np.bincount. The YTM solve runs on the per-bond
+    schedule terms (coupon, face, M, N) with the closed-form annuity, and
+    the price bounds of its search interval are kept with the schedules.
+    Nothing is rebuilt per call, so re-marking after a price move only pays
+    for the yield solve.
+    """
+
+    def __init__(self, face_value, coupon_rate, years_to_maturity, frequency=2):
+        face, rate, years, freq = np.broadcast_arrays(
+            *(np.atleast_1d(np.asarray(x, dtype=float))
+              for x in (face_value, coupon_rate, years_to_maturity, frequency)))
+        N, M = coupon_periods(years, freq)
+        counts = M.astype(np.int64) + 1
+        starts = np.cumsum(counts) - counts
+
+        self.n_bonds = len(face)
+        self.frequency = freq
+        self.face = face
+        self.bond = np.repeat(np.arange(self.n_bonds), counts)
+        # Coupon periods 1..M, then the final flow at N (cash flows as in bond_core)
+        self.t = (np.arange(len(self.bond)) - np.repeat(starts, counts) + 1).astype(float)
+        last = starts + counts - 1
+        self.t[last] = N
+        self.coupon = rate * face / freq
+        self.cf = self.coupon[self.bond]
+        self.cf[last] += face
+        self.N, self.M = N, M
+        self._bounds = None
+
+    def __len__(self):
+        return self.n_bonds
+
+    def _sum(self, weights):
+        return np.bincount(self.bond, weights=weights, minlength=self.n_bonds)
+
+    def moments(self, ytm, order=2):
+        """
+        Per-bond sums at annualized yields ytm (one per bond, or a scalar):
+        S0 = sum cf v^t (the dirty price), then for order >= 1 S1 = sum t cf v^t
+        and for order 2 S2 = sum t (t + 1) cf v^t, with v = 1 / (1 + ytm / frequency).
+        """
+        r = np.broadcast_to(np.asarray(ytm, dtype=float), self.n_bonds) / self.frequency
+        df = np.exp(-self.t * np.log1p(r)[self.bond])
+        pv = self.cf * df
+        out = [self._sum(pv)]
+        if order >= 1:
+            out.append(self._sum(self.t * pv))
+        if order >= 2:
+            out.append(self._sum(self.t * (self.t + 1) * pv))
+        return out
+
+    def price(self, ytm):
+        """
+        Dirty prices at annualized yields ytm.
+        """
+        return self.moments(ytm, order=0)[0]
+
+    def duration(self, ytm):
+        """
+        Modified durations -dP/dy / P at annualized yields ytm.
+        """
+        S0, S1 = self.moments(ytm, order=1)
+        v = 1 / (1 + np.broadcast_to(np.asarray(ytm, dtype=float), self.n_bonds) / self.frequency)
+        return S1 * v / S0 / self.frequency
+
+    def convexity(self, ytm):
+        """
+        Convexities d2P/dy2 / P at annualized yields ytm.
+        """
+        S0, _, S2 = self.moments(ytm)
+        v = 1 / (1 + np.broadcast_to(np.asarray(ytm, dtype=float), self.n_bonds) / self.frequency)
+        return S2 * v**2 / S0 / self.frequency**2
+
+    def ytm(self, price_dirty, ytm0=None, tol=1e-12, max_iter=50):
+        """
+        Yields to maturity from dirty prices, solved on the cached schedule
+        terms (bond_core.ytm_from_terms(), analytic slope).
+
+        Returns:
+        - annualized yields (NaN where no yield reproduces the price), and a converged flag
+        """
+        price = np.broadcast_to(np.asarray(price_dirty, dtype=float), self.n_bonds)
+        if ytm0 is not None:
+            ytm0 = np.broadcast_to(np.asarray(ytm0, dtype=float), self.n_bonds)
+        if self._bounds is None:
+            self._bounds = price_bounds(self.coupon, self.face, self.M, self.N)
+        return ytm_from_terms(price, self.coupon, self.face, self.M, self.N, self.frequency,
+                              self._bounds, ytm0, tol, max_iter)
+
+
+class ScheduleCache:
+    """
+    Cache of ScheduleSets keyed by bond terms (face, coupon rate, years to
+    maturity, frequency of every bond in the set), least recently used first out.
+    """
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._sets = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(face_value, coupon_rate, years_to_maturity, frequency=2):
+        terms = np.broadcast_arrays(*(np.atleast_1d(np.asarray(x, dtype=float))
+                                      for x in (face_value, coupon_rate, years_to_maturity,
+                                                frequency)))
+        return hashlib.sha1(np.ascontiguousarray(np.stack(terms)).tobytes()).hexdigest()
+
+    def get(self, face_value, coupon_rate, years_to_maturity, frequency=2):
+        """
+        ScheduleSet for these terms, built on first use.
+        """
+        key = self.key(face_value, coupon_rate, years_to_maturity, frequency)
+        if key in self._sets:
+            self.hits += 1
+            self._sets.move_to_end(key)
+            return self._sets[key]
+        self.misses += 1
+        schedules = ScheduleSet(face_value, coupon_rate, years_to_maturity, frequency)
+        self._sets[key] = schedules
+        if len(self._sets) > self.maxsize:
+            self._sets.popitem(last=False)
+        return schedules
+
+    def clear(self):
+        self._sets.clear()
+
+
+# Shared by callers that don't manage their own cache
+default_cache = ScheduleCache()
+
+
+def schedules_for(face_value, coupon_rate, years_to_maturity, frequency=2, cache=None):
+    """
+    Cached ScheduleSet for a set of bonds (default_cache unless one is given).
+    """
+    cache = default_cache if cache is None else cache
+    return cache.get(face_value, coupon_rate, years_to_maturity, frequency)
+
+
+# -------------------------
+# Example usage:
+# -------------------------
+# book = schedules_for(100, universe['coupon'], universe['years'])   # built once
+# universe['ytm'], ok = book.ytm(universe['dirty'])                 # every re-mark
+# universe['mod_dur'] = book.duration(universe['ytm'])
+# universe['convexity'] = book.convexity(universe['ytm'])
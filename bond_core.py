@@ -0,0 +1,231 @@
+import numpy as np
+
+# Periodic-yield search interval: (1 + r) must stay positive
+R_MIN = -0.9
+R_MAX = 10.0
+
+
+def _scalar(x):
+    return x[()] if x.ndim == 0 else x
+
+
+def coupon_periods(years_to_maturity, frequency=2):
+    """
+    Number of coupon periods N to maturity and coupons paid before it.
+
+    Cash-flow convention (as bibi.bond_price_dirty): a coupon at periods
+    1..M and coupon + face at period N (fractional allowed), where
+    M = ceil(N) - 1. For integer N the last coupon is paid only once, with the
+    face value (bond_price_dirty also paid a coupon at period N).
+
+    Returns:
+    - N (float array) and M (float array of whole numbers)
+    """
+    N = np.asarray(years_to_maturity, dtype=float) * np.asarray(frequency, dtype=float)
+    # Snap N within rounding noise of a whole number, e.g. 2.9999999999 -> 3
+    whole = np.round(N)
+    N = np.where(np.abs(N - whole) < 1e-9, whole, N)
+    M = np.maximum(np.ceil(N) - 1, 0)
+    return N, M
+
+
+def _annuity(r, M):
+    # sum_{i=1}^M (1 + r)^-i and sum_{i=1}^M i (1 + r)^-i, closed form (series near r = 0)
+    log_v = -np.log1p(r)
+    small = np.abs(r) < 1e-8
+    r_safe = np.where(small, 1.0, r)
+    v_m = np.exp(M * log_v)
+    A = np.where(small, M - r * M * (M + 1) / 2, -np.expm1(M * log_v) / r_safe)
+    S1 = np.where(small,
+                  M * (M + 1) / 2 - r * M * (M + 1) * (2 * M + 1) / 6,
+                  (A - M * v_m / (1 + r)) * (1 + r) / r_safe)
+    return A, S1
+
+
+def price_and_slope(r, coupon, face, M, N):
+    """
+    Dirty price at periodic yield r and its derivative dP/dr (analytic, closed-form annuity).
+    """
+    A, S1 = _annuity(r, M)
+    v = 1 / (1 + r)
+    v_n = np.exp(-N * np.log1p(r))
+    price = coupon * A + (coupon + face) * v_n
+    slope = -v * (coupon * S1 + N * (coupon + face) * v_n)
+    return price, slope
+
+
+def solve_yield(price, evaluate, r0, tol=1e-12, max_iter=50):
+    """
+    Safeguarded vectorized Newton solve of model(r) = price for periodic yields.
+
+    The price is decreasing and convex in the yield, so a bracket is kept per
+    bond and a step that leaves it is replaced by bisection. Only unconverged
+    bonds are re-evaluated each iteration.
+
+    Parameters:
+    - price: target dirty prices (within the prices at R_MIN and R_MAX)
+    - evaluate: callable(r, active) -> (model price, dP/dr) for the bonds at positions active
+    - r0: starting periodic yields
+    - tol: absolute tolerance on the periodic yield, and relative on the price
+    - max_iter: iteration cap
+
+    Returns:
+    - periodic yields, and a bool array of which met tol
+    """
+    r = np.clip(np.asarray(r0, dtype=float), R_MIN, R_MAX)
+    lo = np.full(len(r), R_MIN)
+    hi = np.full(len(r), R_MAX)
+    converged = np.zeros(len(r), dtype=bool)
+
+    active = np.arange(len(r))
+    for _ in range(max_iter):
+        r_act = r[active]
+        model, slope = evaluate(r_act, active)
+        g = model - price[active]
+        # Price falls with yield: too expensive means the yield is too low
+        lo[active] = np.where(g > 0, r_act, lo[active])
+        hi[active] = np.where(g < 0, r_act, hi[active])
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r_new = r_act - g / slope
+        outside = ~np.isfinite(r_new) | (r_new < lo[active]) | (r_new > hi[active])
+        r_new = np.where(outside, 0.5 * (lo[active] + hi[active]), r_new)
+        hit = np.abs(g) <= tol * price[active]
+        done = hit | (np.abs(r_new - r_act) <= tol)
+        r[active] = np.where(hit, r_act, r_new)
+        converged[active[done]] = True
+        active = active[~done]
+        if not len(active):
+            break
+    return r, converged
+
+
+def price_bounds(coupon, face, M, N):
+    """
+    Prices at the ends of the search interval, R_MIN and R_MAX: a dirty price
+    has a yield only if it lies between them.
+
+    At R_MIN a long schedule's discount factors overflow (e.g. 0.1^-360 for a
+    30-year monthly bond); that end is then +inf, including zero coupons
+    where the annuity term would be 0 * inf.
+    """
+    n = np.shape(N)
+    with np.errstate(over='ignore', invalid='ignore'):
+        p_lo, p_hi = (price_and_slope(np.full(n, r), coupon, face, M, N)[0]
+                      for r in (R_MIN, R_MAX))
+    overflow = np.isnan(p_lo) & np.isfinite(coupon) & np.isfinite(face) & np.isfinite(N)
+    return np.where(overflow, np.inf, p_lo), p_hi
+
+
+def ytm_from_terms(price, coupon, face, M, N, freq, bounds, ytm0=None, tol=1e-12, max_iter=50):
+    """
+    Yields to maturity of flat arrays of bonds given their schedule terms.
+
+    Shared by bond_ytm() and bond_cashflows.ScheduleSet.ytm(), which only
+    differ in where the terms and bounds come from.
+
+    Parameters:
+    - price: dirty prices
+    - coupon: coupon per period; face, M, N, freq: as in coupon_periods()
+    - bounds: (price at R_MIN, price at R_MAX), see price_bounds()
+    - ytm0: optional warm start (annualized); NaN entries use the guess
+    - tol, max_iter: as in solve_yield()
+
+    Returns:
+    - annualized yields (NaN where no yield reproduces the price), and a converged flag
+    """
+    ytm = np.full(len(price), np.nan)
+    converged = np.zeros(len(price), dtype=bool)
+    p_lo, p_hi = bounds
+    valid = (N > 0) & (price > 0) & (price <= p_lo) & (price >= p_hi)
+    idx = np.flatnonzero(valid)
+    if not len(idx):
+        return ytm, converged
+
+    P, c, F, m, n = price[idx], coupon[idx], face[idx], M[idx], N[idx]
+    # Approximate yield: (coupon + pull to par per period) / average of price and face
+    r0 = (c + (F - P) / n) / ((F + P) / 2)
+    if ytm0 is not None:
+        warm = ytm0[idx] / freq[idx]
+        r0 = np.where(np.isfinite(warm), warm, r0)
+
+    def evaluate(r_act, active):
+        return price_and_slope(r_act, c[active], F[active], m[active], n[active])
+
+    r, ok = solve_yield(P, evaluate, r0, tol, max_iter)
+    ytm[idx] = r * freq[idx]
+    converged[idx] = ok
+    return ytm, converged
+
+
+def bond_price(ytm, face_value, coupon_rate, years_to_maturity, frequency=2):
+    """
+    Dirty price of bullet bonds over arrays, from the closed-form annuity sum.
+
+    Parameters:
+    - ytm: yield(s) to maturity, annualized with `frequency` compounding (decimal)
+    - face_value: par value(s)
+    - coupon_rate: annual coupon rate(s) (decimal)
+    - years_to_maturity: years to maturity (fractional allowed)
+    - frequency: coupons per year
+
+    Returns:
+    - dirty price array (a scalar for scalar inputs); cash flows as in coupon_periods()
+    """
+    ytm, face, rate, freq = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (ytm, face_value, coupon_rate, frequency)))
+    N, M = coupon_periods(years_to_maturity, freq)
+    price, _ = price_and_slope(ytm / freq, rate * face / freq, face, M, N)
+    return _scalar(np.asarray(price))
+
+
+def bond_ytm(price_dirty, face_value, coupon_rate, years_to_maturity, frequency=2, ytm0=None,
+             tol=1e-12, max_iter=50):
+    """
+    Yield to maturity for whole arrays of bonds from their dirty prices.
+
+    Vectorized Newton iterations on the periodic yield (solve_yield()), with
+    the analytic price derivative (dollar duration) as slope.
+
+    Parameters:
+    - price_dirty: dirty price(s)
+    - face_value, coupon_rate, years_to_maturity, frequency: as in bond_price()
+    - ytm0: optional warm start (e.g. the previous solve); NaN entries use the guess
+    - tol: absolute tolerance on the periodic yield, and relative on the price
+    - max_iter: iteration cap
+
+    Returns:
+    - ytm: annualized yields (decimal), NaN where no yield in the search
+           interval reproduces the price
+    - converged: bool array, True where ytm met tol
+    """
+    price, face, rate, years, freq = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float)
+          for x in (price_dirty, face_value, coupon_rate, years_to_maturity, frequency)))
+    shape = price.shape
+    price, face, rate, years, freq = (a.ravel() for a in (price, face, rate, years, freq))
+    N, M = coupon_periods(years, freq)
+    coupon = rate * face / freq
+
+    if ytm0 is not None:
+        ytm0 = np.broadcast_to(np.asarray(ytm0, dtype=float), shape).ravel()
+    ytm, converged = ytm_from_terms(price, coupon, face, M, N, freq,
+                                    price_bounds(coupon, face, M, N), ytm0, tol, max_iter)
+    return _scalar(ytm.reshape(shape)), _scalar(converged.reshape(shape))
+
+
+def bond_ytm_clean(price_clean, accrued_interest, face_value, coupon_rate, years_to_maturity,
+                   frequency=2, **kwargs):
+    """
+    bond_ytm() from clean prices: dirty = clean + accrued interest.
+    """
+    price_dirty = np.asarray(price_clean, dtype=float) + np.asarray(accrued_interest, dtype=float)
+    return bond_ytm(price_dirty, face_value, coupon_rate, years_to_maturity, frequency, **kwargs)
+
+
+# -------------------------
+# Example usage:
+# -------------------------
+# universe = pd.read_parquet('treasuries.parquet')   # dirty, coupon, years, ...
+# universe['ytm'], ok = bond_ytm(universe['dirty'], 100, universe['coupon'], universe['years'])
+# reprice = bond_price(universe['ytm'], 100, universe['coupon'], universe['years'])
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+from bond_cashflows import schedules_for
+
+RISK_COLUMNS = ['price', 'ytm', 'converged', 'mod_duration', 'mac_duration', 'dv01', 'convexity']
+
+
+def risk_at_yields(schedules, ytm):
+    """
+    Price and yield risk of a bond_cashflows.ScheduleSet at known yields.
+
+    One pass over the cached cash flows gives S0 = sum cf v^t (price),
+    S1 = sum t cf v^t and S2 = sum t (t + 1) cf v^t (t in periods,
+    v = 1 / (1 + y / f)); every metric follows analytically:
+    Macaulay = S1 / (f S0), modified = Macaulay * v, convexity = S2 v^2 / (f^2 S0),
+    DV01 = modified * price / 10,000 (per 1bp, per bond of the quoted face).
+
+    Parameters:
+    - schedules: ScheduleSet of the bonds
+    - ytm: annualized yields (one per bond, or a scalar)
+
+    Returns:
+    - dict of name -> array: price, mod_duration, mac_duration, dv01, convexity
+    """
+    ytm = np.broadcast_to(np.asarray(ytm, dtype=float), len(schedules))
+    freq = schedules.frequency
+    S0, S1, S2 = schedules.moments(ytm, order=2)
+    v = 1 / (1 + ytm / freq)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mac = S1 / S0 / freq
+        convexity = S2 * v**2 / S0 / freq**2
+    mod = mac * v
+    return {'price': S0, 'mod_duration': mod, 'mac_duration': mac, 'dv01': mod * S0 * 1e-4,
+            'convexity': convexity}
+
+
+def bond_risk(price_dirty, face_value, coupon_rate, years_to_maturity, frequency=2, ytm0=None,
+              index=None, cache=None):
+    """
+    Batch risk from dirty prices: YTM plus modified and Macaulay duration,
+    DV01 and convexity, for arrays of bonds.
+
+    Schedules come from the cache (built once per set of bond terms), the
+    YTM solve is vectorized Newton with the analytic slope, and the risk is
+    one analytic pass at the solved yields: no bump-and-reprice.
+
+    Parameters:
+    - price_dirty: dirty prices
+    - face_value, coupon_rate, years_to_maturity, frequency: bond terms, as in bond_core.bond_price()
+    - ytm0: optional warm start for the yield solve (e.g. the previous run's ytm)
+    - index: optional index for the result (e.g. CUSIPs)
+    - cache: bond_cashflows.ScheduleCache (default: the shared one)
+
+    Returns:
+    - DataFrame with RISK_COLUMNS (NaN risk where no yield reproduces the price)
+    """
+    schedules = schedules_for(face_value, coupon_rate, years_to_maturity, frequency, cache)
+    ytm, converged = schedules.ytm(price_dirty, ytm0=ytm0)
+    risk = risk_at_yields(schedules, ytm)
+    risk['price'] = np.broadcast_to(np.asarray(price_dirty, dtype=float), len(schedules))
+    risk['ytm'] = ytm
+    risk['converged'] = converged
+    return pd.DataFrame(risk, index=index)[RISK_COLUMNS]
+
+
+def portfolio_risk(risk, quantity, face_value=100.0):
+    """
+    Book-level risk from per-bond risk and positions.
+
+    Bonds without a yield (NaN ytm: no yield reproduces the price) are left
+    out of every figure, market value included, so the weights and totals
+    describe the same set of bonds; their count is reported as n_skipped.
+
+    Parameters:
+    - risk: bond_risk() frame
+    - quantity: face amount held per bond (negative for shorts)
+    - face_value: face the prices are quoted on
+
+    Returns:
+    - Series: market_value, dv01 (per 1bp), mod_duration and convexity
+      (market-value weighted), mac_duration, n_skipped
+    """
+    units = np.broadcast_to(np.asarray(quantity, dtype=float) / np.asarray(face_value, dtype=float),
+                            len(risk))
+    solved = np.isfinite(risk['ytm'].to_numpy())
+    units = units[solved]
+    mv = units * risk['price'].to_numpy()[solved]
+    total = mv.sum()
+    weight = mv / total if total else np.zeros_like(mv)
+    return pd.Series({
+        'market_value': total,
+        'dv01': np.sum(units * risk['dv01'].to_numpy()[solved]),
+        'mod_duration': np.sum(weight * risk['mod_duration'].to_numpy()[solved]),
+        'mac_duration': np.sum(weight * risk['mac_duration'].to_numpy()[solved]),
+        'convexity': np.sum(weight * risk['convexity'].to_numpy()[solved]),
+        'n_skipped': int((~solved).sum()),
+    })
+
+# -------------------------
+# Example usage:
+# -------------------------
+# risk = bond_risk(book['dirty'], 100, book['coupon'], book['years'], index=book.index)
+# totals = portfolio_risk(risk, book['quantity'])
+# # next re-mark: same terms hit the schedule cache, yields warm-started
+# risk = bond_risk(new_dirty, 100, book['coupon'], book['years'], ytm0=risk['ytm'],
+#                  index=book.index)
@@ -0,0 +1,139 @@
+import numpy as np
+from scipy.special import ndtr
+
+# Type codes: +1 call, -1 put (the sign w in w * (S N(w d1) - K e^-rT N(w d2)))
+CALL = 1
+PUT = -1
+OPTION_TYPES = {'C': CALL, 'P': PUT}
+
+GREEKS = ('price', 'delta', 'gamma', 'vega', 'theta', 'rho')
+
+_INV_SQRT_2PI = 1.0 / np.sqrt(2.0 * np.pi)
+
+
+def type_codes(option_type):
+    """
+    Turn option types into an int8 array of +1 (call) / -1 (put).
+
+    Parameters:
+    - option_type: 'C' / 'P', +1 / -1, or an array of either
+
+    Returns:
+    - np.ndarray of int8
+    """
+    types = np.asarray(option_type)
+    if types.dtype.kind in 'USO':
+        codes = np.zeros(types.shape, dtype=np.int8)
+        codes[types == 'C'] = CALL
+        codes[types == 'P'] = PUT
+    else:
+        codes = types.astype(np.int8)
+    if not np.isin(codes, (CALL, PUT)).all():
+        raise ValueError("Invalid option type. Use 'C' for Call or 'P' for Put.")
+    return codes
+
+
+def norm_pdf(x):
+    return _INV_SQRT_2PI * np.exp(-0.5 * x * x)
+
+
+def d1_d2(S, K, T, r, sigma):
+    """
+    Black-Scholes d1, d2 and sigma * sqrt(T), element-wise.
+
+    Where sigma * sqrt(T) is 0 (expired or zero vol) d1 = d2 = +/-inf by the
+    sign of log(S / K) + r T, so prices and Greeks take their intrinsic limits.
+    """
+    S, K, T, r, sigma = np.broadcast_arrays(*(np.asarray(x, dtype=float)
+                                              for x in (S, K, T, r, sigma)))
+    sig_sqrt_t = sigma * np.sqrt(T)
+    log_moneyness = np.log(S / K)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1 = np.where(sig_sqrt_t > 0,
+                      (log_moneyness + (r + 0.5 * sigma**2) * T) / sig_sqrt_t,
+                      np.where(log_moneyness + r * T >= 0, np.inf, -np.inf))
+    d2 = np.where(sig_sqrt_t > 0, d1 - sig_sqrt_t, d1)
+    return d1, d2, sig_sqrt_t
+
+
+def _scalar(x):
+    # 0-d results come back as NumPy scalars, like the scalar bs.black_scholes
+    return x[()] if x.ndim == 0 else x
+
+
+def bs_price(S, K, T, r, sigma, option_type='C'):
+    """
+    Black-Scholes price of European calls and puts over arrays.
+
+    All inputs broadcast against each other; a Black-76 price on a forward F is
+    bs_price(F, K, T, 0, sigma) (times the discount factor).
+
+    Parameters:
+    - S: spot price(s) of the underlying
+    - K: strike(s)
+    - T: time(s) to expiration in years
+    - r: risk-free rate(s), annualized, continuously compounded
+    - sigma: volatility(ies)
+    - option_type: 'C' / 'P' / +1 / -1, or an array of type codes
+
+    Returns:
+    - price array (a scalar for scalar inputs)
+    """
+    w = type_codes(option_type)
+    d1, d2, _ = d1_d2(S, K, T, r, sigma)
+    S, K, T, r = (np.asarray(x, dtype=float) for x in (S, K, T, r))
+    price = w * (S * ndtr(w * d1) - K * np.exp(-r * T) * ndtr(w * d2))
+    return _scalar(price)
+
+
+def bs_greeks(S, K, T, r, sigma, option_type='C', greeks=GREEKS):
+    """
+    Black-Scholes price and Greeks over arrays, from one d1/d2 computation.
+
+    Conventions: vega and rho per 1.00 change in sigma / r (divide by 100 for
+    per-point), theta per year of calendar time (divide by 365 for per day).
+
+    Parameters:
+    - S, K, T, r, sigma, option_type: as in bs_price()
+    - greeks: subset of GREEKS to return
+
+    Returns:
+    - dict of name -> array (scalars for scalar inputs)
+    """
+    unknown = set(greeks) - set(GREEKS)
+    if unknown:
+        raise ValueError(f"Unknown greek(s) {sorted(unknown)}. Choose from {GREEKS}.")
+    w = type_codes(option_type)
+    d1, d2, sig_sqrt_t = d1_d2(S, K, T, r, sigma)
+    S, K, T, r, sigma = (np.asarray(x, dtype=float) for x in (S, K, T, r, sigma))
+
+    disc_k = K * np.exp(-r * T)
+    n_d1 = ndtr(w * d1)
+    n_d2 = ndtr(w * d2)
+    pdf_d1 = norm_pdf(d1)
+
+    out = {}
+    if 'price' in greeks:
+        out['price'] = w * (S * n_d1 - disc_k * n_d2)
+    if 'delta' in greeks:
+        out['delta'] = w * n_d1
+    if 'gamma' in greeks:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out['gamma'] = np.where(sig_sqrt_t > 0, pdf_d1 / (S * sig_sqrt_t), 0.0)
+    if 'vega' in greeks:
+        out['vega'] = S * pdf_d1 * np.sqrt(T)
+    if 'theta' in greeks:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            decay = np.where(T > 0, S * pdf_d1 * sigma / (2 * np.sqrt(T)), 0.0)
+        out['theta'] = -decay - w * r * disc_k * n_d2
+    if 'rho' in greeks:
+        out['rho'] = w * T * disc_k * n_d2
+    return {name: _scalar(np.asarray(out[name])) for name in greeks}
+
+
+# -------------------------
+# Example usage:
+# -------------------------
+# book = pd.read_parquet('book.parquet')   # S, K, T, r, iv, type ('C'/'P')
+# g = bs_greeks(book['S'], book['K'], book['T'], book['r'], book['iv'], book['type'])
+# book['delta'], book['vega'] = g['delta'], g['vega']
@@ -0,0 +1,137 @@
+import numpy as np
+from scipy.special import ndtr, ndtri
+
+from bs_core import type_codes, norm_pdf
+
+# Total implied variance sqrt ceiling: sigma * sqrt(T) beyond this is treated as no solution
+MAX_TOTAL_VOL = 20.0
+
+
+def _normalized_otm(x, v):
+    """
+    Normalized out-of-the-money Black price b(x, v) = price / sqrt(F K), with
+    x = log(F / K) <= 0 priced as a call and x > 0 as a put, plus its first two
+    derivatives in v = sigma * sqrt(T).
+    """
+    theta = np.where(x > 0, -1.0, 1.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1 = x / v + v / 2
+    d2 = d1 - v
+    b = theta * (np.exp(x / 2) * ndtr(theta * d1) - np.exp(-x / 2) * ndtr(theta * d2))
+    vega = np.exp(x / 2) * norm_pdf(d1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        volga = vega * d1 * d2 / v
+    return b, vega, volga
+
+
+def _initial_guess(x, b):
+    """
+    Rational (Corrado-Miller) approximation of v = sigma * sqrt(T) from the
+    normalized OTM price, exact at the money (b = 2 N(v / 2) - 1) and falling
+    back to the inflection point sqrt(2 |x|) where the approximation breaks
+    down in the far wings.
+    """
+    # Corrado-Miller on the normalized call price c = b + max(e^(x/2) - e^(-x/2), 0)
+    f, k = np.exp(x / 2), np.exp(-x / 2)
+    c = b + np.maximum(f - k, 0)
+    half = c - (f - k) / 2
+    disc = half**2 - (f - k)**2 / np.pi
+    v_cm = np.sqrt(2 * np.pi) / (f + k) * (half + np.sqrt(np.maximum(disc, 0)))
+
+    v_atm = 2 * ndtri(np.clip((b + 1) / 2, 0.5, 1.0))
+    v_wing = np.sqrt(2 * np.abs(x))
+    guess = np.where(disc > 0, v_cm, v_wing)
+    guess = np.where(np.abs(x) < 1e-12, v_atm, guess)
+    return np.where((guess > 0) & np.isfinite(guess), guess, np.maximum(v_wing, 0.1))
+
+
+def implied_vol(price, S, K, T, r, option_type='C', sigma0=None, tol=1e-10, max_iter=50):
+    """
+    Black-Scholes implied volatility for whole arrays of option prices.
+
+    Each price is mapped to the normalized out-of-the-money Black price (ITM
+    quotes through put-call parity), started from a rational approximation, or
+    from sigma0 when given, and refined with vectorized Halley steps on
+    log(price). A bracket kept per option falls back to bisection if a step
+    leaves it. Only unconverged options are re-evaluated each iteration.
+
+    Parameters:
+    - price: option price(s), discounted
+    - S, K, T, r, option_type: as in bs_core.bs_price()
+    - sigma0: optional warm start (e.g. the previous solve); NaN entries use the guess
+    - tol: relative tolerance on sigma, and absolute on log(price)
+    - max_iter: iteration cap
+
+    Returns:
+    - sigma: implied vols, NaN where the price is outside the no-arbitrage bounds
+    - converged: bool array, True where sigma met tol
+    """
+    w = type_codes(option_type)
+    price, S, K, T, r, w = np.broadcast_arrays(*(np.asarray(a, dtype=float)
+                                                 for a in (price, S, K, T, r, w)))
+    shape = price.shape
+    price, S, K, T, r, w = (a.ravel() for a in (price, S, K, T, r, w))
+
+    forward = S * np.exp(r * T)
+    x = np.log(forward / K)
+    sqrt_fk = np.sqrt(forward * K)
+    # Undiscounted time value: the OTM option's price whatever the quoted side
+    intrinsic = np.maximum(w * (forward - K), 0)
+    b_target = (price * np.exp(r * T) - intrinsic) / sqrt_fk
+    b_max = np.where(x > 0, np.exp(-x / 2), np.exp(x / 2))
+
+    sigma = np.full(len(price), np.nan)
+    converged = np.zeros(len(price), dtype=bool)
+    valid = (T > 0) & (b_target > 0) & (b_target < b_max)
+    idx = np.flatnonzero(valid)
+    if not len(idx):
+        return sigma.reshape(shape), converged.reshape(shape)
+
+    x_a, b_a, sqrt_t = x[idx], b_target[idx], np.sqrt(T[idx])
+    v = _initial_guess(x_a, b_a)
+    if sigma0 is not None:
+        warm = np.broadcast_to(np.asarray(sigma0, dtype=float), shape).ravel()[idx] * sqrt_t
+        v = np.where(np.isfinite(warm) & (warm > 0), warm, v)
+    lo = np.zeros(len(idx))
+    hi = np.full(len(idx), MAX_TOTAL_VOL)
+    v = np.clip(v, 1e-8, MAX_TOTAL_VOL)
+    log_target = np.log(b_a)
+
+    active = np.arange(len(idx))
+    for _ in range(max_iter):
+        v_act = v[active]
+        b, vega, volga = _normalized_otm(x_a[active], v_act)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Halley on g(v) = log b(v) - log b*: g' = b'/b, g'' = b''/b - g'^2
+            g = np.log(b) - log_target[active]
+            g1 = vega / b
+            g2 = volga / b - g1**2
+            newton = g / g1
+            halley = 1 - 0.5 * newton * g2 / g1
+            step = np.where(halley > 0.5, newton / halley, newton)
+        hi[active] = np.where(g > 0, v_act, hi[active])
+        lo[active] = np.where(g < 0, v_act, lo[active])
+
+        v_new = v_act - step
+        outside = ~np.isfinite(v_new) | (v_new < lo[active]) | (v_new > hi[active])
+        v_new = np.where(outside, 0.5 * (lo[active] + hi[active]), v_new)
+        hit = np.abs(g) <= tol
+        done = hit | (np.abs(v_new - v_act) <= tol * v_new)
+        v[active] = np.where(hit, v_act, v_new)
+        converged[idx[active[done]]] = True
+        active = active[~done]
+        if not len(active):
+            break
+
+    sigma[idx] = v / sqrt_t
+    return sigma.reshape(shape), converged.reshape(shape)
+
+
+# -------------------------
+# Example usage:
+# -------------------------
+# chain['iv'], chain['iv_ok'] = implied_vol(chain['mid'], spot, chain['K'], chain['T'], r,
+#                                           chain['type'])
+# # next tick, warm-started from the last solve:
+# chain['iv'], chain['iv_ok'] = implied_vol(chain['mid'], spot, chain['K'], chain['T'], r,
+#                                           chain['type'], sigma0=chain['iv'])
@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+
+from bs_core import type_codes
+from bs_iv import implied_vol
+
+# A quote is identified by expiry (years), strike and type code (+1 call / -1 put)
+QUOTE_KEYS = ['T', 'K', 'type']
+
+
+def fit_smile(k, total_var, degree=2):
+    """
+    Least-squares polynomial in log-moneyness fitted to total implied variance.
+
+    Parameters:
+    - k: log(K / F) of the quotes
+    - total_var: iv**2 * T of the quotes
+    - degree: polynomial degree (2: w(k) = a + b k + c k^2)
+
+    Returns:
+    - coefficients, highest power first (np.polyval order), and the fit RMSE
+    """
+    if len(k) <= degree:
+        return np.full(degree + 1, np.nan), np.nan
+    coefs = np.polyfit(k, total_var, degree)
+    resid = np.polyval(coefs, k) - total_var
+    return coefs, float(np.sqrt(np.mean(resid**2)))
+
+
+class IVSurface:
+    """
+    Implied-volatility surface with a per-quote solution cache.
+
+    update() takes the full chain each refresh. Quotes that are new, or whose
+    price (or the spot / rate they were solved at) moved beyond tolerance,
+    are re-solved in one batch warm-started from their previous IV; all other
+    IVs are reused. Smiles are refitted only for expiries with a re-solved quote.
+    """
+
+    def __init__(self, price_tol=1e-4, spot_tol=0.0, degree=2, otm_only=True):
+        """
+        Parameters:
+        - price_tol: absolute price move below which a quote keeps its cached IV
+        - spot_tol: relative spot move below which cached IVs are kept (0: any move re-solves)
+        - degree: smile polynomial degree in log-moneyness (total variance)
+        - otm_only: fit smiles on out-of-the-money quotes only (puts below, calls above F)
+        """
+        self.price_tol = price_tol
+        self.spot_tol = spot_tol
+        self.degree = degree
+        self.otm_only = otm_only
+        self.quotes = None
+        self._smiles = {}
+        self.last_solved = 0
+
+    def _moved(self, quotes, prev):
+        moved = prev['price'].isna().to_numpy()
+        moved |= ~(np.abs(quotes['price'].to_numpy() - prev['price'].to_numpy()) <= self.price_tol)
+        moved |= ~(np.abs(quotes['S'].to_numpy() / prev['S'].to_numpy() - 1) <= self.spot_tol)
+        moved |= quotes['r'].to_numpy() != prev['r'].to_numpy()
+        return moved
+
+    def update(self, chain, spot, rate=0.0):
+        """
+        Refresh the surface from a chain.
+
+        Parameters:
+        - chain: DataFrame with ['T', 'K', 'type', 'price'] ('C'/'P' or +1/-1 types)
+        - spot: underlying spot price (scalar, or per quote)
+        - rate: risk-free rate (scalar, or per quote)
+
+        Returns:
+        - quotes frame indexed by QUOTE_KEYS with price, S, r, iv, converged
+        """
+        quotes = pd.DataFrame({
+            'T': chain['T'].to_numpy(dtype=float),
+            'K': chain['K'].to_numpy(dtype=float),
+            'type': type_codes(chain['type'].to_numpy()),
+            'price': chain['price'].to_numpy(dtype=float),
+        })
+        quotes['S'] = np.broadcast_to(np.asarray(spot, dtype=float), len(quotes))
+        quotes['r'] = np.broadcast_to(np.asarray(rate, dtype=float), len(quotes))
+        quotes = quotes.set_index(QUOTE_KEYS)
+
+        if self.quotes is None:
+            moved = np.ones(len(quotes), dtype=bool)
+            iv = np.full(len(quotes), np.nan)
+            converged = np.zeros(len(quotes), dtype=bool)
+        else:
+            prev = self.quotes.reindex(quotes.index)
+            moved = self._moved(quotes, prev)
+            iv = prev['iv'].to_numpy(dtype=float)
+            converged = prev['converged'].fillna(False).to_numpy(dtype=bool)
+
+        idx = np.flatnonzero(moved)
+        if len(idx):
+            keys = quotes.index[idx]
+            iv[idx], converged[idx] = implied_vol(
+                quotes['price'].to_numpy()[idx], quotes['S'].to_numpy()[idx],
+                keys.get_level_values('K').to_numpy(), keys.get_level_values('T').to_numpy(),
+                quotes['r'].to_numpy()[idx], keys.get_level_values('type').to_numpy(),
+                sigma0=iv[idx])
+        quotes['iv'] = iv
+        quotes['converged'] = converged
+        self.last_solved = len(idx)
+
+        expiries = quotes.index.get_level_values('T')
+        listed = set(expiries.unique())
+        stale = set(np.unique(expiries[idx])) | (listed - set(self._smiles))
+        self._smiles = {T: smile for T, smile in self._smiles.items() if T in listed}
+        self.quotes = quotes
+        if stale:
+            self._fit(sorted(stale))
+        return quotes
+
+    def _fit(self, expiries):
+        q = self.quotes
+        T = q.index.get_level_values('T').to_numpy()
+        K = q.index.get_level_values('K').to_numpy()
+        forward = q['S'].to_numpy() * np.exp(q['r'].to_numpy() * T)
+        k = np.log(K / forward)
+        use = q['converged'].to_numpy()
+        if self.otm_only:
+            use = use & (q.index.get_level_values('type').to_numpy() * k >= 0)
+
+        total_var = q['iv'].to_numpy()**2 * T
+        for expiry in expiries:
+            m = (T == expiry) & use
+            coefs, rmse = fit_smile(k[m], total_var[m], self.degree)
+            self._smiles[expiry] = {'coefs': coefs, 'rmse': rmse, 'n_quotes': int(m.sum()),
+                                    'forward': float(forward[T == expiry][0])}
+
+    @property
+    def smiles(self):
+        """Fitted smiles, one row per expiry: coefs, rmse, n_quotes, forward."""
+        return pd.DataFrame.from_dict(self._smiles, orient='index').sort_index()
+
+    def smile_vol(self, T, K):
+        """
+        Fitted smile volatility for strikes K at a fitted expiry T.
+        """
+        smile = self._smiles[T]
+        k = np.log(np.asarray(K, dtype=float) / smile['forward'])
+        total_var = np.polyval(smile['coefs'], k)
+        return np.sqrt(np.maximum(total_var, 0) / T)
+
+
+# -------------------------
+# Example usage:
+# -------------------------
+# surface = IVSurface(price_tol=0.005)
+# surface.update(chain, spot=4520.25, rate=0.043)        # full solve
+# quotes = surface.update(next_chain, spot=4520.25, rate=0.043)  # only moved quotes
+# wing = surface.smile_vol(0.25, [4000, 4200, 4800])
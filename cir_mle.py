@@ -0,0 +1,243 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+from scipy.special import ive
+from scipy.stats import ncx2
+
+PARAMS = ['kappa', 'theta', 'sigma']
+BOUNDS = [(1e-6, None), (1e-8, None), (1e-6, None)]
+# Cap on the closed-form sigma guess (rates in decimal, sigma per sqrt(rate * year))
+SIGMA_GUESS_MAX = 2.0
+
+
+def _transitions(rates):
+    rates = np.asarray(rates, dtype=float)
+    r0, r1 = rates[:-1], rates[1:]
+    # Pair consecutive observations first: a gap must not join the rates either side of it.
+    # The Euler variance and the exact density both need a positive starting rate.
+    keep = np.isfinite(r0) & np.isfinite(r1) & (r0 > 0)
+    return r0[keep], r1[keep]
+
+
+def _nll_euler(params, r0, r1, dt):
+    """
+    Euler-Gaussian negative log-likelihood and its analytic gradient:
+    r1 | r0 ~ N(r0 + kappa (theta - r0) dt, sigma^2 r0 dt).
+    """
+    kappa, theta, sigma = params
+    e = r1 - r0 - kappa * (theta - r0) * dt
+    var = sigma**2 * r0 * dt
+    z = e / var
+    nll = 0.5 * np.sum(np.log(2 * np.pi * var) + e * z)
+    grad = np.array([
+        -np.sum(z * (theta - r0)) * dt,
+        -np.sum(z) * kappa * dt,
+        np.sum(1 - e * z) / sigma,
+    ])
+    return nll, grad
+
+
+def _log_iv(q, z):
+    # log I_q(z) from the exponentially scaled Bessel function
+    with np.errstate(divide='ignore'):
+        return np.log(ive(q, z)) + z
+
+
+def _logp_ncx2(params, r0, r1, dt):
+    # log p through scipy's noncentral chi-square density: 2 c r1 ~ ncx2(2q + 2, 2u)
+    kappa, theta, sigma = params
+    a = np.exp(-kappa * dt)
+    c = 2 * kappa / (sigma**2 * (1 - a))
+    q = 2 * kappa * theta / sigma**2 - 1
+    return np.log(2 * c) + ncx2.logpdf(2 * c * r1, 2 * q + 2, 2 * c * r0 * a)
+
+
+def _nll_exact(params, r0, r1, dt, h=1e-6):
+    """
+    Exact (noncentral chi-square) negative log-likelihood and its gradient.
+
+    With a = e^(-kappa dt), c = 2 kappa / (sigma^2 (1 - a)), u = c r0 a, v = c r1,
+    q = 2 kappa theta / sigma^2 - 1 and z = 2 sqrt(u v):
+    log p = log c - u - v + q/2 log(v / u) + log I_q(z).
+    The gradient is analytic except d/dq log I_q(z), a central difference.
+    Rows where the Bessel form underflows use scipy's density, and rows where
+    it or its ratios break down get a central-difference gradient of that
+    density, so value and gradient cover the same rows.
+    A gradient that is still not finite is returned as NaN, not dropped.
+    """
+    kappa, theta, sigma = params
+    a = np.exp(-kappa * dt)
+    c = 2 * kappa / (sigma**2 * (1 - a))
+    u = c * r0 * a
+    v = c * r1
+    q = 2 * kappa * theta / sigma**2 - 1
+    z = 2 * np.sqrt(u * v)
+
+    log_i = _log_iv(q, z)
+    logp = np.log(c) - u - v + 0.5 * q * np.log(v / u) + log_i
+    bad = ~np.isfinite(logp)
+    if bad.any():
+        # Bessel underflow far in the tails: fall back to scipy's density
+        logp[bad] = _logp_ncx2(params, r0[bad], r1[bad], dt)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dlog_i_dz = ive(q + 1, z) / ive(q, z) + q / z
+        dlog_i_dq = (_log_iv(q + h, z) - _log_iv(q - h, z)) / (2 * h)
+
+    dlogp_dc = (1 - u - v + dlog_i_dz * z) / c
+    dlogp_da = -c * r0 - 0.5 * q / a + dlog_i_dz * z / (2 * a)
+    dlogp_dq = 0.5 * np.log(v / u) + dlog_i_dq
+
+    dc_dkappa = c * (1 / kappa - dt * a / (1 - a))
+    da_dkappa = -dt * a
+    # Per-row gradient of log p, (3, n_obs)
+    g = np.array([
+        dlogp_dc * dc_dkappa + dlogp_da * da_dkappa + dlogp_dq * 2 * theta / sigma**2,
+        dlogp_dq * 2 * kappa / sigma**2,
+        dlogp_dc * (-2 * c / sigma) + dlogp_dq * (-2 * (q + 1) / sigma),
+    ])
+    # Fallback rows, and rows whose Bessel ratios broke down (e.g. order q - h < -1),
+    # get the central difference of scipy's density
+    redo = bad | ~np.isfinite(g).all(axis=0)
+    if redo.any():
+        params = np.asarray(params, dtype=float)
+        for j in range(3):
+            step = np.zeros(3)
+            step[j] = h * params[j]
+            g[j, redo] = (_logp_ncx2(params + step, r0[redo], r1[redo], dt)
+                          - _logp_ncx2(params - step, r0[redo], r1[redo], dt)) / (2 * step[j])
+    return -np.sum(logp), -g.sum(axis=1)
+
+
+def cir_nll(params, rates, dt, method='euler', grad=False):
+    """
+    Negative log-likelihood of a CIR model over a rate series, vectorized.
+
+    Parameters:
+    - params: (kappa, theta, sigma)
+    - rates: observed rates (decimal), in time order; transitions touching a NaN are dropped
+    - dt: time step between observations in years (e.g. 1/252)
+    - method: 'euler' (Gaussian approximation) or 'exact' (noncentral chi-square)
+    - grad: also return the gradient in params
+
+    Returns:
+    - nll (and its gradient as an array if grad)
+    """
+    r0, r1 = _transitions(rates)
+    if method == 'euler':
+        nll, g = _nll_euler(params, r0, r1, dt)
+    elif method == 'exact':
+        nll, g = _nll_exact(params, r0, r1, dt)
+    else:
+        raise ValueError("method must be 'euler' or 'exact'.")
+    return (nll, g) if grad else nll
+
+
+def cir_initial_guess(rates, dt):
+    """
+    Closed-form starting point from the Euler discretization
+    r1 - r0 = kappa theta dt - kappa dt r0 + sigma sqrt(r0 dt) eps:
+    kappa and theta by OLS on the raw increments, then
+    sigma^2 = sum(resid^2) / (dt sum(r0)), capped at SIGMA_GUESS_MAX.
+
+    The increments are not divided by sqrt(r0): near-zero rates (common for
+    T-bills) would blow those rows up and dominate the fit.
+    """
+    r0, r1 = _transitions(rates)
+    X = np.column_stack([np.full(len(r0), dt), -dt * r0])
+    (kappa_theta, kappa), *_ = np.linalg.lstsq(X, r1 - r0, rcond=None)
+    kappa = max(kappa, 1e-2)
+    theta = kappa_theta / kappa if kappa_theta > 0 else float(np.mean(r0))
+    resid = r1 - r0 - kappa * (theta - r0) * dt
+    sigma = float(np.sqrt(np.sum(resid**2) / (dt * np.sum(r0))))
+    return np.array([kappa, theta, min(max(sigma, 1e-4), SIGMA_GUESS_MAX)])
+
+
+def _fit(objective, x0, r0, r1, dt):
+    # L-BFGS-B on params / x0: kappa (~1) and theta (~1e-3) on one scale, so the
+    # relative-reduction stop does not fire while theta is still moving
+    scale = np.abs(x0)
+
+    def scaled(y):
+        nll, g = objective(y * scale, r0, r1, dt)
+        return nll, g * scale
+
+    bounds = [(lo / s, None) for (lo, _), s in zip(BOUNDS, scale)]
+    with np.errstate(all='ignore'):
+        res = minimize(scaled, np.ones(len(x0)), jac=True, method='L-BFGS-B', bounds=bounds)
+    res.x = res.x * scale
+    return res
+
+
+def calibrate_cir(rates, dt=1/252, method='euler', x0=None):
+    """
+    Maximum-likelihood CIR parameters with L-BFGS-B and analytic gradients.
+
+    With 'exact', the Euler optimum is tried as a start next to x0 and the one
+    with the lower exact likelihood is kept: near zero the Euler density is a
+    poor fit (its variance vanishes with r0) and its optimum can be far off.
+    success is False if the optimizer fails or the final gradient is not finite.
+
+    Parameters:
+    - rates: observed rates (decimal), in time order
+    - dt: time step between observations in years
+    - method: 'euler' or 'exact', see cir_nll()
+    - x0: optional starting (kappa, theta, sigma); default cir_initial_guess()
+
+    Returns:
+    - dict with kappa, theta, sigma, nll, success, n_obs
+    """
+    r0, r1 = _transitions(rates)
+    if x0 is None:
+        x0 = cir_initial_guess(rates, dt)
+    x0 = np.asarray(x0, dtype=float)
+    if method == 'exact':
+        # The Euler optimum is usually a close, cheap start for the exact likelihood
+        starts = [x0, _fit(_nll_euler, x0, r0, r1, dt).x]
+        with np.errstate(all='ignore'):
+            nll0 = [_nll_exact(x, r0, r1, dt)[0] for x in starts]
+        x0 = starts[int(np.argmin(np.nan_to_num(nll0, nan=np.inf)))]
+    objective = _nll_euler if method == 'euler' else _nll_exact
+    res = _fit(objective, x0, r0, r1, dt)
+    with np.errstate(all='ignore'):
+        grad_ok = bool(np.all(np.isfinite(objective(res.x, r0, r1, dt)[1])))
+    return {**dict(zip(PARAMS, res.x)), 'nll': float(res.fun),
+            'success': bool(res.success) and grad_ok, 'n_obs': len(r0)}
+
+
+def _calibrate_column(args):
+    name, rates, dt, method = args
+    return name, calibrate_cir(rates, dt, method)
+
+
+def calibrate_cir_batch(df_yields, dt=1/252, method='euler', max_workers=None):
+    """
+    Calibrate every T-bill bucket (column of df_yields) in parallel.
+
+    Parameters:
+    - df_yields: DataFrame of rates (decimal), one column per bucket (Tbill1M...Tbill12M)
+    - dt: time step between rows in years
+    - method: 'euler' or 'exact'
+    - max_workers: processes to use (default: os.cpu_count(); 1 runs in-process)
+
+    Returns:
+    - DataFrame indexed by bucket: kappa, theta, sigma, nll, success, n_obs
+    """
+    tasks = [(col, df_yields[col].to_numpy(dtype=float), dt, method) for col in df_yields.columns]
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(tasks) == 1:
+        results = map(_calibrate_column, tasks)
+        return pd.DataFrame.from_dict(dict(results), orient='index')
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(tasks))) as pool:
+        results = dict(pool.map(_calibrate_column, tasks))
+    return pd.DataFrame.from_dict(results, orient='index').loc[list(df_yields.columns)]
+
+
+# -------------------------
+# Example usage:
+# -------------------------
+# params = calibrate_cir_batch(df_yields[['Tbill1M', 'Tbill3M', 'Tbill6M', 'Tbill12M']],
+#                              dt=1/252, method='exact')
@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+
+from mc_tools import make_rng, spawn_rngs, normals
+
+
+# === Transitions ===
+
+def cir_step(r, kappa, theta, sigma, dt, rng, scheme='exact'):
+    """
+    Advance CIR rates by one step of length dt.
+
+    Parameters:
+    - r: current rates (array, one per path)
+    - kappa, theta, sigma: CIR parameters
+    - dt: step length in years
+    - rng: numpy.random.Generator
+    - scheme: 'exact' (noncentral chi-square transition, no discretization
+              bias, rates stay non-negative) or 'euler' (truncated Euler, as in
+              bibi.simulate_cir_paths)
+
+    Returns:
+    - rates at t + dt
+    """
+    if scheme == 'exact':
+        # 2 c r(t+dt) | r(t) ~ chi'^2(4 kappa theta / sigma^2, 2 c r(t) e^(-kappa dt))
+        decay = np.exp(-kappa * dt)
+        c = 2 * kappa / (sigma**2 * (1 - decay))
+        df = 4 * kappa * theta / sigma**2
+        return rng.noncentral_chisquare(df, 2 * c * r * decay) / (2 * c)
+    if scheme == 'euler':
+        dW = np.sqrt(dt) * normals(rng, r.shape)
+        return np.maximum(r + kappa * (theta - r) * dt + sigma * np.sqrt(np.maximum(r, 0)) * dW, 0)
+    raise ValueError("scheme must be 'exact' or 'euler'.")
+
+
+def iter_cir_steps(r0, kappa, theta, sigma, T, n_steps, n_paths, rng=None, scheme='exact'):
+    """
+    Yield (step, rates) for step = 0..n_steps, one array of n_paths rates at
+    a time, so path statistics can be accumulated without storing the paths.
+    """
+    rng = make_rng(rng)
+    dt = T / n_steps
+    r = np.full(n_paths, float(r0))
+    yield 0, r
+    for step in range(1, n_steps + 1):
+        r = cir_step(r, kappa, theta, sigma, dt, rng, scheme)
+        yield step, r
+
+
+def simulate_cir_exact(r0, kappa, theta, sigma, T, n_steps, n_paths, rng=None, scheme='exact'):
+    """
+    Full CIR paths, shape (n_paths, n_steps + 1). Memory grows with
+    n_paths x n_steps: use cir_path_stats() for large runs.
+    """
+    paths = np.empty((n_paths, n_steps + 1))
+    for step, r in iter_cir_steps(r0, kappa, theta, sigma, T, n_steps, n_paths, rng, scheme):
+        paths[:, step] = r
+    return paths
+
+
+# === Online path statistics ===
+
+class PathStats:
+    """
+    Per-path statistics accumulated one time step at a time: running min and
+    max, time average over the grid (r0 included), terminal rate and the
+    first time each barrier is crossed from above (r < barrier; NaN if never).
+    """
+
+    def __init__(self, n_paths, barriers=(), dt=1.0):
+        self.barriers = np.atleast_1d(np.asarray(barriers, dtype=float))
+        self.dt = dt
+        self.min = np.full(n_paths, np.inf)
+        self.max = np.full(n_paths, -np.inf)
+        self.total = np.zeros(n_paths)
+        self.hit = np.full((len(self.barriers), n_paths), np.nan)
+        self.terminal = None
+        self.n_points = 0
+
+    def update(self, step, r):
+        np.minimum(self.min, r, out=self.min)
+        np.maximum(self.max, r, out=self.max)
+        self.total += r
+        for j, barrier in enumerate(self.barriers):
+            new = np.isnan(self.hit[j]) & (r < barrier)
+            self.hit[j, new] = step * self.dt
+        self.terminal = r
+        self.n_points += 1
+        return self
+
+    def to_frame(self):
+        frame = pd.DataFrame({'min': self.min, 'max': self.max,
+                              'mean': self.total / max(self.n_points, 1),
+                              'terminal': self.terminal})
+        for barrier, hit in zip(self.barriers, self.hit):
+            frame[f'hit_{barrier:g}'] = hit
+        return frame
+
+
+def cir_path_stats(r0, kappa, theta, sigma, T, n_steps, n_paths, barriers=(), seed=None,
+                   chunk_size=100_000, scheme='exact'):
+    """
+    Simulate CIR paths in chunks and keep only their path statistics.
+
+    Memory is O(chunk_size) for the simulation plus O(n_paths) for the
+    returned statistics, whatever n_steps. Chunk i always uses stream i of
+    spawn_rngs(seed), so results are reproducible for a given chunk_size.
+
+    Parameters:
+    - r0: initial rate
+    - kappa, theta, sigma: CIR parameters
+    - T: horizon in years
+    - n_steps: time steps
+    - n_paths: number of paths
+    - barriers: rate levels whose first hitting time (from above) is recorded
+    - seed: seed or numpy.random.Generator
+    - chunk_size: paths simulated at once
+    - scheme: 'exact' or 'euler', see cir_step()
+
+    Returns:
+    - DataFrame, one row per path: min, max, mean, terminal, hit_<barrier> (years, NaN if never)
+    """
+    dt = T / n_steps
+    n_chunks = -(-n_paths // chunk_size)
+    frames = []
+    for i, rng in enumerate(spawn_rngs(seed, n_chunks)):
+        n = min(chunk_size, n_paths - i * chunk_size)
+        stats = PathStats(n, barriers, dt)
+        for step, r in iter_cir_steps(r0, kappa, theta, sigma, T, n_steps, n, rng, scheme):
+            stats.update(step, r)
+        frames.append(stats.to_frame())
+    return pd.concat(frames, ignore_index=True)
+
+
+# -------------------------
+# Example usage:
+# -------------------------
+# stats = cir_path_stats(0.05, 0.5, 0.05, 0.1, T=5.0, n_steps=1260, n_paths=1_000_000,
+#                        barriers=[0.0475], seed=42)
+# prob_cut = stats['hit_0.0475'].notna().mean()
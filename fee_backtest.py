@@ -0,0 +1,162 @@
+import importlib
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from fee_core import PANEL_KEYS, sort_panel, rolling_by_stock
+
+# name -> (module, function, output column). Modules are imported lazily:
+# fofoswa.py runs its FX swap example on import.
+FEE_MODELS = {
+    'signals': ('test', 'smooth_fee_with_signals', 'fee_pred'),
+    'signals_retro': ('riz', 'smooth_fee_with_signals', 'fee_pred'),
+    'regime': ('new', 'smooth_fee_with_regime_logic', 'fee_pred'),
+    'adjusted': ('fofoswa', 'compute_adjusted_fee', 'fee_adjusted'),
+    'fee_model': ('fofoswa', 'build_fee_model', 'fee_pred'),
+}
+
+
+def resolve_model(model):
+    """
+    Turn a FEE_MODELS name or a (callable, output column) pair into (callable, output column).
+    """
+    if isinstance(model, str):
+        module, func, out_col = FEE_MODELS[model]
+        return getattr(importlib.import_module(module), func), out_col
+    func, out_col = model
+    return func, out_col
+
+
+def label_regimes(df, window=20, spike_multiplier=2):
+    """
+    Tag each row 'spike' when the fee is above spike_multiplier x its trailing
+    rolling median, 'normal' otherwise (df must be sorted by stock, date).
+    """
+    fee = df['fee'].to_numpy(dtype=float)
+    fee_med = rolling_by_stock(fee, df['stock'].to_numpy(), window, window // 2, 'median')
+    return np.where(fee > spike_multiplier * fee_med, 'spike', 'normal')
+
+
+def walk_forward_folds(dates, n_folds=5, min_history=60):
+    """
+    Split the sorted unique dates into n_folds consecutive test blocks after a
+    min_history warm-up. Returns a list of (first_test_date, last_test_date).
+    """
+    dates = np.sort(pd.unique(dates))
+    if len(dates) <= min_history:
+        raise ValueError("Not enough dates for the requested warm-up period.")
+    blocks = np.array_split(dates[min_history:], n_folds)
+    return [(b[0], b[-1]) for b in blocks if len(b)]
+
+
+def _peak_memory(func, data, params):
+    tracemalloc.start()
+    try:
+        func(data, **params)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def backtest_fee_models(df,
+                        models=tuple(FEE_MODELS),
+                        model_params=None,
+                        n_folds=5,
+                        min_history=60,
+                        lookback=None,
+                        horizon=1,
+                        regime_col=None,
+                        measure_memory=True):
+    """
+    Walk-forward comparison of fee models on one stock/date panel.
+
+    For every fold each model only sees data up to the fold's last date; its
+    predictions inside the fold are scored against the realized fee horizon
+    days later. Runtime is wall-clock over all folds; peak memory is traced
+    in a separate run on the largest fold so tracing does not skew timings.
+
+    Parameters:
+    - df: DataFrame with ['stock', 'date', 'fee', 'fee_second', 'price']
+    - models: FEE_MODELS names or {name: (callable, output column)}
+    - model_params: {name: kwargs} passed to each model
+    - n_folds: number of walk-forward test blocks
+    - min_history: dates used only as warm-up before the first fold
+    - lookback: dates of history kept before each fold (None = expanding)
+    - horizon: days ahead the realized fee is taken
+    - regime_col: column holding regime labels (default: label_regimes())
+    - measure_memory: trace peak memory per model
+
+    Returns:
+    - dict with 'predictions', 'by_stock', 'by_regime' and 'summary' DataFrames
+    """
+    model_params = model_params or {}
+    if not isinstance(models, dict):
+        models = {name: name for name in models}
+
+    df = sort_panel(df).reset_index(drop=True)
+    df['realized'] = df.groupby('stock')['fee'].shift(-horizon)
+    df['regime'] = df[regime_col].to_numpy() if regime_col else label_regimes(df)
+    scored = df[PANEL_KEYS + ['realized', 'regime']]
+
+    dates = np.sort(df['date'].unique())
+    folds = walk_forward_folds(dates, n_folds=n_folds, min_history=min_history)
+    base_cols = ['stock', 'date', 'fee', 'fee_second', 'price']
+
+    predictions, timings = [], []
+    for name, spec in models.items():
+        func, out_col = resolve_model(spec)
+        params = model_params.get(name, {})
+        elapsed = 0.0
+        largest = None
+
+        for fold, (test_start, test_end) in enumerate(folds):
+            in_window = df['date'] <= test_end
+            if lookback is not None:
+                first = dates[max(np.searchsorted(dates, test_start) - lookback, 0)]
+                in_window &= df['date'] >= first
+            history = df.loc[in_window, base_cols]
+            largest = history
+
+            t0 = time.perf_counter()
+            out = func(history, **params)
+            elapsed += time.perf_counter() - t0
+
+            out = out.loc[out['date'] >= test_start, PANEL_KEYS + [out_col]]
+            out = out.rename(columns={out_col: 'prediction'})
+            out['model'] = name
+            out['fold'] = fold
+            predictions.append(out)
+
+        peak = _peak_memory(func, largest, params) if measure_memory else np.nan
+        timings.append({'model': name, 'runtime_s': elapsed, 'peak_memory_mb': peak / 2**20})
+
+    preds = pd.concat(predictions, ignore_index=True).merge(scored, on=PANEL_KEYS, how='left')
+    preds['error'] = preds['prediction'] - preds['realized']
+    preds['abs_error'] = preds['error'].abs()
+    preds['sq_error'] = preds['error'] ** 2
+
+    def _metrics(keys):
+        g = preds.dropna(subset=['error']).groupby(keys)
+        out = g.agg(mae=('abs_error', 'mean'), mse=('sq_error', 'mean'),
+                    bias=('error', 'mean'), n_obs=('error', 'size'))
+        out['rmse'] = np.sqrt(out.pop('mse'))
+        return out.reset_index()
+
+    summary = _metrics(['model']).merge(pd.DataFrame(timings), on='model')
+    return {
+        'predictions': preds.drop(columns=['abs_error', 'sq_error']),
+        'by_stock': _metrics(['model', 'stock']),
+        'by_regime': _metrics(['model', 'regime']),
+        'summary': summary.sort_values('rmse').reset_index(drop=True),
+    }
+
+
+# -------------------------
+# Example usage:
+# -------------------------
+# report = backtest_fee_models(df, n_folds=6, min_history=120)
+# print(report['summary'])     # accuracy + runtime_s + peak_memory_mb per model
+# print(report['by_regime'])   # error split by 'normal' / 'spike' days
@@ -0,0 +1,91 @@
+import pandas as pd
+
+from fee_lean import LEAN_MODELS, panel_arrays, _finish
+
+# The nightly set: one variant per model, default parameters
+DEFAULT_VARIANTS = {
+    'signals': ('signals', {}),
+    'signals_retro': ('signals_retro', {}),
+    'adjusted': ('adjusted', {}),
+    'fee_model': ('fee_model', {}),
+}
+
+
+def _resolve_variants(variants):
+    """
+    Normalize variants to {column: (model, params)}. Accepts a list of model
+    names, or a dict whose values are a model name or a (model, params) pair.
+    """
+    if variants is None:
+        variants = DEFAULT_VARIANTS
+    if not isinstance(variants, dict):
+        variants = {name: name for name in variants}
+
+    resolved = {}
+    for column, spec in variants.items():
+        model, params = (spec, {}) if isinstance(spec, str) else spec
+        if model not in LEAN_MODELS:
+            raise ValueError(f"Unknown model '{model}' for '{column}'. "
+                             f"Choose from {sorted(LEAN_MODELS)}.")
+        resolved[column] = (model, dict(params))
+    return resolved
+
+
+def score_fee_models(df, variants=None, presorted=None, output='keys', compact=False,
+                     backend='auto', return_cache=False):
+    """
+    Run several fee models / parameter variants over one panel, computing the
+    shared base features once.
+
+    Returns, price volatilities and fee rolling stats are memoized per
+    (series, window, stat) and reused by every variant that needs them, so
+    e.g. build_fee_model's price_vol and smooth_fee_with_signals' volatility
+    over the same window cost one rolling pass. Each variant's output equals
+    what its model produces on its own.
+
+    Parameters:
+    - df: DataFrame with ['stock', 'date', 'fee', 'fee_second', 'price']
+    - variants: {column: model or (model, params)} with fee_lean.LEAN_MODELS
+                names, or a list of model names (default DEFAULT_VARIANTS)
+    - presorted: as in fee_lean.panel_arrays()
+    - output: 'keys' -> DataFrame [stock, date, <columns>] in (stock, date) order,
+              'frame' -> DataFrame of the columns on df's index,
+              'inplace' -> adds the columns to df and returns df
+    - compact: as in fee_lean.run_lean()
+    - backend: regime state machine backend, see fee_jit.resolve_backend()
+    - return_cache: also return the shared feature cache (for inspection)
+
+    Returns:
+    - result shaped by output (and the cache dict if requested)
+    """
+    if output not in ('keys', 'frame', 'inplace'):
+        raise ValueError("output must be 'keys', 'frame' or 'inplace'.")
+    variants = _resolve_variants(variants)
+    arrays, order = panel_arrays(df, presorted=presorted, compact=compact)
+    arrays['cache'] = {}
+
+    results = {}
+    for column, (model, params) in variants.items():
+        kernel = LEAN_MODELS[model][0]
+        results[column] = kernel(arrays, backend=backend, **params) \
+            .astype(arrays['float_dtype'], copy=False)
+
+    if output == 'keys':
+        result = pd.DataFrame({'stock': arrays['stock'], 'date': arrays['date'], **results})
+    else:
+        target = df if output == 'inplace' else pd.DataFrame(index=df.index)
+        for column, values in results.items():
+            _finish(target, arrays, order, column, values, 'inplace')
+        result = target
+    return (result, arrays['cache']) if return_cache else result
+
+
+# -------------------------
+# Example usage:
+# -------------------------
+# nightly = score_fee_models(df, {
+#     'fee_adjusted': 'adjusted',
+#     'fee_pred': 'fee_model',
+#     'fee_pred_signals': ('signals', {'rolling_window': 20}),
+#     'fee_pred_tight': ('fee_model', {'z_thresh': 1.5}),
+# })
@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+from pandas.api.indexers import BaseIndexer
+
+PANEL_KEYS = ['stock', 'date']
+
+
+def sort_panel(df):
+    """
+    Sort a fee panel by stock and date, the order every fee model works in.
+    """
+    return df.sort_values(PANEL_KEYS)
+
+
+def stock_starts(stock):
+    """
+    Boolean mask flagging the first row of each stock in a sorted panel.
+
+    Parameters:
+    - stock: array of stock identifiers, sorted so each stock is contiguous
+
+    Returns:
+    - np.ndarray of bool, True where a new stock block starts
+    """
+    stock = np.asarray(stock)
+    starts = np.ones(len(stock), dtype=bool)
+    starts[1:] = stock[1:] != stock[:-1]
+    return starts
+
+
+def pct_change_by_stock(price, starts):
+    """
+    Per-stock simple return, identical to groupby('stock')['price'].pct_change().
+    """
+    price = np.asarray(price, dtype=float)
+    out = np.full(len(price), np.nan)
+    out[1:] = price[1:] / price[:-1] - 1
+    out[starts] = np.nan
+    return out
+
+
+def log_return_by_stock(price, starts):
+    """
+    Per-stock log return, identical to groupby('stock')['price'].transform(lambda x: np.log(x).diff()).
+    """
+    log_price = np.log(np.asarray(price, dtype=float))
+    out = np.full(len(log_price), np.nan)
+    out[1:] = log_price[1:] - log_price[:-1]
+    out[starts] = np.nan
+    return out
+
+
+class StockWindowIndexer(BaseIndexer):
+    """
+    Trailing window of window_size rows that never reaches back past the
+    first row of the current stock (group_start[i]).
+    """
+
+    def get_window_bounds(self, num_values=0, min_periods=None, center=None, closed=None,
+                          step=None):
+        end = np.arange(1, num_values + 1, dtype=np.int64)
+        start = np.maximum(end - self.window_size, self.group_start)
+        return start, end
+
+
+def rolling_by_stock(values, stock, window, min_periods=None, stat='mean'):
+    """
+    Rolling statistic computed per stock in a single pass.
+
+    Gives the same numbers as
+    df.groupby('stock')[col].transform(lambda x: x.rolling(window, min_periods).<stat>())
+    without calling a Python lambda once per stock, and without the grouped
+    result index a groupby-rolling would build.
+
+    Parameters:
+    - values: array of observations, sorted by stock then date
+    - stock: array of stock identifiers aligned with values
+    - window: rolling window length
+    - min_periods: minimum observations (pandas semantics, None = window)
+    - stat: name of the pandas rolling method ('mean', 'std', 'median', ...)
+
+    Returns:
+    - np.ndarray aligned with values
+    """
+    starts = stock_starts(stock)
+    first_row = np.flatnonzero(starts)
+    group_start = first_row[np.cumsum(starts) - 1] if len(starts) else first_row
+    indexer = StockWindowIndexer(window_size=window, group_start=group_start)
+    rolled = pd.Series(np.asarray(values, dtype=float)).rolling(
+        indexer, min_periods=window if min_periods is None else min_periods)
+    return getattr(rolled, stat)().to_numpy()
+
+
+def apply_stress_multiplier(pred, ret, vol, stock, window, zscore_stats=None):
+    """
+    Stress stage of riz.py's smooth_fee_with_signals, fused and per stock.
+
+    On stress days (volatility rising with return > 10% or < 0, or return
+    < -3%) pred is scaled in place by 1 + |z_return| * max(z_vol, 0) / 10,
+    with the z-scores taken over a per-stock rolling window. The mask is
+    built first so the z-scores are only evaluated on the rows that need
+    them, and no intermediate columns are kept.
+
+    Parameters:
+    - pred: float array of base predictions, modified in place
+    - ret: per-stock simple return, sorted by stock then date
+    - vol: per-stock rolling volatility of ret
+    - stock: stock identifiers (or integer codes) aligned with pred
+    - window: rolling window of the z-score mean/std
+    - zscore_stats: optional precomputed [return mean, return std, vol mean, vol std]
+      rolling arrays (full length), e.g. shared with other models
+
+    Returns:
+    - pred
+    """
+    ret = np.asarray(ret)
+    vol = np.asarray(vol)
+    starts = stock_starts(stock)
+
+    vol_diff = np.empty(len(vol), dtype=vol.dtype)
+    vol_diff[1:] = vol[1:] - vol[:-1]
+    vol_diff[starts] = np.nan
+    stress = (vol_diff > 0) & ((ret > 0.10) | (ret < 0)) | (ret < -0.03)
+    del vol_diff
+    hit = np.flatnonzero(stress)
+    if not len(hit):
+        return pred
+
+    if zscore_stats is None:
+        # Generator: each full-length stat is dropped once its stress rows are taken
+        zscore_stats = (rolling_by_stock(x, stock, window, stat=stat)
+                        for x in (ret, vol) for stat in ('mean', 'std'))
+    ret_mean, ret_std, vol_mean, vol_std = (x[hit] for x in zscore_stats)
+    z_return = np.abs((ret[hit] - ret_mean) / ret_std)
+    z_vol = np.maximum((vol[hit] - vol_mean) / vol_std, 0)
+    pred[hit] *= 1 + (z_return * z_vol) / 10
+    return pred
+
+
+def run_length(values, starts, dtype=None):
+    """
+    Length of the current run of identical nonzero values, reset at each stock start.
+
+    Covers both the spike counters (count_consecutive on 0/1 flags) and the
+    directional memory counters (compute_memory on -1/0/+1 signals).
+
+    Parameters:
+    - values: array of flags or signals, sorted by stock then date
+    - starts: mask from stock_starts()
+    - dtype: compact integer type for the result (e.g. np.int16); counts
+      saturate at its maximum. None keeps the default int64.
+
+    Returns:
+    - np.ndarray of int, 0 wherever the value is 0
+    """
+    values = np.asarray(values)
+    n = len(values)
+    idx = np.arange(n, dtype=np.int32 if dtype is not None and n < 2**31 else np.int64)
+    new_run = np.asarray(starts, dtype=bool).copy()
+    if n:
+        new_run[0] = True
+        new_run[1:] |= values[1:] != values[:-1]
+    run_start = np.maximum.accumulate(np.where(new_run, idx, 0))
+    out = idx - run_start + 1
+    out[values == 0] = 0
+    if dtype is not None:
+        out = np.minimum(out, np.iinfo(dtype).max).astype(dtype)
+    return out
@@ -0,0 +1,293 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from fee_core import (PANEL_KEYS, sort_panel, stock_starts, pct_change_by_stock,
+                      log_return_by_stock, rolling_by_stock, run_length)
+
+RAW_COLS = ['price', 'fee']
+
+
+# === Feature definitions ===
+
+def _jump_col(spike_multiplier):
+    return f'jump_days_spike{spike_multiplier:g}'
+
+
+def _z_jump_col(z_threshold):
+    return f'jump_days_z{z_threshold:g}'
+
+
+def compute_features(a, window, spike_multipliers=(2,), z_thresholds=(2,)):
+    """
+    Window-dependent fee-model features for a sorted panel.
+
+    Column names follow the models that consume them:
+    - smooth_fee_with_signals (test.py, riz.py): return, volatility, fee_med,
+      jump_days_spike<m>, z_vol
+    - smooth_fee_with_regime_logic (new.py): log_return, log_volatility,
+      fee_mean, fee_z, jump_days_z<z>
+    - build_fee_model (fofoswa.py): return, price_vol, fee_mean_full, fee_vol,
+      fee_z_full, signal, memory
+
+    Parameters:
+    - a: dict of sorted arrays with 'price', 'fee', 'codes', 'starts'
+    - window: rolling window shared by all features
+    - spike_multipliers / z_thresholds: thresholds the streak counters are kept for
+
+    Returns:
+    - dict of feature name -> array
+    """
+    codes, starts = a['codes'], a['starts']
+    f = {}
+
+    ret = pct_change_by_stock(a['price'], starts)
+    f['return'] = ret
+    f['volatility'] = rolling_by_stock(ret, codes, window, window // 2, 'std')
+    f['fee_med'] = rolling_by_stock(a['fee'], codes, window, window // 2, 'median')
+    for m in spike_multipliers:
+        f[_jump_col(m)] = run_length(a['fee'] > m * f['fee_med'], starts)
+    vol = f['volatility']
+    f['z_vol'] = np.maximum((vol - rolling_by_stock(vol, codes, window, None, 'mean'))
+                            / rolling_by_stock(vol, codes, window, None, 'std'), 0)
+
+    f['log_return'] = log_return_by_stock(a['price'], starts)
+    f['log_volatility'] = rolling_by_stock(f['log_return'], codes, window, 5, 'std')
+    f['fee_mean'] = rolling_by_stock(a['fee'], codes, window, 5, 'mean')
+    f['fee_z'] = (a['fee'] - f['fee_mean']) / rolling_by_stock(a['fee'], codes, window, 5, 'std')
+    for z in z_thresholds:
+        f[_z_jump_col(z)] = run_length(f['fee_z'] > z, starts)
+
+    f['price_vol'] = rolling_by_stock(ret, codes, window, None, 'std')
+    f['fee_mean_full'] = rolling_by_stock(a['fee'], codes, window, None, 'mean')
+    f['fee_vol'] = rolling_by_stock(a['fee'], codes, window, None, 'std')
+    f['fee_z_full'] = (a['fee'] - f['fee_mean_full']) / f['fee_vol']
+    vol_median = rolling_by_stock(f['price_vol'], codes, window, None, 'median')
+    signal = np.zeros(len(ret), dtype=int)
+    signal[(ret < 0) & (f['price_vol'] > vol_median)] = 1
+    signal[(ret > 0) & (f['price_vol'] < vol_median)] = -1
+    f['signal'] = signal
+    f['memory'] = run_length(signal, starts)
+    return f
+
+
+def _counter_sources(features, spike_multipliers, z_thresholds):
+    # counter column -> the values whose runs it counts
+    sources = {_jump_col(m): (features[_jump_col(m)] > 0).astype(int) for m in spike_multipliers}
+    sources.update({_z_jump_col(z): (features[_z_jump_col(z)] > 0).astype(int)
+                    for z in z_thresholds})
+    sources['memory'] = features['signal']
+    return sources
+
+
+def carry_run_length(values, starts, prev_value, prev_count):
+    """
+    run_length() continued from a previous state: where a stock's first run
+    extends the run it ended on (same nonzero value), add the carried count.
+
+    Parameters:
+    - values: values of the new rows, sorted by stock then date
+    - starts: stock-start mask of the new rows
+    - prev_value / prev_count: per-row arrays, the last stored value and counter
+      of the row's stock (only read at stock starts)
+    """
+    out = run_length(values, starts)
+    values = np.asarray(values)
+    if not len(values):
+        return out
+    breaks = np.zeros(len(values), dtype=bool)
+    breaks[1:] = (values[1:] != values[:-1]) & ~starts[1:]
+    group = np.cumsum(starts) - 1
+    breaks_before = np.cumsum(breaks)
+    in_first_run = breaks_before == breaks_before[np.flatnonzero(starts)][group]
+    first = np.flatnonzero(starts)[group]
+    continues = (values[first] == prev_value[first]) & (prev_value[first] != 0)
+    return out + np.where(in_first_run & continues & (values != 0), prev_count, 0)
+
+
+# === Helpers for the models ===
+
+def attach_features(df, features, columns, window):
+    """
+    Copy precomputed feature columns onto a (sorted) model frame, aligned on stock/date.
+
+    Parameters:
+    - df: model frame with ['stock', 'date']
+    - features: frame from FeatureStore.load()
+    - columns: list of feature names, or {df column: feature name} to rename
+    - window: window the model runs with
+
+    Raises ValueError if the features were built for another window or do not
+    cover every row of df.
+    """
+    if not isinstance(columns, dict):
+        columns = {c: c for c in columns}
+    if 'window' in features and not (features['window'] == window).all():
+        raise ValueError(f"Features were not built for window {window}.")
+    missing = [c for c in columns.values() if c not in features]
+    if missing:
+        raise ValueError(f"Features missing column(s): {missing}")
+
+    keys = pd.MultiIndex.from_frame(df[PANEL_KEYS])
+    indexed = features.set_index(PANEL_KEYS)
+    if not keys.isin(indexed.index).all():
+        raise ValueError("Features do not cover every (stock, date) row of df.")
+    aligned = indexed[list(columns.values())].reindex(keys)
+    for target, source in columns.items():
+        df[target] = aligned[source].to_numpy()
+    return df
+
+
+# === Persisted store ===
+
+class FeatureStore:
+    """
+    Parquet feature store keyed by (stock, date, window).
+
+    Layout under path:
+    - _config.json            windows and counter thresholds
+    - w=<window>/part-*.parquet  feature rows, one file per build/append
+    - _state/w=<window>.parquet  last rows per stock (raw inputs + features),
+                                 the rolling state carried into the next append
+    """
+
+    def __init__(self, path, windows=(20,), spike_multipliers=(2,), z_thresholds=(2,)):
+        self.path = path
+        config_file = os.path.join(path, '_config.json')
+        if os.path.exists(config_file):
+            with open(config_file) as fh:
+                config = json.load(fh)
+        else:
+            config = {'windows': list(windows), 'spike_multipliers': list(spike_multipliers),
+                      'z_thresholds': list(z_thresholds)}
+        self.windows = config['windows']
+        self.spike_multipliers = config['spike_multipliers']
+        self.z_thresholds = config['z_thresholds']
+
+    @property
+    def tail_length(self):
+        # Longest dependency chain: a rolling stat of a rolling stat of returns
+        return 2 * max(self.windows) + 1
+
+    def _save_config(self):
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, '_config.json'), 'w') as fh:
+            json.dump({'windows': self.windows, 'spike_multipliers': self.spike_multipliers,
+                       'z_thresholds': self.z_thresholds}, fh)
+
+    def _state_file(self, window):
+        return os.path.join(self.path, '_state', f'w={window}.parquet')
+
+    @staticmethod
+    def _arrays(df):
+        starts = stock_starts(df['stock'].to_numpy())
+        return {'price': df['price'].to_numpy(dtype=float), 'fee': df['fee'].to_numpy(dtype=float),
+                'starts': starts, 'codes': np.cumsum(starts) - 1}
+
+    def _write(self, window, frame, tag):
+        part_dir = os.path.join(self.path, f'w={window}')
+        os.makedirs(part_dir, exist_ok=True)
+        pq.write_table(pa.Table.from_pandas(frame, preserve_index=False),
+                       os.path.join(part_dir, f'part-{tag}.parquet'))
+
+    def _save_state(self, window, frame):
+        os.makedirs(os.path.join(self.path, '_state'), exist_ok=True)
+        tail = frame.groupby('stock', sort=False).tail(self.tail_length)
+        pq.write_table(pa.Table.from_pandas(tail, preserve_index=False), self._state_file(window))
+
+    def build(self, df):
+        """
+        Compute features over the full history and (re)initialize the store.
+
+        Parameters:
+        - df: DataFrame with ['stock', 'date', 'price', 'fee']
+        """
+        df = sort_panel(df[PANEL_KEYS + RAW_COLS]).reset_index(drop=True)
+        a = self._arrays(df)
+        self._save_config()
+        tag = pd.Timestamp(df['date'].max()).strftime('%Y%m%d') + '-full'
+        for window in self.windows:
+            part_dir = os.path.join(self.path, f'w={window}')
+            if os.path.isdir(part_dir):
+                for name in os.listdir(part_dir):
+                    os.remove(os.path.join(part_dir, name))
+            feats = compute_features(a, window, self.spike_multipliers, self.z_thresholds)
+            frame = df.assign(window=window, **feats)
+            self._write(window, frame.drop(columns=RAW_COLS), tag)
+            self._save_state(window, frame)
+
+    def append(self, df_new):
+        """
+        Add new days. Only the carried tail of each stock and the new rows are
+        touched; streak counters continue from their stored values.
+
+        Parameters:
+        - df_new: DataFrame with ['stock', 'date', 'price', 'fee'] for dates after
+                  the last stored date of each stock
+        """
+        df_new = sort_panel(df_new[PANEL_KEYS + RAW_COLS]).reset_index(drop=True)
+        tag = pd.Timestamp(df_new['date'].max()).strftime('%Y%m%d')
+
+        for window in self.windows:
+            state = pq.read_table(self._state_file(window)).to_pandas()
+            last = state.groupby('stock').tail(1).set_index('stock')
+            last_date = df_new['stock'].map(last['date'])
+            if (df_new['date'] <= last_date).any():
+                raise ValueError("append() only accepts dates after the last stored date per stock.")
+
+            tail = state.loc[state['stock'].isin(df_new['stock']), PANEL_KEYS + RAW_COLS]
+            combined = sort_panel(pd.concat([tail.assign(_new=False), df_new.assign(_new=True)],
+                                            ignore_index=True)).reset_index(drop=True)
+            feats = compute_features(self._arrays(combined), window,
+                                     self.spike_multipliers, self.z_thresholds)
+            is_new = combined['_new'].to_numpy()
+            new_feats = {k: v[is_new] for k, v in feats.items()}
+
+            # Counters restart at the tail, so continue them from the stored state instead
+            starts = stock_starts(df_new['stock'].to_numpy())
+            prev = last.reindex(df_new['stock'])
+            for col, values in _counter_sources(new_feats, self.spike_multipliers,
+                                                self.z_thresholds).items():
+                prev_count = prev[col].fillna(0).to_numpy(dtype=int)
+                prev_value = prev['signal'].fillna(0).to_numpy() if col == 'memory' \
+                    else (prev_count > 0).astype(int)
+                new_feats[col] = carry_run_length(values, starts, prev_value, prev_count)
+
+            frame = df_new.assign(window=window, **new_feats)
+            self._write(window, frame.drop(columns=RAW_COLS), tag)
+            self._save_state(window, pd.concat([state, frame], ignore_index=True)
+                                         .sort_values(PANEL_KEYS, kind='stable'))
+
+    def load(self, window, stocks=None, start=None, end=None, columns=None):
+        """
+        Read stored features for one window, optionally filtered by stock and date range.
+
+        Returns:
+        - DataFrame with ['stock', 'date', 'window'] plus the feature columns,
+          sorted by stock and date; pass it as features= to the fee models
+        """
+        dataset = ds.dataset(os.path.join(self.path, f'w={window}'), format='parquet')
+        flt = None
+        for cond in (ds.field('stock').isin(list(stocks)) if stocks is not None else None,
+                     ds.field('date') >= pd.Timestamp(start) if start is not None else None,
+                     ds.field('date') <= pd.Timestamp(end) if end is not None else None):
+            if cond is not None:
+                flt = cond if flt is None else flt & cond
+        cols = None if columns is None else PANEL_KEYS + ['window'] + list(columns)
+        out = dataset.to_table(columns=cols, filter=flt).to_pandas()
+        return sort_panel(out).reset_index(drop=True)
+
+
+# -------------------------
+# Example usage:
+# -------------------------
+# store = FeatureStore('data/fee_features', windows=(20, 60))
+# store.build(history)                 # once
+# store.append(today)                  # every night: touches only today's rows
+# feats = store.load(20)
+# out = smooth_fee_with_signals(df, rolling_window=20, features=feats)
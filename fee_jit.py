@@ -0,0 +1,201 @@
+import numpy as np
+
+from fee_core import run_length
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:  # NumPy backend only
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+def resolve_backend(backend='auto'):
+    """
+    'auto' -> 'numba' when numba is installed, else 'numpy'. Asking for
+    'numba' without it installed raises ImportError.
+    """
+    if backend == 'auto':
+        return 'numba' if HAVE_NUMBA else 'numpy'
+    if backend == 'numba' and not HAVE_NUMBA:
+        raise ImportError("backend='numba' requires the numba package.")
+    if backend not in ('numba', 'numpy'):
+        raise ValueError("backend must be 'auto', 'numba' or 'numpy'.")
+    return backend
+
+
+# === Compiled state machines: one pass over the sorted panel ===
+# Arithmetic is written in the same order as the pandas models so fee_pred is
+# bit-identical between backends. The caller passes out and the float constants
+# in the working dtype (float32 under fee_lean's compact='float32'), as NumPy
+# would cast Python scalars against float32 arrays.
+
+@njit(cache=True)
+def _spike_regime_loop(fee, fee_second, fee_med, starts, spike_multiplier,
+                       min_persistence, blend_weight, blend_rest, retro, out):
+    n = len(fee)
+    count = 0
+    for i in range(n):
+        if starts[i]:
+            count = 0
+        if fee[i] > spike_multiplier * fee_med[i]:
+            count += 1
+        else:
+            count = 0
+
+        if count >= min_persistence:
+            base = blend_weight * fee_second[i] + blend_rest * fee[i]
+        else:
+            base = fee_med[i]
+
+        # riz.py retro billing: recover yesterday's shortfall on the confirmation day
+        if retro and count == min_persistence and not starts[i]:
+            miss = fee[i - 1] - out[i - 1]
+            if not miss < 0:  # max(miss, 0), NaN passing through
+                base += miss
+        out[i] = base
+    return out
+
+
+@njit(cache=True)
+def _zscore_regime_loop(fee, fee_second, fee_z, fee_mean, starts, z_threshold,
+                        min_persistence, blend_weight, blend_rest, out):
+    n = len(fee)
+    count = 0
+    for i in range(n):
+        if starts[i]:
+            count = 0
+        if fee_z[i] > z_threshold:
+            count += 1
+        else:
+            count = 0
+
+        if count >= min_persistence:
+            adjusted = blend_weight * fee_second[i] + blend_rest * fee[i]
+        else:
+            adjusted = fee_mean[i]
+        out[i] = adjusted
+        # new.py fixes the previous row on confirmation, across stock boundaries too
+        if i >= 1 and count == min_persistence:
+            out[i - 1] = adjusted
+    return out
+
+
+@njit(cache=True)
+def _memory_regime_loop(fee_base, signal, starts, memory_threshold, forced,
+                        alpha_smooth, alpha_regime):
+    n = len(signal)
+    out = np.empty(n)
+    count = 0
+    prev = 0
+    for i in range(n):
+        if starts[i]:
+            count = 0
+            prev = 0
+        s = signal[i]
+        if s != 0 and s == prev:
+            count += 1
+        elif s != 0:
+            count = 1
+        else:
+            count = 0
+        prev = s
+
+        if count >= memory_threshold or forced[i]:
+            alpha = alpha_regime
+        else:
+            alpha = alpha_smooth
+        out[i] = fee_base[i] * (1 + alpha * s)
+    return out
+
+
+# === Public entry points (dispatch on backend) ===
+# counter_dtype sets the integer type of the NumPy backend's streak counters
+# (np.int16 in fee_lean's compact mode); the compiled loops keep scalar counters.
+
+def _working_float(*arrays):
+    # dtype NumPy computes the blend in: float32 only if every input is float32
+    return np.result_type(*arrays).type
+
+def spike_regime(fee, fee_second, fee_med, starts, spike_multiplier=2, min_persistence=2,
+                 blend_weight=0.7, retro=False, backend='auto', counter_dtype=None):
+    """
+    Spike-confirmation state machine of smooth_fee_with_signals (test.py, and
+    riz.py with retro=True): count consecutive fee > spike_multiplier * fee_med
+    days, blend towards fee_second once min_persistence is reached and, with
+    retro, add back the previous day's shortfall on the confirmation day.
+
+    Returns:
+    - base_pred array
+    """
+    if resolve_backend(backend) == 'numba':
+        ftype = _working_float(fee, fee_second, fee_med)
+        return _spike_regime_loop(fee, fee_second, fee_med, starts, ftype(spike_multiplier),
+                                  min_persistence, ftype(blend_weight), ftype(1 - blend_weight),
+                                  retro, np.empty(len(fee), dtype=ftype))
+
+    jump_days = run_length(fee > spike_multiplier * fee_med, starts, counter_dtype)
+    base = np.where(jump_days >= min_persistence,
+                    blend_weight * fee_second + (1 - blend_weight) * fee,
+                    fee_med)
+    if retro:
+        hit = np.flatnonzero((jump_days == min_persistence) & ~starts)
+        if min_persistence >= 1:
+            # Confirmation days are never adjacent, so the update is order-free
+            base[hit] += np.maximum(fee[hit - 1] - base[hit - 1], 0)
+        else:
+            for i in hit:
+                base[i] += max(fee[i - 1] - base[i - 1], 0)
+    return base
+
+
+def zscore_regime(fee, fee_second, fee_z, fee_mean, starts, z_threshold=2, min_persistence=2,
+                  blend_weight=0.7, backend='auto', counter_dtype=None):
+    """
+    Regime state machine of smooth_fee_with_regime_logic (new.py): count
+    consecutive fee_z > z_threshold days, blend once confirmed and copy the
+    confirmed value onto the day before.
+
+    Returns:
+    - fee_pred before the return/volatility adjustment
+    """
+    if resolve_backend(backend) == 'numba':
+        ftype = _working_float(fee, fee_second, fee_mean)
+        return _zscore_regime_loop(fee, fee_second, fee_z, fee_mean, starts,
+                                   _working_float(fee_z)(z_threshold), min_persistence,
+                                   ftype(blend_weight), ftype(1 - blend_weight),
+                                   np.empty(len(fee), dtype=ftype))
+
+    jump_days = run_length(fee_z > z_threshold, starts, counter_dtype)
+    adjusted = np.where(jump_days >= min_persistence,
+                        blend_weight * fee_second + (1 - blend_weight) * fee,
+                        fee_mean)
+    out = adjusted.copy()
+    hit = np.flatnonzero(jump_days[1:] == min_persistence) + 1
+    out[hit - 1] = adjusted[hit]
+    return out
+
+
+def memory_regime(fee_base, signal, starts, memory_threshold=3, forced=None,
+                  alpha_smooth=0.03, alpha_regime=0.10, backend='auto', counter_dtype=None):
+    """
+    Directional-memory state machine of compute_adjusted_fee / build_fee_model
+    (fofoswa.py): count consecutive identical nonzero signals and scale
+    fee_base by alpha_regime once memory_threshold is reached (or where
+    forced, e.g. fee_z > z_thresh), alpha_smooth otherwise.
+
+    Returns:
+    - adjusted fee array
+    """
+    if forced is None:
+        forced = np.zeros(len(signal), dtype=bool)
+    if resolve_backend(backend) == 'numba':
+        return _memory_regime_loop(fee_base, signal, starts, memory_threshold, forced,
+                                   float(alpha_smooth), float(alpha_regime))
+
+    use_regime = (run_length(signal, starts, counter_dtype) >= memory_threshold) | forced
+    return fee_base * (1 + np.where(use_regime, alpha_regime, alpha_smooth) * signal)
@@ -0,0 +1,302 @@
+import numpy as np
+import pandas as pd
+
+from fee_core import (PANEL_KEYS, stock_starts, pct_change_by_stock, log_return_by_stock,
+                      rolling_by_stock, apply_stress_multiplier)
+from fee_jit import spike_regime, zscore_regime, memory_regime
+
+INPUT_COLS = ['fee', 'fee_second', 'price']
+
+# compact=False: float64 / int64 everywhere (bit-identical to the pandas models)
+# compact=True: bool flags, int8 signals, int16 streak counters (still bit-identical)
+# compact='float32': as True, plus float32 inputs, rolling features and output.
+#   Rolling stats are still accumulated in float64 by pandas and rounded after,
+#   so fee_pred stays within 5e-6 relative of the exact result (measured: up to
+#   4.6e-6 for signals_retro, ~2e-7 for the other models); rows whose fee sits
+#   within float32 rounding of a spike / z-score threshold can switch regime.
+#   The numba and NumPy regime backends compute in float32 alike (bit-identical).
+COMPACT_MODES = (False, True, 'float32')
+
+
+# === Panel handling ===
+
+def is_sorted_panel(df):
+    """
+    True if df is already ordered by stock, then date within each stock.
+    """
+    if not df['stock'].is_monotonic_increasing:
+        return False
+    stock = df['stock'].to_numpy()
+    date = df['date'].to_numpy()
+    same_stock = ~stock_starts(stock)[1:]
+    return bool(np.all(date[1:][same_stock] >= date[:-1][same_stock]))
+
+
+def panel_arrays(df, presorted=None, compact=False):
+    """
+    Pull the model inputs out of df as arrays in (stock, date) order, without
+    copying the frame.
+
+    Parameters:
+    - df: DataFrame with ['stock', 'date', 'fee', 'fee_second', 'price']
+    - presorted: True trusts the caller, False always sorts,
+                 None verifies with is_sorted_panel() and sorts only if needed
+    - compact: one of COMPACT_MODES
+
+    Returns:
+    - arrays: dict with 'stock', 'date', 'codes', 'starts', the input columns
+              and the dtypes the kernels should use
+    - order: row positions of df in sorted order, or None if df was already sorted
+    """
+    if compact not in COMPACT_MODES:
+        raise ValueError(f"compact must be one of {COMPACT_MODES}.")
+    float_dtype = np.float32 if compact == 'float32' else np.float64
+    if presorted is None:
+        presorted = is_sorted_panel(df)
+
+    order = None
+    if not presorted:
+        # Sort positions, not the frame: only the model columns get gathered
+        order = np.lexsort((df['date'].to_numpy(), df['stock'].to_numpy()))
+
+    arrays = {}
+    for col in PANEL_KEYS + INPUT_COLS:
+        values = df[col].to_numpy(dtype=float_dtype if col in INPUT_COLS else None)
+        arrays[col] = values if order is None else values[order]
+
+    starts = stock_starts(arrays['stock'])
+    arrays['starts'] = starts
+    # Integer group labels: cheaper to group on than the stock strings
+    arrays['codes'] = np.cumsum(starts, dtype=np.int32 if compact else np.int64) - 1
+    arrays['float_dtype'] = float_dtype
+    arrays['signal_dtype'] = np.int8 if compact else np.int64
+    arrays['counter_dtype'] = np.int16 if compact else None
+    return arrays, order
+
+
+def _dtypes(a):
+    # Kernels may also get bare arrays (fee_parallel workers): default to full precision
+    return (a.get('float_dtype', np.float64), a.get('signal_dtype', np.int64),
+            a.get('counter_dtype'))
+
+
+def _roll(a, values, window, min_periods, stat, key=None, dtype=None):
+    """
+    Per-stock rolling stat cast to the panel float dtype (or dtype).
+
+    When a carries a 'cache' dict (fee_batch), results are memoized under key,
+    a name for values. One pass per (key, window, stat) then serves every
+    min_periods: pandas applies min_periods only when emitting a window, so
+    masking on the window's observation count gives the same numbers.
+    """
+    dtype = _dtypes(a)[0] if dtype is None else dtype
+    cache = a.get('cache')
+    if cache is None or key is None:
+        return rolling_by_stock(values, a['codes'], window, min_periods, stat) \
+            .astype(dtype, copy=False)
+
+    if (key, window, stat) not in cache:
+        cache[key, window, stat] = rolling_by_stock(values, a['codes'], window, 1, stat)
+    if (key, window, 'count') not in cache:
+        cache[key, window, 'count'] = rolling_by_stock(~np.isnan(values) * 1.0, a['codes'],
+                                                       window, 0, 'sum')
+    out = cache[key, window, stat].astype(dtype)
+    out[cache[key, window, 'count'] < (window if min_periods is None else min_periods)] = np.nan
+    return out
+
+
+def _returns(a, kind='return'):
+    # 'return' (pct_change) or 'log_return' per stock, memoized like _roll
+    cache = a.get('cache')
+    if cache is not None and kind in cache:
+        return cache[kind]
+    func = pct_change_by_stock if kind == 'return' else log_return_by_stock
+    ret = func(a['price'], a['starts']).astype(_dtypes(a)[0], copy=False)
+    if cache is not None:
+        cache[kind] = ret
+    return ret
+
+
+def _finish(df, arrays, order, out_col, values, output):
+    """
+    Shape the model output: 'keys' -> [stock, date, out_col] in sorted order,
+    'array' -> bare ndarray in sorted order, 'series' -> Series on df's index
+    in df's own row order, 'inplace' -> column added to df.
+    """
+    if output == 'array':
+        return values
+    if output == 'keys':
+        return pd.DataFrame({'stock': arrays['stock'], 'date': arrays['date'], out_col: values})
+    if output in ('series', 'inplace'):
+        if order is not None:
+            unsorted = np.empty_like(values)
+            unsorted[order] = values
+            values = unsorted
+        if output == 'series':
+            return pd.Series(values, index=df.index, name=out_col)
+        df[out_col] = values
+        return df
+    raise ValueError("output must be 'keys', 'array', 'series' or 'inplace'.")
+
+
+# === Model kernels on sorted arrays ===
+# Each reproduces the corresponding pandas model's fee_pred exactly, but keeps
+# intermediates as scratch arrays released as soon as they are consumed.
+# The per-stock regime state machines run through fee_jit (backend='auto'
+# uses the compiled loops when numba is installed). With a['cache'] set
+# (fee_batch) returns and rolling stats are shared across kernels instead.
+
+def signals_kernel(a, rolling_window=20, min_persistence=2, spike_multiplier=2,
+                   blend_weight=0.7, adjustment_strength=0.2, backend='auto'):
+    """fee_pred of smooth_fee_with_signals in test.py."""
+    _, sdt, cdt = _dtypes(a)
+    min_periods = rolling_window // 2
+    ret = _returns(a)
+    vol = _roll(a, ret, rolling_window, min_periods, 'std', key='return')
+    direction = -np.sign(np.nan_to_num(ret * vol, nan=0.0))
+    del ret, vol
+
+    fee_med = _roll(a, a['fee'], rolling_window, min_periods, 'median', key='fee')
+    pred = spike_regime(a['fee'], a['fee_second'], fee_med, a['starts'], spike_multiplier,
+                        min_persistence, blend_weight, retro=False, backend=backend,
+                        counter_dtype=cdt)
+    del fee_med
+    pred *= 1 + adjustment_strength * direction
+    return pred
+
+
+def signals_retro_kernel(a, rolling_window=20, min_persistence=2, spike_multiplier=2,
+                         blend_weight=0.7, backend='auto'):
+    """fee_pred of smooth_fee_with_signals in riz.py (retro billing + stress multiplier)."""
+    _, sdt, cdt = _dtypes(a)
+    min_periods = rolling_window // 2
+    ret = _returns(a)
+    vol = _roll(a, ret, rolling_window, min_periods, 'std', key='return')
+
+    fee_med = _roll(a, a['fee'], rolling_window, min_periods, 'median', key='fee')
+    pred = spike_regime(a['fee'], a['fee_second'], fee_med, a['starts'], spike_multiplier,
+                        min_persistence, blend_weight, retro=True, backend=backend,
+                        counter_dtype=cdt)
+    del fee_med
+
+    zscore_stats = None
+    if 'cache' in a:
+        vol_key = ('return', rolling_window, min_periods, 'std')
+        # float64, as apply_stress_multiplier computes them when run alone
+        zscore_stats = [_roll(a, x, rolling_window, None, stat, key=key, dtype=np.float64)
+                        for x, key in ((ret, 'return'), (vol, vol_key))
+                        for stat in ('mean', 'std')]
+    apply_stress_multiplier(pred, ret, vol, a['codes'], rolling_window, zscore_stats)
+    return pred
+
+
+def regime_kernel(a, rolling_window=20, min_persistence=2, z_threshold=2, blend_weight=0.7,
+                  alpha=0.05, beta=0.1, gamma=0.1, backend='auto'):
+    """fee_pred of smooth_fee_with_regime_logic in new.py."""
+    _, sdt, cdt = _dtypes(a)
+    ret = _returns(a, 'log_return')
+    vol = _roll(a, ret, rolling_window, 5, 'std', key='log_return')
+
+    fee_mean = _roll(a, a['fee'], rolling_window, 5, 'mean', key='fee')
+    fee_z = (a['fee'] - fee_mean) / _roll(a, a['fee'], rolling_window, 5, 'std', key='fee')
+    pred = zscore_regime(a['fee'], a['fee_second'], fee_z, fee_mean, a['starts'], z_threshold,
+                         min_persistence, blend_weight, backend=backend, counter_dtype=cdt)
+    del fee_z, fee_mean
+
+    adj = (alpha * np.nan_to_num(ret, nan=0.0) + beta * np.nan_to_num(vol, nan=0.0)
+           + gamma * np.nan_to_num(ret * vol, nan=0.0))
+    del ret, vol
+    pred *= 1 + adj
+    return pred
+
+
+def _directional_signal(ret, vol, baseline, dtype=np.int64):
+    signal = np.zeros(len(ret), dtype=dtype)
+    signal[(ret < 0) & (vol > baseline)] = 1
+    signal[(ret > 0) & (vol < baseline)] = -1
+    return signal
+
+
+def adjusted_kernel(a, vol_window=5, vol_baseline_window=20, memory_threshold=3,
+                    alpha_smooth=0.03, alpha_regime=0.10, backend='auto'):
+    """fee_adjusted of compute_adjusted_fee in fofoswa.py."""
+    _, sdt, cdt = _dtypes(a)
+    ret = _returns(a)
+    vol = _roll(a, ret, vol_window, 2, 'std', key='return')
+    vol_base = _roll(a, vol, vol_baseline_window, 5, 'median',
+                     key=('return', vol_window, 2, 'std'))
+    signal = _directional_signal(ret, vol, vol_base, sdt)
+    del ret, vol, vol_base
+
+    fee, fee_second = a['fee'], a['fee_second']
+    fee_base = np.where(fee_second > fee, 0.7 * fee_second + 0.3 * fee, 0.5 * fee_second + 0.5 * fee)
+    return memory_regime(fee_base, signal, a['starts'], memory_threshold,
+                         alpha_smooth=alpha_smooth, alpha_regime=alpha_regime, backend=backend,
+                         counter_dtype=cdt)
+
+
+def fee_model_kernel(a, fee_window=20, price_window=20, signal_window=3, z_thresh=2,
+                     base_weight_high=0.7, alpha_smooth=0.02, alpha_regime=0.08, backend='auto'):
+    """fee_pred of build_fee_model in fofoswa.py."""
+    fdt, sdt, cdt = _dtypes(a)
+    ret = _returns(a)
+    price_vol = _roll(a, ret, price_window, None, 'std', key='return')
+    # build_fee_model takes this median over the whole frame, not per stock
+    vol_median = pd.Series(price_vol, dtype=float).rolling(price_window).median() \
+        .to_numpy().astype(fdt, copy=False)
+    signal = _directional_signal(ret, price_vol, vol_median, sdt)
+    del ret, price_vol, vol_median
+
+    fee, fee_second = a['fee'], a['fee_second']
+    fee_z = (fee - _roll(a, fee, fee_window, None, 'mean', key='fee')) \
+        / _roll(a, fee, fee_window, None, 'std', key='fee')
+    forced = fee_z > z_thresh
+    del fee_z
+
+    fee_base = np.where(fee_second > fee,
+                        base_weight_high * fee_second + (1 - base_weight_high) * fee,
+                        0.5 * fee_second + 0.5 * fee)
+    return memory_regime(fee_base, signal, a['starts'], signal_window, forced,
+                         alpha_smooth=alpha_smooth, alpha_regime=alpha_regime, backend=backend,
+                         counter_dtype=cdt)
+
+
+# name -> (kernel, output column); names match fee_backtest.FEE_MODELS
+LEAN_MODELS = {
+    'signals': (signals_kernel, 'fee_pred'),
+    'signals_retro': (signals_retro_kernel, 'fee_pred'),
+    'regime': (regime_kernel, 'fee_pred'),
+    'adjusted': (adjusted_kernel, 'fee_adjusted'),
+    'fee_model': (fee_model_kernel, 'fee_pred'),
+}
+
+
+def run_lean(model, df, presorted=None, output='keys', compact=False, **params):
+    """
+    Run a fee model without copying the panel or materializing intermediate columns.
+
+    Parameters:
+    - model: LEAN_MODELS name ('signals', 'signals_retro', 'regime', 'adjusted', 'fee_model')
+    - df: DataFrame with ['stock', 'date', 'fee', 'fee_second', 'price']
+    - presorted: True skips the sort check, None verifies it, False always sorts
+    - output: 'keys' -> DataFrame [stock, date, <pred>] in (stock, date) order,
+              'array' -> ndarray in (stock, date) order,
+              'series' -> Series aligned with df's rows,
+              'inplace' -> adds the prediction column to df and returns df
+    - compact: False, True or 'float32' -- see COMPACT_MODES
+    - params: model parameters, same names and defaults as the pandas models
+
+    Returns:
+    - see output
+    """
+    kernel, out_col = LEAN_MODELS[model]
+    arrays, order = panel_arrays(df, presorted=presorted, compact=compact)
+    values = kernel(arrays, **params).astype(arrays['float_dtype'], copy=False)
+    return _finish(df, arrays, order, out_col, values, output)
+
+
+# -------------------------
+# Example usage:
+# -------------------------
+# df = df.sort_values(['stock', 'date'], ignore_index=True)   # once, upstream
+# preds = run_lean('signals_retro', df, presorted=True)          # stock, date, fee_pred
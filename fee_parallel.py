@@ -0,0 +1,123 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from fee_lean import INPUT_COLS, LEAN_MODELS, panel_arrays, _finish
+
+# Columns the kernels read (plus the output); stock strings never leave the parent process
+SHARED_DTYPES = {**{col: np.float64 for col in INPUT_COLS}, 'codes': np.int64, 'out': np.float64}
+
+
+def shard_bounds(starts, n_shards):
+    """
+    Split a sorted panel into n_shards contiguous row ranges of similar size,
+    cutting only at stock boundaries.
+
+    Parameters:
+    - starts: mask from fee_core.stock_starts()
+    - n_shards: desired number of shards
+
+    Returns:
+    - list of (lo, hi) row ranges covering the panel
+    """
+    n = len(starts)
+    stock_first = np.flatnonzero(starts)
+    if not len(stock_first):
+        return []
+    targets = np.linspace(0, n, n_shards + 1)[1:-1]
+    # Snap each target row to the nearest stock start at or after it
+    cuts = stock_first[np.minimum(np.searchsorted(stock_first, targets), len(stock_first) - 1)]
+    edges = np.unique(np.concatenate([[0], cuts[cuts > 0], [n]]))
+    return list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+
+
+def _to_shared(values):
+    shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    view = np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)
+    view[:] = values
+    return shm
+
+
+def _run_shard(model, spec, lo, hi, params):
+    """
+    Worker: attach to the shared columns, run the kernel on rows [lo, hi) and
+    write the result into the shared output block.
+    """
+    handles = {}
+    try:
+        a = {}
+        for col, (name, dtype, n) in spec.items():
+            handles[col] = shared_memory.SharedMemory(name=name)
+            a[col] = np.ndarray((n,), dtype=dtype, buffer=handles[col].buf)[lo:hi]
+
+        out = a.pop('out')
+        a['codes'] = a['codes'] - a['codes'][0]
+        a['starts'] = np.ones(hi - lo, dtype=bool)
+        a['starts'][1:] = a['codes'][1:] != a['codes'][:-1]
+
+        kernel = LEAN_MODELS[model][0]
+        out[:] = kernel(a, **params)
+        del a, out
+    finally:
+        for shm in handles.values():
+            shm.close()
+    return hi - lo
+
+
+def run_parallel(model, df, max_workers=None, n_shards=None, presorted=None,
+                 output='series', **params):
+    """
+    Run a fee model across a process pool, sharded by stock.
+
+    The model columns are placed in shared memory once; workers receive only
+    the block names and their row range, run the lean kernel on that slice
+    and write fee_pred straight into a shared output array, so no DataFrame
+    is pickled either way.
+
+    Parameters:
+    - model: fee_lean.LEAN_MODELS name
+    - df: DataFrame with ['stock', 'date', 'fee', 'fee_second', 'price']
+    - max_workers: processes to use (default: os.cpu_count())
+    - n_shards: number of shards (default: 4 per worker, for load balancing)
+    - presorted: as in fee_lean.panel_arrays()
+    - output: as in fee_lean.run_lean(); the default 'series' is aligned with df's rows
+    - params: model parameters
+
+    Returns:
+    - model output shaped by output
+    """
+    if model not in LEAN_MODELS:
+        raise ValueError(f"Unknown model '{model}'. Choose from {sorted(LEAN_MODELS)}.")
+    max_workers = max_workers or os.cpu_count() or 1
+    arrays, order = panel_arrays(df, presorted=presorted)
+    n = len(arrays['codes'])
+    bounds = shard_bounds(arrays['starts'], n_shards or 4 * max_workers)
+
+    blocks = {}
+    try:
+        for col, dtype in SHARED_DTYPES.items():
+            values = np.full(n, np.nan) if col == 'out' else arrays[col]
+            blocks[col] = _to_shared(np.ascontiguousarray(values, dtype=dtype))
+        spec = {col: (shm.name, SHARED_DTYPES[col], n) for col, shm in blocks.items()}
+
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(_run_shard, model, spec, lo, hi, params) for lo, hi in bounds]
+            for f in futures:
+                f.result()
+
+        values = np.ndarray((n,), dtype=np.float64, buffer=blocks['out'].buf).copy()
+    finally:
+        for shm in blocks.values():
+            shm.close()
+            shm.unlink()
+
+    return _finish(df, arrays, order, LEAN_MODELS[model][1], values, output)
+
+
+# -------------------------
+# Example usage:
+# -------------------------
+# if __name__ == '__main__':
+#     df['fee_pred'] = run_parallel('signals_retro', df, max_workers=48)
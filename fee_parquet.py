@@ -0,0 +1,114 @@
+import os
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from fee_core import PANEL_KEYS
+from fee_lean import INPUT_COLS, run_lean
+
+
+def open_panel(path, partitioning='hive'):
+    """
+    Open a Parquet fee panel (directory partitioned by stock, e.g. stock=XYZ/part-0.parquet).
+    """
+    return ds.dataset(path, format='parquet', partitioning=partitioning)
+
+
+def stock_row_counts(dataset):
+    """
+    Rows per stock, read from partition keys and Parquet footers when the
+    dataset is partitioned by stock, else by streaming the 'stock' column.
+
+    Returns:
+    - dict stock -> row count, in stock order
+    """
+    counts = {}
+    fragments = list(dataset.get_fragments())
+    keys = [ds.get_partition_keys(f.partition_expression) for f in fragments]
+
+    if fragments and all('stock' in k for k in keys):
+        for frag, k in zip(fragments, keys):
+            counts[k['stock']] = counts.get(k['stock'], 0) + frag.count_rows()
+    else:
+        for batch in dataset.to_batches(columns=['stock']):
+            vc = batch.column('stock').value_counts()
+            for stock, n in zip(vc.field('values').to_pylist(), vc.field('counts').to_pylist()):
+                counts[stock] = counts.get(stock, 0) + n
+    return dict(sorted(counts.items()))
+
+
+def plan_stock_batches(counts, max_rows=5_000_000):
+    """
+    Group whole stocks into batches of at most max_rows rows (a stock larger
+    than max_rows gets a batch of its own).
+    """
+    batches, current, rows = [], [], 0
+    for stock, n in counts.items():
+        if current and rows + n > max_rows:
+            batches.append(current)
+            current, rows = [], 0
+        current.append(stock)
+        rows += n
+    if current:
+        batches.append(current)
+    return batches
+
+
+def run_fee_model_parquet(source, dest, model='signals', max_rows=5_000_000,
+                          keep_cols=(), partitioning='hive', **params):
+    """
+    Out-of-core fee model run: read stock batches from a Parquet panel, score
+    them independently and stream the predictions to Parquet.
+
+    Every fee model is per stock, so batching whole stocks gives the same
+    result as a single in-memory run. riz.py's vol_diff is taken per stock for
+    the same reason; build_fee_model's frame-wide volatility median only ever
+    spans one stock's rows (the leading NaNs of each stock blank out any
+    window crossing a boundary), so it batches safely as well.
+
+    Parameters:
+    - source: path of the input Parquet dataset
+    - dest: output directory, one file per batch (part-00000.parquet, ...)
+    - model: fee_lean.LEAN_MODELS name, or (callable, output column) for a pandas model
+    - max_rows: row budget per batch; bounds peak memory
+    - keep_cols: extra input columns copied to the output next to the keys
+    - partitioning: pyarrow partitioning of the source ('hive' for stock=XYZ/ directories)
+    - params: model parameters
+
+    Returns:
+    - list of written file paths
+    """
+    dataset = open_panel(source, partitioning=partitioning)
+    batches = plan_stock_batches(stock_row_counts(dataset), max_rows=max_rows)
+    columns = list(dict.fromkeys(PANEL_KEYS + INPUT_COLS + list(keep_cols)))
+    os.makedirs(dest, exist_ok=True)
+
+    written = []
+    for i, stocks in enumerate(batches):
+        df = dataset.to_table(columns=columns, filter=ds.field('stock').isin(stocks)).to_pandas()
+
+        if isinstance(model, str):
+            # The batch is ours: sort it in place so keep_cols line up with the keys
+            df.sort_values(PANEL_KEYS, inplace=True, ignore_index=True)
+            out = run_lean(model, df, presorted=True, output='keys', **params)
+            for col in keep_cols:
+                out[col] = df[col].to_numpy()
+        else:
+            func, out_col = model
+            out = func(df, **params)[PANEL_KEYS + list(keep_cols) + [out_col]]
+        del df
+
+        path = os.path.join(dest, f'part-{i:05d}.parquet')
+        pq.write_table(pa.Table.from_pandas(out, preserve_index=False), path)
+        written.append(path)
+        del out
+    return written
+
+
+# -------------------------
+# Example usage:
+# -------------------------
+# files = run_fee_model_parquet('data/fee_panel/', 'data/fee_pred/', model='signals_retro',
+#                               max_rows=2_000_000, rolling_window=20)
+# fee_pred = ds.dataset('data/fee_pred/').to_table().to_pandas()
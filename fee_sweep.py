@@ -0,0 +1,235 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from fee_core import (sort_panel, stock_starts, pct_change_by_stock,
+                      rolling_by_stock, run_length)
+
+SWEEP_PARAMS = ['rolling_window', 'min_persistence', 'spike_multiplier',
+                'blend_weight', 'adjustment_strength']
+
+DEFAULTS = {
+    'rolling_window': 20,
+    'min_persistence': 2,
+    'spike_multiplier': 2,
+    'blend_weight': 0.7,
+    'adjustment_strength': 0.2,
+}
+
+# Per-process state: base arrays are shipped once per worker, rolling stats
+# are cached per window and spike counters per (window, spike_multiplier).
+_STATE = {}
+
+
+def expand_grid(grid):
+    """
+    Turn {'param': [values, ...]} into a list of parameter dicts (cartesian product).
+    A list of dicts is passed through. Missing parameters take the model defaults.
+    """
+    if isinstance(grid, dict):
+        names = list(grid)
+        points = [dict(zip(names, combo)) for combo in itertools.product(*grid.values())]
+    else:
+        points = [dict(p) for p in grid]
+
+    for p in points:
+        unknown = set(p) - set(SWEEP_PARAMS)
+        if unknown:
+            raise ValueError(f"Unknown sweep parameter(s): {sorted(unknown)}")
+    return [{**DEFAULTS, **p} for p in points]
+
+
+def prepare_sweep_inputs(df, target='fee', horizon=1):
+    """
+    Compute everything in smooth_fee_with_signals that does not depend on the grid.
+
+    Parameters:
+    - df: DataFrame with ['stock', 'date', 'fee', 'fee_second', 'price']
+    - target: realized column the prediction is scored against
+    - horizon: days ahead of the prediction date the realized value is taken
+
+    Returns:
+    - dict of aligned NumPy arrays (sorted by stock, date)
+    """
+    df = sort_panel(df)
+    stock = df['stock'].to_numpy()
+    starts = stock_starts(stock)
+
+    realized = df.groupby('stock')[target].shift(-horizon).to_numpy(dtype=float)
+
+    return {
+        'stock': stock,
+        'starts': starts,
+        'fee': df['fee'].to_numpy(dtype=float),
+        'fee_second': df['fee_second'].to_numpy(dtype=float),
+        'return': pct_change_by_stock(df['price'].to_numpy(), starts),
+        'realized': realized,
+    }
+
+
+def _window_stats(inputs, cache, rolling_window):
+    if rolling_window not in cache:
+        min_periods = rolling_window // 2
+        volatility = rolling_by_stock(inputs['return'], inputs['stock'], rolling_window,
+                                      min_periods, 'std')
+        signal = inputs['return'] * volatility
+        cache[rolling_window] = {
+            'fee_med': rolling_by_stock(inputs['fee'], inputs['stock'], rolling_window,
+                                        min_periods, 'median'),
+            # Only the sign of the signal enters fee_pred
+            'direction': -np.sign(np.nan_to_num(signal, nan=0.0)),
+        }
+    return cache[rolling_window]
+
+
+def _jump_days(inputs, cache, rolling_window, spike_multiplier):
+    key = (rolling_window, spike_multiplier)
+    if key not in cache:
+        fee_med = _window_stats(inputs, cache, rolling_window)['fee_med']
+        fee_jump = (inputs['fee'] > spike_multiplier * fee_med).astype(int)
+        cache[key] = run_length(fee_jump, inputs['starts'])
+    return cache[key]
+
+
+def fee_pred_for_params(inputs, params, cache=None):
+    """
+    fee_pred of smooth_fee_with_signals (test.py) for one parameter set,
+    reusing cached rolling statistics.
+
+    Parameters:
+    - inputs: dict from prepare_sweep_inputs()
+    - params: dict with the SWEEP_PARAMS keys
+    - cache: dict reused across calls (window stats and spike counters)
+
+    Returns:
+    - np.ndarray of fee_pred aligned with the sorted panel
+    """
+    cache = {} if cache is None else cache
+    window = params['rolling_window']
+    blend_weight = params['blend_weight']
+
+    stats = _window_stats(inputs, cache, window)
+    jump_days = _jump_days(inputs, cache, window, params['spike_multiplier'])
+
+    base_pred = np.where(
+        jump_days >= params['min_persistence'],
+        blend_weight * inputs['fee_second'] + (1 - blend_weight) * inputs['fee'],
+        stats['fee_med']
+    )
+    return base_pred * (1 + params['adjustment_strength'] * stats['direction'])
+
+
+def common_score_mask(inputs, points, cache=None):
+    """
+    Rows every grid point is scored on: realized, fee and fee_second known and
+    the rolling median defined under every window in the grid (so, normally,
+    the rows valid under the largest window). Scoring each point on its own
+    valid rows would hand longer windows an easier, shorter sample (their
+    warm-up rows drop out) and make mae / rmse incomparable across windows.
+    """
+    cache = {} if cache is None else cache
+    mask = (np.isfinite(inputs['realized']) & np.isfinite(inputs['fee'])
+            & np.isfinite(inputs['fee_second']))
+    for window in sorted({p['rolling_window'] for p in points}):
+        mask &= np.isfinite(_window_stats(inputs, cache, window)['fee_med'])
+    return mask
+
+
+def score_prediction(fee_pred, realized, mask=None):
+    """
+    Error metrics of a prediction against realized fees (rows where both are
+    known, within mask if given).
+    """
+    known = np.isfinite(fee_pred) & np.isfinite(realized)
+    mask = known if mask is None else known & mask
+    err = fee_pred[mask] - realized[mask]
+    n = int(mask.sum())
+    if n == 0:
+        return {'mae': np.nan, 'rmse': np.nan, 'bias': np.nan, 'n_obs': 0}
+    return {
+        'mae': float(np.abs(err).mean()),
+        'rmse': float(np.sqrt(np.mean(err ** 2))),
+        'bias': float(err.mean()),
+        'n_obs': n,
+    }
+
+
+def _init_worker(inputs, cache=None):
+    _STATE.clear()
+    _STATE['inputs'] = inputs
+    _STATE['cache'] = {} if cache is None else cache
+
+
+def _evaluate_chunk(points):
+    inputs, cache = _STATE['inputs'], _STATE['cache']
+    rows = []
+    for p in points:
+        fee_pred = fee_pred_for_params(inputs, p, cache)
+        rows.append({**p, **score_prediction(fee_pred, inputs['realized'], inputs['mask'])})
+    return rows
+
+
+def sweep_smooth_fee_with_signals(df, grid, target='fee', horizon=1,
+                                  max_workers=None, chunk_size=None, sort_by='rmse'):
+    """
+    Evaluate smooth_fee_with_signals over a parameter grid.
+
+    Returns and their rolling volatility are computed once, rolling stats once
+    per window size per worker, and spike counters once per (window,
+    spike_multiplier). Grid points are grouped by window and spread over a
+    process pool. Every point is scored on the same rows (common_score_mask()),
+    so metrics compare across windows.
+
+    Parameters:
+    - df: DataFrame with ['stock', 'date', 'fee', 'fee_second', 'price']
+    - grid: dict of parameter -> list of values, or list of parameter dicts
+    - target: realized column to score against (default 'fee')
+    - horizon: days ahead the realized value is taken (default 1)
+    - max_workers: processes to use; 1 runs in the current process
+    - chunk_size: grid points per task (default spreads ~4 tasks per worker)
+    - sort_by: metric used to order the results
+
+    Returns:
+    - DataFrame with one row per grid point: parameters, mae, rmse, bias, n_obs
+    """
+    points = expand_grid(grid)
+    # Keep points sharing a window (and spike level) in the same chunk so caches hit
+    points.sort(key=lambda p: (p['rolling_window'], p['spike_multiplier']))
+    inputs = prepare_sweep_inputs(df, target=target, horizon=horizon)
+    cache = {}
+    inputs['mask'] = common_score_mask(inputs, points, cache)
+
+    if max_workers == 1 or len(points) <= 1:
+        _init_worker(inputs, cache)
+        try:
+            rows = _evaluate_chunk(points)
+        finally:
+            _STATE.clear()
+    else:
+        n_workers = max_workers or os.cpu_count() or 1
+        size = chunk_size or max(1, -(-len(points) // (4 * n_workers)))
+        chunks = [points[i:i + size] for i in range(0, len(points), size)]
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                 initargs=(inputs,)) as pool:
+            rows = [row for chunk_rows in pool.map(_evaluate_chunk, chunks) for row in chunk_rows]
+
+    results = pd.DataFrame(rows, columns=SWEEP_PARAMS + ['mae', 'rmse', 'bias', 'n_obs'])
+    return results.sort_values(sort_by, kind='stable').reset_index(drop=True)
+
+
+# -------------------------
+# Example usage:
+# -------------------------
+# grid = {
+#     'rolling_window': [10, 20, 40, 60],
+#     'min_persistence': [1, 2, 3, 5],
+#     'spike_multiplier': [1.5, 2, 3],
+#     'blend_weight': [0.5, 0.7, 0.9],
+#     'adjustment_strength': [0.1, 0.2],
+# }
+# if __name__ == '__main__':
+#     results = sweep_smooth_fee_with_signals(df, grid, max_workers=8)
+#     print(results.head())
@@ -63,6 +63,8 @@ print(f"From EUR Perspective: €{npv_eur:,.2f}")
 import pandas as pd
 import numpy as np
 
+from rolling_median import rolling_median_by_stock
+
 def compute_adjusted_fee(df,
                          vol_window=5,
                          vol_baseline_window=20,
@@ -80,8 +82,8 @@ def compute_adjusted_fee(df,
     df['vol'] = (df.groupby('stock')['r']
                    .transform(lambda x: x.rolling(vol_window, min_periods=2).std()))
     # baseline volatility for signal comparison
-    df['vol_base'] = (df.groupby('stock')['vol']
-                        .transform(lambda x: x.rolling(vol_baseline_window, min_periods=5).median()))
+    df['vol_base'] = rolling_median_by_stock(df['vol'], df['stock'], vol_baseline_window,
+                                             min_periods=5)
     
     # 2. weighted base fee
     df['fee_base'] = np.where(
@@ -149,24 +151,40 @@ def build_fee_model(df,
                     z_thresh=2,
                     base_weight_high=0.7,
                     alpha_smooth=0.02,
-                    alpha_regime=0.08):
+                    alpha_regime=0.08,
+                    features=None):
     """
     Assumes df has columns: ['stock', 'date', 'price', 'fee', 'fee_second']
     Returns df with additional columns, including the smoothed fee prediction: fee_pred
+
+    features: optional FeatureStore.load(window) frame (needs fee_window == price_window);
+    return/price_vol/fee stats/signal/memory are then read instead of rebuilt
     """
     df = df.sort_values(['stock', 'date']).copy()
-    
-    # --- Compute return and rolling volatility of price ---
-    df['return'] = df.groupby('stock')['price'].pct_change()
-    df['price_vol'] = df.groupby('stock')['return'].transform(lambda x: x.rolling(price_window).std())
-    df['price_mean'] = df.groupby('stock')['price'].transform(lambda x: x.rolling(price_window).mean())
-
-    # --- Rolling statistics for fee ---
-    df['fee_mean'] = df.groupby('stock')['fee'].transform(lambda x: x.rolling(fee_window).mean())
-    df['fee_vol'] = df.groupby('stock')['fee'].transform(lambda x: x.rolling(fee_window).std())
-    
-    # --- Fee z-score for regime awareness ---
-    df['fee_z'] = (df['fee'] - df['fee_mean']) / df['fee_vol']
+
+    if features is not None:
+        # Lazy: fee_features needs pyarrow, which the in-memory path does not
+        from fee_features import attach_features
+
+        if fee_window != price_window:
+            raise ValueError("Stored features share one window: use fee_window == price_window.")
+        attach_features(df, features, {'return': 'return', 'price_vol': 'price_vol',
+                                       'fee_mean': 'fee_mean_full', 'fee_vol': 'fee_vol',
+                                       'fee_z': 'fee_z_full', 'signal': 'signal',
+                                       'memory': 'memory'}, price_window)
+        df['price_mean'] = df.groupby('stock')['price'].transform(lambda x: x.rolling(price_window).mean())
+    else:
+        # --- Compute return and rolling volatility of price ---
+        df['return'] = df.groupby('stock')['price'].pct_change()
+        df['price_vol'] = df.groupby('stock')['return'].transform(lambda x: x.rolling(price_window).std())
+        df['price_mean'] = df.groupby('stock')['price'].transform(lambda x: x.rolling(price_window).mean())
+
+        # --- Rolling statistics for fee ---
+        df['fee_mean'] = df.groupby('stock')['fee'].transform(lambda x: x.rolling(fee_window).mean())
+        df['fee_vol'] = df.groupby('stock')['fee'].transform(lambda x: x.rolling(fee_window).std())
+
+        # --- Fee z-score for regime awareness ---
+        df['fee_z'] = (df['fee'] - df['fee_mean']) / df['fee_vol']
 
     # --- Blended base fee ---
     df['fee_base'] = np.where(
@@ -175,30 +193,31 @@ def build_fee_model(df,
         0.5 * df['fee_second'] + 0.5 * df['fee']
     )
 
-    # --- Signal definition: vol up + price down = increase; vol down + price up = decrease ---
-    cond_up = (df['return'] < 0) & (df['price_vol'] > df['price_vol'].rolling(price_window).median())
-    cond_down = (df['return'] > 0) & (df['price_vol'] < df['price_vol'].rolling(price_window).median())
-    df['signal'] = 0
-    df.loc[cond_up, 'signal'] = 1
-    df.loc[cond_down, 'signal'] = -1
-
-    # --- Count persistence of directional signal ---
-    def count_signal(series):
-        mem = np.zeros_like(series, dtype=int)
-        count = 0
-        prev = 0
-        for i, s in enumerate(series):
-            if s != 0 and s == prev:
-                count += 1
-            elif s != 0:
-                count = 1
-            else:
-                count = 0
-            mem[i] = count
-            prev = s if s != 0 else 0
-        return mem
-
-    df['memory'] = df.groupby('stock')['signal'].transform(lambda x: count_signal(x.values))
+    if features is None:
+        # --- Signal definition: vol up + price down = increase; vol down + price up = decrease ---
+        cond_up = (df['return'] < 0) & (df['price_vol'] > df['price_vol'].rolling(price_window).median())
+        cond_down = (df['return'] > 0) & (df['price_vol'] < df['price_vol'].rolling(price_window).median())
+        df['signal'] = 0
+        df.loc[cond_up, 'signal'] = 1
+        df.loc[cond_down, 'signal'] = -1
+
+        # --- Count persistence of directional signal ---
+        def count_signal(series):
+            mem = np.zeros_like(series, dtype=int)
+            count = 0
+            prev = 0
+            for i, s in enumerate(series):
+                if s != 0 and s == prev:
+                    count += 1
+                elif s != 0:
+                    count = 1
+                else:
+                    count = 0
+                mem[i] = count
+                prev = s if s != 0 else 0
+            return mem
+
+        df['memory'] = df.groupby('stock')['signal'].transform(lambda x: count_signal(x.values))
 
     # --- Adjustment logic ---
     use_regime = (df['memory'] >= signal_window) | (df['fee_z'] > z_thresh)
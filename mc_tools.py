@@ -0,0 +1,214 @@
+import numpy as np
+from scipy.special import ndtri
+from scipy.stats import qmc
+
+
+# === Random streams ===
+
+def make_rng(seed=None):
+    """
+    numpy.random.Generator from a seed, SeedSequence or Generator (passed through).
+    """
+    if isinstance(seed, np.random.Generator):
+        return seed
+    return np.random.default_rng(seed)
+
+
+def spawn_rngs(seed, n):
+    """
+    n statistically independent Generators, e.g. one per worker or per chunk.
+
+    Streams come from SeedSequence.spawn, so results do not depend on how the
+    work is split as long as stream i always does the same block of paths.
+    """
+    if isinstance(seed, np.random.Generator):
+        return seed.spawn(n)
+    return [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(n)]
+
+
+def normals(rng, shape, antithetic=False):
+    """
+    Standard normals of the given shape (paths on the last axis). With
+    antithetic, the second half of the paths are the negated first half.
+    """
+    shape = tuple(np.atleast_1d(shape))
+    if not antithetic:
+        return rng.standard_normal(shape)
+    n_paths = shape[-1]
+    if n_paths % 2:
+        raise ValueError("antithetic sampling needs an even number of paths.")
+    z = rng.standard_normal(shape[:-1] + (n_paths // 2,))
+    return np.concatenate([z, -z], axis=-1)
+
+
+def sobol_normals(n_dims, n_paths, rng=None, scramble=True):
+    """
+    Quasi-random standard normals from a (scrambled) Sobol sequence.
+
+    Parameters:
+    - n_dims: dimensions per path (e.g. steps x factors); must be <= 21201
+    - n_paths: number of points (a power of 2 keeps the sequence balanced)
+    - rng: seed or Generator for the scrambling
+
+    Returns:
+    - np.ndarray of shape (n_dims, n_paths)
+    """
+    sampler = qmc.Sobol(d=n_dims, scramble=scramble, seed=make_rng(rng))
+    u = sampler.random(n_paths)
+    # Unscrambled Sobol starts at 0 exactly: keep ndtri finite
+    u = np.clip(u, 0.5 / 2**32, 1 - 0.5 / 2**32)
+    return ndtri(u).T
+
+
+def _bridge_plan(n_steps):
+    # (point, left, right) filled in order: terminal first, then midpoints breadth first
+    plan = [(n_steps, 0, None)]
+    intervals = [(0, n_steps)]
+    while intervals:
+        next_level = []
+        for left, right in intervals:
+            if right - left > 1:
+                mid = (left + right) // 2
+                plan.append((mid, left, right))
+                next_level += [(left, mid), (mid, right)]
+        intervals = next_level
+    return plan
+
+
+def brownian_bridge(z, T):
+    """
+    Brownian increments built by Brownian-bridge construction.
+
+    The first normal sets W(T), the next ones the midpoints, and so on, so the
+    leading (best distributed) Sobol dimensions drive the coarse shape of the
+    paths.
+
+    Parameters:
+    - z: standard normals of shape (n_steps, n_paths), in order of importance
+    - T: horizon in years (uniform grid of n_steps steps)
+
+    Returns:
+    - dW of shape (n_steps, n_paths)
+    """
+    n_steps = z.shape[0]
+    t = np.linspace(0.0, T, n_steps + 1)
+    W = np.zeros((n_steps + 1,) + z.shape[1:])
+    for k, (point, left, right) in enumerate(_bridge_plan(n_steps)):
+        if right is None:
+            W[point] = np.sqrt(t[point]) * z[k]
+            continue
+        span = t[right] - t[left]
+        weight = (t[point] - t[left]) / span
+        sd = np.sqrt((t[point] - t[left]) * (t[right] - t[point]) / span)
+        W[point] = (1 - weight) * W[left] + weight * W[right] + sd * z[k]
+    return np.diff(W, axis=0)
+
+
+# === Estimators ===
+
+class RunningStats:
+    """
+    Mean, variance and standard error accumulated over batches of samples
+    (samples on the last axis; leading axes are independent estimates, e.g.
+    one per strike). Batches are merged with Chan's parallel update.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean = None
+        self._m2 = None
+
+    def update(self, samples):
+        samples = np.asarray(samples, dtype=float)
+        n_b = samples.shape[-1]
+        if not n_b:
+            return self
+        mean_b = samples.mean(axis=-1)
+        m2_b = ((samples - mean_b[..., None])**2).sum(axis=-1)
+        if self.n == 0:
+            self.n, self.mean, self._m2 = n_b, mean_b, m2_b
+            return self
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        self.mean = self.mean + delta * n_b / n
+        self._m2 = self._m2 + m2_b + delta**2 * self.n * n_b / n
+        self.n = n
+        return self
+
+    @property
+    def var(self):
+        return self._m2 / max(self.n - 1, 1)
+
+    @property
+    def stderr(self):
+        return np.sqrt(self.var / max(self.n, 1))
+
+
+def control_variate(y, x, x_mean):
+    """
+    Control-variate adjusted samples y - b (x - E[x]), with the variance-optimal
+    b = cov(y, x) / var(x) estimated from the same samples (per leading index).
+
+    Parameters:
+    - y: samples of the quantity of interest (samples on the last axis)
+    - x: samples of the control, same sample axis
+    - x_mean: known expectation of x
+
+    Returns:
+    - adjusted samples (feed them to RunningStats), and b
+    """
+    y = np.asarray(y, dtype=float)
+    x = np.asarray(x, dtype=float)
+    xc = x - x.mean(axis=-1, keepdims=True)
+    yc = y - y.mean(axis=-1, keepdims=True)
+    var_x = (xc**2).sum(axis=-1)
+    b = np.where(var_x > 0, (yc * xc).sum(axis=-1) / np.where(var_x > 0, var_x, 1), 0.0)
+    return y - b[..., None] * (x - x_mean), b
+
+
+def run_until(sample_batch, batch_size=10_000, target_stderr=None, rel_stderr=None,
+              max_samples=1_000_000, min_batches=2):
+    """
+    Draw batches until the standard error meets its target (every estimate
+    on the leading axes must meet it) or max_samples is reached.
+
+    Parameters:
+    - sample_batch: callable(n) -> samples with n on the last axis (may return
+                    fewer, e.g. antithetic pair averages)
+    - batch_size: samples requested per batch
+    - target_stderr: absolute standard-error target
+    - rel_stderr: standard-error target relative to |mean|
+    - max_samples: cap on requested samples
+    - min_batches: batches drawn before the stopping rule is checked
+
+    Returns:
+    - RunningStats (mean, stderr, n) and whether the target was met
+    """
+    stats = RunningStats()
+    requested = 0
+    batches = 0
+    while requested < max_samples:
+        n = min(batch_size, max_samples - requested)
+        stats.update(sample_batch(n))
+        requested += n
+        batches += 1
+        if batches < min_batches or (target_stderr is None and rel_stderr is None):
+            continue
+        target = np.inf
+        if target_stderr is not None:
+            target = np.minimum(target, target_stderr)
+        if rel_stderr is not None:
+            target = np.minimum(target, rel_stderr * np.abs(stats.mean))
+        if np.all(stats.stderr <= target):
+            return stats, True
+    met = target_stderr is None and rel_stderr is None
+    return stats, met
+
+
+# -------------------------
+# Example usage:
+# -------------------------
+# rngs = spawn_rngs(2024, n_workers)                  # one independent stream per worker
+# z = normals(rngs[0], (n_steps, 50_000), antithetic=True)
+# dW = brownian_bridge(sobol_normals(n_steps, 2**16, rng=7), T)
+# stats, met = run_until(lambda n: payoff(normals(rng, (n_steps, n))), target_stderr=1e-3)
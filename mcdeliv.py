@@ -1,6 +1,8 @@
 import numpy as np
 import matplotlib.pyplot as plt
 
+from mc_tools import make_rng, normals, RunningStats
+
 # Constants
 FUTURES_PRICE = 101.50  # Futures settlement price
 CTD_BOND_PRICE = 100.25  # Cheapest-to-Deliver bond price (clean price)
@@ -14,54 +16,52 @@ DELIVERY_DAYS = 10  # Delivery window (days)
 REPO_COST_PER_DAY = CTD_BOND_PRICE * REPO_RATE / 360  # Repo cost per day
 
 # Initialize random number generator
-np.random.seed(42)
+rng = make_rng(42)
 
 # Simulate Monte Carlo paths
-def simulate_monte_carlo():
-    # Store optimal delivery days for each simulation
-    optimal_delivery_days = []
-
-    for _ in range(NUM_SIMULATIONS):
-        repo_rate = REPO_RATE
-        bond_price = CTD_BOND_PRICE
-        accrued_coupon = 0  # Starts with no coupon accrual
-
-        # Track daily carry (net carry) for each path
-        net_carry = []
+def simulate_monte_carlo(rng=None, n_sim=NUM_SIMULATIONS, antithetic=False):
+    """
+    Optimal delivery day of each simulated path, all paths at once.
 
-        # Simulate the 10-day delivery window
-        for day in range(1, DELIVERY_DAYS + 1):
-            # Accrued coupon (simple linear accumulation)
-            accrued_coupon = COUPON_PER_DAY * day
+    Repo rate and bond price follow random walks over the delivery window;
+    the optimal day is the one with the highest net carry (accrued coupon
+    minus repo cost).
 
-            # Simulate repo rate and bond price for the day
-            repo_rate += np.random.normal(0, REPO_VOLATILITY)  # Repo rate evolution (mean reversion)
-            bond_price += np.random.normal(0, BOND_PRICE_VOLATILITY)  # Bond price evolution (random walk)
+    Parameters:
+        rng: Seed or numpy Generator (see mc_tools.make_rng / spawn_rngs)
+        n_sim: Number of simulated paths (even with antithetic)
+        antithetic: Pair each path with one driven by the negated shocks
 
-            # Calculate repo cost for the day
-            repo_cost = bond_price * repo_rate / 360
+    Returns:
+        np.ndarray of optimal delivery days (1..DELIVERY_DAYS), one per path
+    """
+    rng = make_rng(rng)
+    days = np.arange(1, DELIVERY_DAYS + 1)
 
-            # Calculate net carry for this day
-            net_carry.append(accrued_coupon - repo_cost)
+    # Accrued coupon (simple linear accumulation)
+    accrued_coupon = COUPON_PER_DAY * days
 
-        # Choose the day with the maximum net carry
-        optimal_day = np.argmax(net_carry) + 1  # +1 because day index starts from 1
-        optimal_delivery_days.append(optimal_day)
+    # Repo rate and bond price paths (random walks), shape (n_sim, DELIVERY_DAYS)
+    repo_rate = REPO_RATE + np.cumsum(REPO_VOLATILITY * normals(rng, (DELIVERY_DAYS, n_sim), antithetic), axis=0).T
+    bond_price = CTD_BOND_PRICE + np.cumsum(BOND_PRICE_VOLATILITY * normals(rng, (DELIVERY_DAYS, n_sim), antithetic), axis=0).T
 
-    # Return the optimal delivery days for all simulations
-    return optimal_delivery_days
+    # Net carry per day, and the day with the maximum net carry
+    net_carry = accrued_coupon - bond_price * repo_rate / 360
+    return np.argmax(net_carry, axis=1) + 1  # +1 because day index starts from 1
 
 # Run the simulation
-optimal_delivery_days = simulate_monte_carlo()
+optimal_delivery_days = simulate_monte_carlo(rng)
 
 # Analyze the results
-delivery_day_counts = np.bincount(optimal_delivery_days)[1:]  # Count deliveries per day, ignore index 0
+delivery_day_counts = np.bincount(optimal_delivery_days, minlength=DELIVERY_DAYS + 1)[1:]  # Count deliveries per day, ignore index 0
 optimal_day_distribution = delivery_day_counts / NUM_SIMULATIONS  # Normalize to get a probability distribution
+# Standard error of each day's probability (one-hot samples per path)
+day_stderr = RunningStats().update(optimal_delivery_days == np.arange(1, DELIVERY_DAYS + 1)[:, None]).stderr
 
 # Output results
 print("Optimal delivery day distribution:")
-for i, prob in enumerate(optimal_day_distribution, 1):
-    print(f"Day {i}: {prob * 100:.2f}%")
+for i, (prob, se) in enumerate(zip(optimal_day_distribution, day_stderr), 1):
+    print(f"Day {i}: {prob * 100:.2f}% (± {se * 100:.2f}%)")
 
 # Plot the results
 plt.bar(range(1, DELIVERY_DAYS + 1), optimal_day_distribution * 100, color='b', alpha=0.7)
@@ -8,7 +8,8 @@ def smooth_fee_with_regime_logic(df,
                                   blend_weight=0.7,
                                   alpha=0.05,
                                   beta=0.1,
-                                  gamma=0.1):
+                                  gamma=0.1,
+                                  features=None):
     """
     Enhanced spike-resistant fee smoother with regime detection and volatility/return adjustment.
 
@@ -19,6 +20,8 @@ def smooth_fee_with_regime_logic(df,
     - z_threshold: threshold for spike detection (z-score)
     - blend_weight: weight for blending fee_second when regime changes
     - alpha, beta, gamma: weights for return, volatility, and interaction term
+    - features: optional FeatureStore.load(rolling_window) frame; precomputed
+      return/volatility/fee_mean/fee_z/jump_days are used instead of being rebuilt
 
     Returns:
     - df with added 'fee_pred' column (smoothed fee)
@@ -26,15 +29,23 @@ def smooth_fee_with_regime_logic(df,
 
     df = df.sort_values(['stock', 'date']).copy()
 
-    # Compute log return and rolling volatility on price
-    df['return'] = df.groupby('stock')['price'].transform(lambda x: np.log(x).diff())
-    df['volatility'] = df.groupby('stock')['return'].transform(lambda x: x.rolling(rolling_window, min_periods=5).std())
-    df['interaction'] = df['return'] * df['volatility']
+    if features is not None:
+        # Lazy: fee_features needs pyarrow, which the in-memory path does not
+        from fee_features import attach_features
 
-    # Rolling stats on fee
-    df['fee_mean'] = df.groupby('stock')['fee'].transform(lambda x: x.rolling(rolling_window, min_periods=5).mean())
-    df['fee_std'] = df.groupby('stock')['fee'].transform(lambda x: x.rolling(rolling_window, min_periods=5).std())
-    df['fee_z'] = (df['fee'] - df['fee_mean']) / df['fee_std']
+        attach_features(df, features, {'return': 'log_return', 'volatility': 'log_volatility',
+                                       'fee_mean': 'fee_mean', 'fee_z': 'fee_z'}, rolling_window)
+        df['interaction'] = df['return'] * df['volatility']
+    else:
+        # Compute log return and rolling volatility on price
+        df['return'] = df.groupby('stock')['price'].transform(lambda x: np.log(x).diff())
+        df['volatility'] = df.groupby('stock')['return'].transform(lambda x: x.rolling(rolling_window, min_periods=5).std())
+        df['interaction'] = df['return'] * df['volatility']
+
+        # Rolling stats on fee
+        df['fee_mean'] = df.groupby('stock')['fee'].transform(lambda x: x.rolling(rolling_window, min_periods=5).mean())
+        df['fee_std'] = df.groupby('stock')['fee'].transform(lambda x: x.rolling(rolling_window, min_periods=5).std())
+        df['fee_z'] = (df['fee'] - df['fee_mean']) / df['fee_std']
 
     # Spike detection using z-score
     df['fee_jump'] = (df['fee_z'] > z_threshold).astype(int)
@@ -51,7 +62,11 @@ def smooth_fee_with_regime_logic(df,
             out[i] = count
         return out
 
-    df['jump_days'] = df.groupby('stock')['fee_jump'].transform(lambda x: count_consecutive(x.values))
+    jump_col = f'jump_days_z{z_threshold:g}'
+    if features is not None and jump_col in features:
+        attach_features(df, features, {'jump_days': jump_col}, rolling_window)
+    else:
+        df['jump_days'] = df.groupby('stock')['fee_jump'].transform(lambda x: count_consecutive(x.values))
 
     # Base prediction: rolling mean
     df['base_pred'] = df['fee_mean']
@@ -1,6 +1,9 @@
 import pandas as pd
 import numpy as np
 
+from fee_core import apply_stress_multiplier
+from rolling_median import rolling_median_by_stock
+
 def smooth_fee_with_signals(df, 
                             rolling_window=20,
                             min_persistence=2,
@@ -29,9 +32,8 @@ def smooth_fee_with_signals(df,
     )
 
     # === Rolling median smoothing ===
-    df['fee_med'] = df.groupby('stock')['fee'].transform(
-        lambda x: x.rolling(rolling_window, min_periods=rolling_window//2).median()
-    )
+    df['fee_med'] = rolling_median_by_stock(df['fee'], df['stock'], rolling_window,
+                                            min_periods=rolling_window//2)
 
     # === Spike detection and jump counter ===
     df['fee_jump'] = (df['fee'] > spike_multiplier * df['fee_med']).astype(int)
@@ -68,30 +70,12 @@ def smooth_fee_with_signals(df,
 
     df = df.groupby('stock', group_keys=False).apply(billing).reset_index(drop=True)
 
-    # === Stress signal (z-score logic) ===
-    df['return_mean'] = df.groupby('stock')['return'].transform(lambda x: x.rolling(rolling_window).mean())
-    df['return_std'] = df.groupby('stock')['return'].transform(lambda x: x.rolling(rolling_window).std())
-    df['vol_mean'] = df.groupby('stock')['volatility'].transform(lambda x: x.rolling(rolling_window).mean())
-    df['vol_std'] = df.groupby('stock')['volatility'].transform(lambda x: x.rolling(rolling_window).std())
-
-    df['z_return'] = ((df['return'] - df['return_mean']) / df['return_std']).abs()
-    df['z_vol'] = ((df['volatility'] - df['vol_mean']) / df['vol_std']).clip(lower=0)
-    df['fee_stress_multiplier'] = 1 + (df['z_return'] * df['z_vol']) / 10  # can be tuned
-
-    # === Stress condition logic ===
-    df['vol_diff'] = df['volatility'].diff()
-
-    stress_condition = (
-        ((df['vol_diff'] > 0) & (df['return'] > 0.10)) |
-        ((df['vol_diff'] > 0) & (df['return'] < 0)) |
-        (df['return'] < -0.03)
-    )
+    # === Stress signal (z-scores and vol_diff per stock, applied in place) ===
+    fee_pred = df['base_pred'].to_numpy(dtype=float, copy=True)
+    apply_stress_multiplier(fee_pred, df['return'].to_numpy(), df['volatility'].to_numpy(),
+                            df['stock'].to_numpy(), rolling_window)
 
     # === Final prediction ===
-    df['fee_pred'] = df['base_pred'] * np.where(
-        stress_condition,
-        df['fee_stress_multiplier'],
-        1.0
-    )
+    df['fee_pred'] = fee_pred
 
     return df
@@ -0,0 +1,149 @@
+import heapq
+from collections import deque
+
+import numpy as np
+
+from fee_core import rolling_by_stock
+
+
+class RollingMedian:
+    """
+    Streaming rolling median over the last `window` observations, O(log window) per update.
+
+    Two heaps hold the lower and upper halves of the window; values leaving the
+    window are deleted lazily when they reach a heap top. NaN observations take
+    a slot in the window but are not counted, and the median is NaN while fewer
+    than min_periods valid values are present -- the same rules as
+    pandas.Series.rolling(window, min_periods).median().
+    """
+
+    def __init__(self, window, min_periods=None):
+        if min_periods is None:
+            min_periods = window
+        if window < 1:
+            raise ValueError("window must be >= 1")
+        if min_periods > window:
+            raise ValueError(f"min_periods {min_periods} must be <= window {window}")
+        self.window = window
+        self.min_periods = min_periods
+        self._values = deque()
+        self._lo = []          # max-heap of the lower half (stored negated)
+        self._hi = []          # min-heap of the upper half
+        self._lo_size = 0      # live (not lazily deleted) entries per heap
+        self._hi_size = 0
+        self._delayed = {}
+
+    @property
+    def nobs(self):
+        return self._lo_size + self._hi_size
+
+    def _prune(self, heap, sign):
+        while heap:
+            x = sign * heap[0]
+            if self._delayed.get(x, 0):
+                self._delayed[x] -= 1
+                heapq.heappop(heap)
+            else:
+                break
+
+    def _rebalance(self):
+        if self._lo_size > self._hi_size + 1:
+            heapq.heappush(self._hi, -heapq.heappop(self._lo))
+            self._lo_size -= 1
+            self._hi_size += 1
+            self._prune(self._lo, -1)
+        elif self._lo_size < self._hi_size:
+            heapq.heappush(self._lo, -heapq.heappop(self._hi))
+            self._hi_size -= 1
+            self._lo_size += 1
+            self._prune(self._hi, 1)
+
+    def _insert(self, x):
+        if not self._lo or x <= -self._lo[0]:
+            heapq.heappush(self._lo, -x)
+            self._lo_size += 1
+        else:
+            heapq.heappush(self._hi, x)
+            self._hi_size += 1
+        self._rebalance()
+
+    def _remove(self, x):
+        self._delayed[x] = self._delayed.get(x, 0) + 1
+        if x <= -self._lo[0]:
+            self._lo_size -= 1
+            if x == -self._lo[0]:
+                self._prune(self._lo, -1)
+        else:
+            self._hi_size -= 1
+            if x == self._hi[0]:
+                self._prune(self._hi, 1)
+        self._rebalance()
+
+    def median(self):
+        """Median of the current window under min_periods, NaN if not enough data."""
+        n = self.nobs
+        if n == 0 or n < self.min_periods:
+            return np.nan
+        if n % 2:
+            return float(-self._lo[0])
+        return (self._hi[0] + -self._lo[0]) / 2
+
+    def update(self, x):
+        """Push one observation (NaN allowed) and return the new median."""
+        x = float(x)
+        self._values.append(x)
+        if x == x:
+            self._insert(x)
+        if len(self._values) > self.window:
+            old = self._values.popleft()
+            if old == old:
+                self._remove(old)
+        return self.median()
+
+    def extend(self, values):
+        """Push a sequence of observations; returns the median after each one."""
+        return np.array([self.update(x) for x in values], dtype=float)
+
+
+def rolling_median_by_stock(values, stock, window, min_periods=None,
+                            engine='pandas', return_state=False):
+    """
+    Rolling median per stock for a whole panel in one pass.
+
+    Parameters:
+    - values: observations sorted by stock then date
+    - stock: stock identifiers aligned with values
+    - window: rolling window length
+    - min_periods: minimum valid observations (pandas semantics, None = window)
+    - engine: 'pandas' runs fee_core.rolling_by_stock (one pass through pandas'
+              compiled skiplist), 'heap' runs RollingMedian over the panel (same numbers)
+    - return_state: also return {stock: RollingMedian} positioned at each stock's
+                    last row, ready to continue in streaming mode (forces 'heap')
+
+    Returns:
+    - np.ndarray of medians aligned with values (and the state dict if requested)
+    """
+    values = np.asarray(values, dtype=float)
+    stock = np.asarray(stock)
+
+    if engine == 'pandas' and not return_state:
+        return rolling_by_stock(values, stock, window, min_periods, 'median')
+    if engine not in ('pandas', 'heap'):
+        raise ValueError("engine must be 'pandas' or 'heap'.")
+
+    out = np.empty(len(values))
+    state = {}
+    bounds = np.flatnonzero(np.r_[True, stock[1:] != stock[:-1], True]) if len(values) else []
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        rm = RollingMedian(window, min_periods)
+        out[lo:hi] = rm.extend(values[lo:hi])
+        state[stock[lo]] = rm
+    return (out, state) if return_state else out
+
+
+# -------------------------
+# Example usage:
+# -------------------------
+# fee_med, state = rolling_median_by_stock(df['fee'], df['stock'], 60, 30, return_state=True)
+# # next day, per stock:
+# today_med = state['AAPL'].update(new_fee)
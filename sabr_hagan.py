@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+
+PARAMS = ['alpha', 'rho', 'nu']
+
+
+def _x_ratio(z, rho):
+    # z / x(z) with x(z) = log((sqrt(1 - 2 rho z + z^2) + z - rho) / (1 - rho)); -> 1 as z -> 0
+    root = np.sqrt(1 - 2 * rho * z + z**2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = z / np.log((root + z - rho) / (1 - rho))
+    return np.where(np.abs(z) < 1e-7, 1 - 0.5 * rho * z, ratio)
+
+
+def hagan_vol(F, K, T, alpha, beta, rho, nu, obloj=False):
+    """
+    SABR lognormal implied volatility, Hagan et al. (2002), over arrays.
+
+    Parameters:
+    - F: forward(s)
+    - K: strike(s)
+    - T: expiry(ies) in years
+    - alpha, beta, rho, nu: SABR parameters (broadcast against F, K, T)
+    - obloj: use Oblój's (2008) leading term, which stays accurate further
+             into the wings, with Hagan's time correction
+
+    Returns:
+    - implied Black volatilities (scalar for scalar inputs)
+    """
+    F, K, T, alpha, beta, rho, nu = (np.asarray(a, dtype=float)
+                                     for a in (F, K, T, alpha, beta, rho, nu))
+    one_b = 1 - beta
+    log_fk = np.log(F / K)
+    fk_b = (F * K)**(one_b / 2)
+
+    time_term = 1 + (one_b**2 / 24 * alpha**2 / fk_b**2
+                     + rho * beta * nu * alpha / (4 * fk_b)
+                     + (2 - 3 * rho**2) / 24 * nu**2) * T
+
+    if obloj:
+        # nu log(F/K) / x(z), z = nu (F^(1-b) - K^(1-b)) / (alpha (1-b)); log-moneyness for b = 1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            spread = np.where(one_b > 0, (F**one_b - K**one_b) / np.where(one_b > 0, one_b, 1),
+                              log_fk)
+            # alpha log(F/K) / spread, with its K -> F limit alpha / (F K)^((1-b)/2)
+            lead = np.where(np.abs(log_fk) > 1e-12, alpha * log_fk / spread, alpha / fk_b)
+        z = nu / alpha * spread
+        vol = lead * _x_ratio(z, rho) * time_term
+    else:
+        z = nu / alpha * fk_b * log_fk
+        denom = fk_b * (1 + one_b**2 / 24 * log_fk**2 + one_b**4 / 1920 * log_fk**4)
+        vol = alpha / denom * _x_ratio(z, rho) * time_term
+    return vol[()] if vol.ndim == 0 else vol
+
+
+# === Calibration: one batched Levenberg-Marquardt over all expiries ===
+# Unconstrained coordinates: alpha = exp(u0), rho = tanh(u1), nu = exp(u2)
+
+def _from_unconstrained(u):
+    return np.exp(u[..., 0]), np.tanh(u[..., 1]), np.exp(u[..., 2])
+
+
+def _residuals(u, F, K, T, vols, sqrt_w, beta, obloj):
+    alpha, rho, nu = (p[..., None] for p in _from_unconstrained(u))
+    with np.errstate(all='ignore'):
+        model = hagan_vol(F, K, T, alpha, beta, rho, nu, obloj)
+    return np.where(sqrt_w > 0, (model - vols) * sqrt_w, 0.0)
+
+
+def calibrate_sabr(F, K, T, vols, beta=1.0, weights=None, obloj=False, init=None,
+                   max_iter=100, tol=1e-10):
+    """
+    Fit alpha, rho, nu per expiry to market implied vols (beta fixed).
+
+    All expiries are solved together: quotes are laid out as an
+    (expiry, strike) grid and each Levenberg-Marquardt iteration evaluates
+    the residuals and a forward-difference Jacobian for every expiry in one
+    batched hagan_vol call, then solves the 3x3 damped normal equations of
+    all expiries at once. Each expiry keeps its own damping and stops on its own.
+
+    Parameters:
+    - F, K, T, vols: one entry per quote (forward, strike, expiry, market vol)
+    - beta: SABR beta, fixed during the fit
+    - weights: optional per-quote weights (e.g. vega)
+    - obloj: fit the Oblój-corrected vols
+    - init: optional DataFrame indexed by expiry with alpha, rho, nu (warm start)
+    - max_iter: iteration cap
+    - tol: relative decrease in the squared error below which an expiry stops
+
+    Returns:
+    - DataFrame indexed by expiry: alpha, rho, nu, rmse, n_quotes, converged
+    """
+    K, T, vols = (np.asarray(a, dtype=float) for a in (K, T, vols))
+    F = np.broadcast_to(np.asarray(F, dtype=float), K.shape)
+    w = np.ones(K.shape) if weights is None else np.broadcast_to(np.asarray(weights, float), K.shape)
+    ok = np.isfinite(vols) & (vols > 0) & (w > 0)
+
+    expiries, group = np.unique(T[ok], return_inverse=True)
+    n_exp = len(expiries)
+    counts = np.bincount(group, minlength=n_exp)
+    slot = np.zeros(len(group), dtype=int)
+    order = np.argsort(group, kind='stable')
+    slot[order] = np.arange(len(group)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    shape = (n_exp, max(counts.max(), 1) if n_exp else 1)
+    grid = {}
+    for name, values, fill in (('F', F, 1.0), ('K', K, 1.0), ('vols', vols, 0.0),
+                               ('sqrt_w', np.sqrt(w), 0.0)):
+        g = np.full(shape, fill)
+        g[group, slot] = values[ok]
+        grid[name] = g
+    grid['T'] = np.broadcast_to(expiries[:, None], shape)
+    args = (grid['F'], grid['K'], grid['T'], grid['vols'], grid['sqrt_w'], beta, obloj)
+
+    # Start: alpha from the quote nearest the money, rho = 0, nu = 0.5
+    atm = np.argmin(np.where(grid['sqrt_w'] > 0, np.abs(np.log(grid['K'] / grid['F'])), np.inf),
+                    axis=1)
+    rows = np.arange(n_exp)
+    u = np.column_stack([np.log(grid['vols'][rows, atm] * grid['F'][rows, atm]**(1 - beta)),
+                         np.zeros(n_exp), np.full(n_exp, np.log(0.5))])
+    if init is not None:
+        start = init.reindex(expiries)[PARAMS].to_numpy(dtype=float)
+        given = np.isfinite(start).all(axis=1)
+        u[given] = np.column_stack([np.log(start[given, 0]),
+                                    np.arctanh(np.clip(start[given, 1], -0.999, 0.999)),
+                                    np.log(start[given, 2])])
+
+    lam = np.full(n_exp, 1e-3)
+    r = _residuals(u, *args)
+    sse = (r**2).sum(axis=1)
+    active = np.ones(n_exp, dtype=bool)
+    converged = np.zeros(n_exp, dtype=bool)
+    h = 1e-7
+    for _ in range(max_iter):
+        # Batched forward-difference Jacobian: 3 shifted parameter sets in one call
+        shifted = u[None, :, :] + h * np.eye(3)[:, None, :]
+        J = (_residuals(shifted, *args) - r[None]) / h          # (3, expiry, strike)
+        J = np.moveaxis(J, 0, -1)                                # (expiry, strike, 3)
+        JtJ = np.einsum('esi,esj->eij', J, J)
+        g = np.einsum('esi,es->ei', J, r)
+        A = JtJ + lam[:, None, None] * (np.eye(3) * JtJ.diagonal(axis1=1, axis2=2)[:, None, :]
+                                        + 1e-12 * np.eye(3))
+        step = np.linalg.solve(A, -g[..., None])[..., 0]
+        step[~active] = 0
+
+        u_new = u + step
+        r_new = _residuals(u_new, *args)
+        sse_new = (r_new**2).sum(axis=1)
+        better = active & np.isfinite(sse_new) & (sse_new < sse)
+
+        small = better & (sse - sse_new <= tol * np.maximum(sse, 1e-300))
+        small |= active & (np.abs(step).max(axis=1) < 1e-12)
+        u[better], r[better], sse[better] = u_new[better], r_new[better], sse_new[better]
+        lam = np.where(better, lam / 3, np.minimum(lam * 3, 1e12))
+        converged |= small
+        active &= ~small
+        if not active.any():
+            break
+
+    alpha, rho, nu = _from_unconstrained(u)
+    n_quotes = counts
+    return pd.DataFrame({'alpha': alpha, 'rho': rho, 'nu': nu,
+                         'rmse': np.sqrt(sse / np.maximum((grid['sqrt_w'] > 0).sum(axis=1), 1)),
+                         'n_quotes': n_quotes, 'converged': converged},
+                        index=pd.Index(expiries, name='T'))
+
+
+# -------------------------
+# Example usage:
+# -------------------------
+# fits = calibrate_sabr(chain['F'], chain['K'], chain['T'], chain['iv'], beta=0.5)
+# model_iv = hagan_vol(chain['F'], chain['K'], chain['T'],
+#                      fits.loc[chain['T'], 'alpha'].to_numpy(), 0.5,
+#                      fits.loc[chain['T'], 'rho'].to_numpy(), fits.loc[chain['T'], 'nu'].to_numpy())
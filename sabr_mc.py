@@ -0,0 +1,164 @@
+import numpy as np
+
+from bs_core import type_codes
+from mc_tools import (make_rng, normals, sobol_normals, brownian_bridge, run_until,
+                      control_variate as mc_control_variate)
+
+# Default Sobol chunk: the float64 drivers (2, n_steps, chunk) stay within this many bytes
+SOBOL_CHUNK_BYTES = 2**27
+
+
+def _pow2_ceil(n):
+    return 1 << max(int(n) - 1, 0).bit_length()
+
+
+def _sobol_chunk(n_steps):
+    # Largest power of 2 (2**10 .. 2**17) whose drivers fit in SOBOL_CHUNK_BYTES
+    fit = SOBOL_CHUNK_BYTES // (16 * n_steps)
+    return 1 << min(max(fit.bit_length() - 1, 10), 17)
+
+
+def _drivers(rng, n_steps, n_paths, T, antithetic, sampler):
+    # Independent standard-normal increments (2, n_steps, n_paths), scaled to dt later
+    if sampler == 'pseudo':
+        return None
+    if sampler != 'sobol':
+        raise ValueError("sampler must be 'pseudo' or 'sobol'.")
+    n_draw = n_paths // 2 if antithetic else n_paths
+    z = sobol_normals(2 * n_steps, n_draw, rng).reshape(2, n_steps, n_draw)
+    dt = T / n_steps
+    # Brownian-bridge paths, back in unit-variance increments
+    z = np.stack([brownian_bridge(z[0], T), brownian_bridge(z[1], T)]) / np.sqrt(dt)
+    return np.concatenate([z, -z], axis=-1) if antithetic else z
+
+
+def sabr_terminal(F0, alpha, beta, nu, rho, T, n_paths, n_steps, rng, antithetic=False,
+                  sampler='pseudo'):
+    """
+    Terminal forwards of n_paths SABR paths, all paths advanced together.
+
+    The volatility is stepped exactly (lognormal), the forward with Euler
+    (log-Euler when beta == 1) and absorbed at zero. Brownian drivers are
+    correlated: dW2 = rho dW1 + sqrt(1 - rho^2) dZ.
+
+    Parameters:
+    - F0: initial forward
+    - alpha, beta, nu, rho: SABR parameters
+    - T: maturity in years
+    - n_paths: number of paths (even when antithetic)
+    - n_steps: time steps
+    - rng: numpy.random.Generator
+    - antithetic: second half of the paths uses the negated draws of the first
+    - sampler: 'pseudo' (per-step draws from rng) or 'sobol' (scrambled Sobol
+               points with Brownian-bridge construction, 2 * n_steps <= 21201)
+
+    Returns:
+    - np.ndarray of terminal forwards
+    """
+    dt = T / n_steps
+    sqrt_dt = np.sqrt(dt)
+    rho_bar = np.sqrt(1 - rho**2)
+    quasi = _drivers(rng, n_steps, n_paths, T, antithetic, sampler)
+
+    F = np.full(n_paths, float(F0))
+    sigma = np.full(n_paths, float(alpha))
+    for step in range(n_steps):
+        z = normals(rng, (2, n_paths), antithetic) if quasi is None else quasi[:, step]
+        dW1 = sqrt_dt * z[0]
+        dW2 = sqrt_dt * (rho * z[0] + rho_bar * z[1])
+
+        if beta == 1:
+            F *= np.exp(sigma * dW1 - 0.5 * sigma**2 * dt)
+        else:
+            F += sigma * F**beta * dW1
+            np.maximum(F, 0.0, out=F)
+        sigma *= np.exp(nu * dW2 - 0.5 * nu**2 * dt)
+    return F
+
+
+def sabr_mc_price(F0, K, T, alpha, beta, nu, rho, option_type='C', r=0.0, n_paths=100_000,
+                  n_steps=252, antithetic=False, control_variate=False, sampler='pseudo',
+                  chunk_size=None, seed=None, target_stderr=None, rel_stderr=None):
+    """
+    Monte Carlo price of European options on a SABR forward, with standard error.
+
+    Paths are simulated in chunks of chunk_size (memory stays O(chunk_size)),
+    and every strike is priced off the same paths. With antithetic, the
+    standard error is taken over path pairs. With control_variate, the payoff
+    is regressed on the terminal forward, whose mean F0 is known only for
+    beta == 1: the log-Euler step keeps the simulated forward a martingale,
+    while the Euler step absorbed at zero used for beta < 1 does not, so the
+    control would bias the price there. Given a target_stderr / rel_stderr,
+    chunks stop being drawn once every strike meets it, so fewer than n_paths
+    may be used.
+
+    With sampler='sobol' every chunk is a power of 2 (Sobol points lose their
+    balance otherwise): chunk_size must be one, it is capped at n_paths rounded
+    up to a power of 2, and n_paths is rounded up to a whole number of chunks.
+    The Sobol drivers of a chunk take 16 * n_steps * chunk_size bytes (float64,
+    two factors), about as much again in temporaries while they are built; the
+    default chunk keeps them within SOBOL_CHUNK_BYTES (128 MB), e.g. 2**15
+    paths at 252 steps.
+
+    Parameters:
+    - F0: initial forward
+    - K: strike(s)
+    - T: maturity in years
+    - alpha, beta, nu, rho: SABR parameters
+    - option_type: 'C' / 'P' / +1 / -1, or per strike
+    - r: discount rate applied to the payoff mean
+    - n_paths: maximum number of paths
+    - n_steps: time steps per path
+    - antithetic: use antithetic variates
+    - control_variate: use the terminal forward as control variate (beta == 1 only)
+    - sampler: 'pseudo' or 'sobol', see sabr_terminal() (the Sobol standard
+               error is the conservative pseudo-random one)
+    - chunk_size: paths simulated at once (default: 100,000, or for 'sobol' the
+                  largest power of 2 up to 2**17 whose drivers fit SOBOL_CHUNK_BYTES)
+    - seed: seed or numpy.random.Generator
+    - target_stderr / rel_stderr: optional stopping rule on the undiscounted price
+
+    Returns:
+    - price: discounted mean payoff per strike
+    - stderr: its standard error
+    """
+    if control_variate and beta != 1:
+        raise ValueError("control_variate needs beta == 1 (E[F_T] = F0 only holds for the "
+                         "log-Euler forward).")
+    if sampler == 'sobol':
+        if chunk_size is None:
+            chunk_size = _sobol_chunk(n_steps)
+        elif chunk_size != _pow2_ceil(chunk_size):
+            raise ValueError("chunk_size must be a power of 2 with sampler='sobol'.")
+        chunk_size = min(chunk_size, _pow2_ceil(n_paths))
+        n_paths = -(-n_paths // chunk_size) * chunk_size
+    elif chunk_size is None:
+        chunk_size = 100_000
+    K = np.asarray(K, dtype=float)
+    w = np.broadcast_to(type_codes(option_type), K.shape)
+    rng = make_rng(seed)
+
+    def sample_batch(n):
+        n += n % 2 if antithetic else 0
+        F_T = sabr_terminal(F0, alpha, beta, nu, rho, T, n, n_steps, rng, antithetic, sampler)
+        payoff = np.maximum(w[..., None] * (F_T - K[..., None]), 0)
+        if antithetic:
+            # Pairs are independent samples; the two halves of a pair are not
+            payoff = 0.5 * (payoff[..., :n // 2] + payoff[..., n // 2:])
+            F_T = 0.5 * (F_T[:n // 2] + F_T[n // 2:])
+        if control_variate:
+            payoff, _ = mc_control_variate(payoff, np.broadcast_to(F_T, payoff.shape), F0)
+        return payoff
+
+    stats, _ = run_until(sample_batch, chunk_size, target_stderr, rel_stderr, n_paths)
+    discount = np.exp(-r * T)
+    price = discount * stats.mean
+    stderr = discount * stats.stderr
+    return (price[()], stderr[()]) if K.ndim == 0 else (price, stderr)
+
+
+# -------------------------
+# Example usage:
+# -------------------------
+# price, se = sabr_mc_price(100, [80, 90, 100, 110, 120], 1.0, alpha=0.25, beta=1, nu=0.4,
+#                           rho=-0.3, n_paths=1_000_000, antithetic=True, seed=42)
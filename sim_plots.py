@@ -0,0 +1,211 @@
+import numpy as np
+
+try:
+    import plotly.graph_objs as go
+    HAVE_PLOTLY = True
+except ImportError:  # matplotlib backend only
+    HAVE_PLOTLY = False
+
+try:
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    HAVE_MATPLOTLIB = True
+except ImportError:  # plotly backend only
+    HAVE_MATPLOTLIB = False
+
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2']
+
+
+# === Data reduction ===
+
+def path_quantiles(paths, quantiles=DEFAULT_QUANTILES):
+    """
+    Cross-sectional quantiles of simulated paths at every time step, in one pass.
+
+    Parameters:
+    - paths: array (n_paths, n_points)
+    - quantiles: probabilities in [0, 1]
+
+    Returns:
+    - array (len(quantiles), n_points)
+    """
+    return np.quantile(np.asarray(paths), quantiles, axis=0)
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling of one series.
+
+    The first and last points are kept; every bucket in between keeps the
+    point forming the largest triangle with the previously kept point and
+    the average of the next bucket, which preserves the visual shape
+    (peaks, troughs) far better than striding.
+
+    Parameters:
+    - x, y: series of equal length (x increasing)
+    - n_out: number of points to keep (>= 3)
+
+    Returns:
+    - indices of the kept points
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    edges = np.append(edges, n)
+    idx = np.empty(n_out, dtype=int)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt = slice(edges[i + 1], edges[i + 2])
+        avg_x, avg_y = x[nxt].mean(), y[nxt].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        idx[i + 1] = a
+    return idx
+
+
+def representative_paths(paths, n=5, by='terminal'):
+    """
+    Indices of n paths spread across the distribution: the paths sitting at
+    evenly spaced ranks (10% to 90%) of the terminal value or path average.
+    """
+    paths = np.asarray(paths)
+    if by == 'terminal':
+        score = paths[:, -1]
+    elif by == 'mean':
+        score = paths.mean(axis=1)
+    else:
+        raise ValueError("by must be 'terminal' or 'mean'.")
+    order = np.argsort(score, kind='stable')
+    ranks = np.linspace(0.1, 0.9, n) if n > 1 else np.array([0.5])
+    return order[np.round(ranks * (len(order) - 1)).astype(int)]
+
+
+# === Charts ===
+
+def _bands(quantiles):
+    # (lower, upper) index pairs from the outside in, plus the median index if present
+    n = len(quantiles)
+    pairs = [(i, n - 1 - i) for i in range(n // 2)]
+    median = n // 2 if n % 2 else None
+    return pairs, median
+
+
+def _rgba(color, alpha):
+    color = color.lstrip('#')
+    r, g, b = (int(color[i:i + 2], 16) for i in (0, 2, 4))
+    return f'rgba({r},{g},{b},{alpha})'
+
+
+def fan_chart(time_axis, paths, quantiles=DEFAULT_QUANTILES, n_paths=5, max_points=500,
+              reference=None, name=None, color=None, fig=None, backend='plotly'):
+    """
+    Fan chart of simulated paths: shaded quantile bands, the median and a few
+    representative paths, each decimated to at most max_points points.
+
+    The figure holds a handful of traces whatever the number of paths, so
+    it stays small and fast to open. Call repeatedly with the same fig to
+    overlay several sets of paths (e.g. one per T-bill bucket).
+
+    Parameters:
+    - time_axis: time of each column of paths
+    - paths: array (n_paths, n_points)
+    - quantiles: symmetric probabilities, e.g. (0.05, 0.25, 0.5, 0.75, 0.95)
+    - n_paths: representative paths drawn on top (0 for none)
+    - max_points: points kept per line (LTTB)
+    - reference: optional dict label -> level drawn as dashed horizontal lines
+    - name: legend label for this set of paths
+    - color: hex color (default: next in COLORS)
+    - fig: existing figure to draw on (plotly Figure or matplotlib Figure)
+    - backend: 'plotly' (interactive) or 'matplotlib' (static, no display needed)
+
+    Returns:
+    - the figure
+    """
+    t = np.asarray(time_axis, dtype=float)
+    q = path_quantiles(paths, quantiles)
+    pairs, median = _bands(quantiles)
+    center = q[median] if median is not None else q.mean(axis=0)
+    keep = lttb(t, center, max_points)
+    chosen = representative_paths(paths, n_paths) if n_paths else []
+    name = name or 'Simulated'
+
+    if backend == 'plotly':
+        if not HAVE_PLOTLY:
+            raise ImportError("backend='plotly' requires the plotly package.")
+        fig = fig if fig is not None else go.Figure()
+        color = color or COLORS[sum(str(tr.name).endswith(' median') for tr in fig.data)
+                                % len(COLORS)]
+        for lo, hi in pairs:
+            band = f'{name} {quantiles[lo]:.0%}-{quantiles[hi]:.0%}'
+            fig.add_trace(go.Scatter(x=t[keep], y=q[hi, keep], mode='lines', line=dict(width=0),
+                                     showlegend=False, hoverinfo='skip', legendgroup=band))
+            fig.add_trace(go.Scatter(x=t[keep], y=q[lo, keep], mode='lines', line=dict(width=0),
+                                     fill='tonexty', fillcolor=_rgba(color, 0.15), name=band,
+                                     legendgroup=band))
+        fig.add_trace(go.Scatter(x=t[keep], y=center[keep], mode='lines', name=f'{name} median',
+                                 line=dict(color=color, width=2)))
+        for i in chosen:
+            idx = lttb(t, paths[i], max_points)
+            fig.add_trace(go.Scatter(x=t[idx], y=np.asarray(paths[i])[idx], mode='lines',
+                                     line=dict(color=color, width=1), opacity=0.5,
+                                     showlegend=False))
+        for label, level in (reference or {}).items():
+            fig.add_trace(go.Scatter(x=[t[0], t[-1]], y=[level, level], mode='lines', name=label,
+                                     line=dict(dash='dash', width=2)))
+        return fig
+
+    if backend == 'matplotlib':
+        if not HAVE_MATPLOTLIB:
+            raise ImportError("backend='matplotlib' requires the matplotlib package.")
+        if fig is None:
+            fig = Figure(figsize=(10, 6))
+            FigureCanvasAgg(fig)
+        ax = fig.axes[0] if fig.axes else fig.add_subplot()
+        color = color or COLORS[sum(ln.get_label().endswith(' median') for ln in ax.lines)
+                                % len(COLORS)]
+        for lo, hi in pairs:
+            ax.fill_between(t[keep], q[lo, keep], q[hi, keep], color=color, alpha=0.15, linewidth=0,
+                            label=f'{name} {quantiles[lo]:.0%}-{quantiles[hi]:.0%}')
+        ax.plot(t[keep], center[keep], color=color, linewidth=2, label=f'{name} median')
+        for i in chosen:
+            idx = lttb(t, paths[i], max_points)
+            ax.plot(t[idx], np.asarray(paths[i])[idx], color=color, linewidth=0.8, alpha=0.5)
+        for label, level in (reference or {}).items():
+            ax.axhline(level, linestyle='--', linewidth=1.5, label=label)
+        ax.legend(loc='best', fontsize='small')
+        return fig
+
+    raise ValueError("backend must be 'plotly' or 'matplotlib'.")
+
+
+def save_figure(fig, path, width=1200, height=700, dpi=100):
+    """
+    Write a figure to a static image (png, svg, pdf) without a browser or display.
+
+    Plotly figures are exported with kaleido (fig.write_image); matplotlib
+    figures are rendered by the Agg canvas.
+    """
+    if hasattr(fig, 'write_image'):
+        fig.write_image(path, width=width, height=height)
+    else:
+        fig.set_size_inches(width / dpi, height / dpi)
+        fig.savefig(path, dpi=dpi, bbox_inches='tight')
+    return path
+
+
+# -------------------------
+# Example usage:
+# -------------------------
+# fig = None
+# for tbill, T in maturities.items():
+#     paths = simulated_rates[tbill]
+#     fig = fan_chart(np.linspace(0, T, paths.shape[1]), paths, name=tbill, fig=fig,
+#                     reference={f'{tbill} market': df_yields[tbill].iloc[-1]})
+# save_figure(fig, 'tbill_fan.png')                      # headless static export
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from cir_mle import PARAMS, calibrate_cir_batch
+from cir_sim import simulate_cir_exact
+
+# Horizon simulated for each T-bill bucket (years)
+MATURITIES = {
+    "Tbill1M": 1/12,
+    "Tbill3M": 3/12,
+    "Tbill6M": 6/12,
+    "Tbill12M": 12/12,
+}
+
+
+def cache_key(spec):
+    """
+    Stable hash of a simulation spec (parameters, grid, paths, seed, scheme).
+    """
+    text = json.dumps(spec, sort_keys=True, default=repr)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def _simulate_bucket(task):
+    name, spec, stream = task
+    paths = simulate_cir_exact(spec['r0'], spec['kappa'], spec['theta'], spec['sigma'], spec['T'],
+                               spec['n_steps'], spec['n_paths'], stream, spec['scheme'])
+    return name, paths
+
+
+def simulate_tbills(df_yields, maturities=None, n_paths=10_000, steps_per_year=252, seed=None,
+                    scheme='exact', method='euler', shared_draws=True, params=None,
+                    max_workers=None, cache_dir=None, obs_dt=1 / 252):
+    """
+    Calibrate a CIR model per T-bill bucket and simulate every bucket in one call.
+
+    Each bucket starts from its last observed yield and runs to its own
+    maturity on a steps_per_year grid. With shared_draws, every bucket
+    consumes the same random stream (common random numbers: with the
+    'euler' scheme the shocks are identical across buckets, so differences
+    between buckets come from the parameters, not from noise). Otherwise
+    each bucket gets an independent spawned stream. Results do not depend
+    on max_workers.
+
+    With a cache_dir and a seed, paths are saved as .npy files keyed by the
+    bucket's parameters, grid, path count, seed and scheme, and re-loaded
+    (memory-mapped, read-only) instead of re-simulated.
+
+    Parameters:
+    - df_yields: DataFrame of yields (decimal), one column per bucket, rows in time order
+    - maturities: dict bucket -> horizon in years (default MATURITIES, limited to df_yields' columns)
+    - n_paths: paths per bucket
+    - steps_per_year: time steps per year of the simulation grid
+    - seed: integer seed (required for caching)
+    - scheme: 'exact' or 'euler', see cir_sim.cir_step()
+    - method: likelihood for the calibration, 'euler' or 'exact'
+    - shared_draws: use the same random stream for every bucket
+    - params: optional DataFrame indexed by bucket with kappa, theta, sigma (skips calibration)
+    - max_workers: processes for calibration and simulation (1 runs in-process)
+    - cache_dir: directory for the path cache
+    - obs_dt: spacing of df_yields' rows in years for the calibration (1/252 for
+              daily data, 1/52 weekly), independent of the simulation grid
+
+    Returns:
+    - simulated_rates: dict bucket -> array (n_paths, n_steps + 1)
+    - params: DataFrame indexed by bucket with r0, kappa, theta, sigma, T, n_steps
+    """
+    if maturities is None:
+        maturities = {k: v for k, v in MATURITIES.items() if k in df_yields.columns}
+    buckets = list(maturities)
+    if params is None:
+        params = calibrate_cir_batch(df_yields[buckets], dt=obs_dt, method=method,
+                                     max_workers=max_workers)
+    params = params.loc[buckets, PARAMS].copy()
+    params.insert(0, 'r0', [df_yields[b].dropna().iloc[-1] for b in buckets])
+    params['T'] = [maturities[b] for b in buckets]
+    params['n_steps'] = [max(1, int(round(T * steps_per_year))) for T in params['T']]
+
+    if shared_draws:
+        streams = [seed] * len(buckets)
+    else:
+        streams = np.random.SeedSequence(seed).spawn(len(buckets))
+
+    simulated_rates, tasks, paths_on_disk = {}, [], {}
+    for i, bucket in enumerate(buckets):
+        spec = {k: (float(v) if k != 'n_steps' else int(v)) for k, v in params.loc[bucket].items()}
+        spec.update(n_paths=n_paths, scheme=scheme)
+        if cache_dir is not None and seed is not None:
+            key = cache_key({**spec, 'seed': seed, 'shared_draws': shared_draws, 'stream': i})
+            path = os.path.join(cache_dir, f'{bucket}_{key}.npy')
+            if os.path.exists(path):
+                simulated_rates[bucket] = np.load(path, mmap_mode='r')
+                continue
+            paths_on_disk[bucket] = path
+        tasks.append((bucket, spec, streams[i]))
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(tasks) <= 1:
+        fresh = dict(map(_simulate_bucket, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(tasks))) as pool:
+            fresh = dict(pool.map(_simulate_bucket, tasks))
+
+    for bucket, paths in fresh.items():
+        if bucket in paths_on_disk:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = paths_on_disk[bucket] + '.tmp.npy'
+            np.save(tmp, paths)
+            os.replace(tmp, paths_on_disk[bucket])
+        simulated_rates[bucket] = paths
+    return {b: simulated_rates[b] for b in buckets}, params
+
+
+# -------------------------
+# Example usage:
+# -------------------------
+# df_yields = pd.read_csv('tbills.csv', index_col=0, parse_dates=True) / 100
+# simulated_rates, params = simulate_tbills(df_yields, n_paths=50_000, seed=42,
+#                                           cache_dir='sim_cache')
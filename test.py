@@ -1,12 +1,15 @@
 import pandas as pd
 import numpy as np
 
+from rolling_median import rolling_median_by_stock
+
 def smooth_fee_with_signals(df, 
                             rolling_window=20,
                             min_persistence=2,
                             spike_multiplier=2,
                             blend_weight=0.7,
-                            adjustment_strength=0.2):
+                            adjustment_strength=0.2,
+                            features=None):
     """
     Parameters:
     - df: DataFrame with ['stock', 'date', 'fee', 'fee_second', 'price']
@@ -15,6 +18,8 @@ def smooth_fee_with_signals(df,
     - spike_multiplier: fee/median threshold for detecting spikes
     - blend_weight: blend ratio for persistent regime (fee vs fee_second)
     - adjustment_strength: how strongly signals shift fee_pred
+    - features: optional FeatureStore.load(rolling_window) frame; precomputed
+      return/volatility/fee_med/jump_days are used instead of being rebuilt
 
     Returns:
     - df with new column 'fee_pred' (smoothed + adjusted fee)
@@ -22,20 +27,25 @@ def smooth_fee_with_signals(df,
 
     df = df.sort_values(['stock', 'date']).copy()
 
-    # === Rolling returns and vol ===
-    df['return'] = df.groupby('stock')['price'].pct_change()
-    df['volatility'] = df.groupby('stock')['return'].transform(
-        lambda x: x.rolling(rolling_window, min_periods=rolling_window//2).std()
-    )
+    if features is not None:
+        # Lazy: fee_features needs pyarrow, which the in-memory path does not
+        from fee_features import attach_features
+
+        attach_features(df, features, ['return', 'volatility', 'fee_med'], rolling_window)
+    else:
+        # === Rolling returns and vol ===
+        df['return'] = df.groupby('stock')['price'].pct_change()
+        df['volatility'] = df.groupby('stock')['return'].transform(
+            lambda x: x.rolling(rolling_window, min_periods=rolling_window//2).std()
+        )
+
+        # Rolling median of fee for baseline smoothing
+        df['fee_med'] = rolling_median_by_stock(df['fee'], df['stock'], rolling_window,
+                                                min_periods=rolling_window//2)
 
     # Interaction signal: positive = bullish/stable, negative = bearish/volatile
     df['signal'] = df['return'] * df['volatility']
 
-    # Rolling median of fee for baseline smoothing
-    df['fee_med'] = df.groupby('stock')['fee'].transform(
-        lambda x: x.rolling(rolling_window, min_periods=rolling_window//2).median()
-    )
-
     # Spike detection: current fee significantly above recent history
     df['fee_jump'] = (df['fee'] > spike_multiplier * df['fee_med']).astype(int)
 
@@ -50,9 +60,13 @@ def smooth_fee_with_signals(df,
                 c = 0
         return out
 
-    df['jump_days'] = df.groupby('stock')['fee_jump'].transform(
-        lambda x: count_consecutive(x.values)
-    )
+    jump_col = f'jump_days_spike{spike_multiplier:g}'
+    if features is not None and jump_col in features:
+        attach_features(df, features, {'jump_days': jump_col}, rolling_window)
+    else:
+        df['jump_days'] = df.groupby('stock')['fee_jump'].transform(
+            lambda x: count_consecutive(x.values)
+        )
 
     # Blend if regime change is persistent
     df['base_pred'] = np.where(
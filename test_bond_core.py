@@ -0,0 +1,21 @@
+import warnings
+
+import numpy as np
+
+from bond_cashflows import ScheduleSet
+from bond_core import bond_price, bond_ytm
+
+# Long monthly bonds: discount factors at R_MIN overflow float64
+PRICE = np.array([50.0, 95.0, 101.0])
+COUPON = np.array([0.0, 0.05, 0.03])
+YEARS = np.array([40, 30, 50])
+
+
+def test_long_monthly_bonds_solve_without_warnings():
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        ytm, converged = bond_ytm(PRICE, 100, COUPON, YEARS, 12)
+        cached, cached_ok = ScheduleSet(100, COUPON, YEARS, 12).ytm(PRICE)
+    assert converged.all() and cached_ok.all()
+    np.testing.assert_array_equal(ytm, cached)
+    np.testing.assert_allclose(bond_price(ytm, 100, COUPON, YEARS, 12), PRICE, rtol=1e-12)
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from cir_mle import (SIGMA_GUESS_MAX, _nll_exact, _transitions, calibrate_cir, cir_initial_guess,
+                     cir_nll)
+from cir_sim import simulate_cir_exact
+
+DT = 1 / 252
+TRUE = np.array([2.0, 2e-3, 0.2])
+
+
+@pytest.fixture(scope='module')
+def low_rates():
+    # Exact CIR near zero (Feller condition violated): rates touch ~1e-17
+    kappa, theta, sigma = TRUE
+    path = simulate_cir_exact(1e-3, kappa, theta, sigma, 10.0, 2520, 1, rng=0)[0]
+    assert path.min() < 1e-12
+    return path
+
+
+def test_initial_guess_is_plausible_near_zero(low_rates):
+    kappa, theta, sigma = cir_initial_guess(low_rates, DT)
+    assert np.isfinite([kappa, theta, sigma]).all()
+    assert 0.5 * TRUE[2] < sigma <= SIGMA_GUESS_MAX
+    assert np.isfinite(cir_nll([kappa, theta, sigma], low_rates, DT, 'exact'))
+
+
+def test_exact_calibration_near_zero(low_rates):
+    fit = calibrate_cir(low_rates, DT, method='exact')
+    assert fit['success']
+    assert fit['nll'] <= cir_nll(TRUE, low_rates, DT, 'exact') + 1e-6
+    assert abs(fit['sigma'] - TRUE[2]) < 0.02
+
+
+def test_exact_gradient_matches_value(low_rates):
+    # At a huge sigma the Bessel order sits at -1 and its ratios break down:
+    # the gradient must still be finite and agree with the likelihood it returns
+    r0, r1 = _transitions(low_rates)
+    params = np.array([1.0, 2e-3, 487.0])
+    nll, grad = _nll_exact(params, r0, r1, DT)
+    assert np.isfinite(nll) and np.isfinite(grad).all()
+    fd = []
+    for j in range(3):
+        step = np.zeros(3)
+        step[j] = 1e-6 * params[j]
+        fd.append((_nll_exact(params + step, r0, r1, DT)[0]
+                   - _nll_exact(params - step, r0, r1, DT)[0]) / (2 * step[j]))
+    np.testing.assert_allclose(grad, fd, rtol=1e-3)
+
+
+def test_exact_calibration_keeps_a_good_start(low_rates):
+    # The Euler pre-stage runs off to a huge sigma here; it must not replace a better x0
+    fit = calibrate_cir(low_rates, DT, method='exact', x0=TRUE)
+    assert fit['success']
+    assert fit['nll'] <= cir_nll(TRUE, low_rates, DT, 'exact') + 1e-6
+    assert abs(fit['sigma'] - TRUE[2]) < 0.02
@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from fee_batch import score_fee_models
+from fee_lean import COMPACT_MODES, LEAN_MODELS, run_lean
+from test_fee_lean import make_panel
+
+VARIANTS = {**{name: name for name in LEAN_MODELS},
+            'signals_retro_10': ('signals_retro', {'rolling_window': 10}),
+            'fee_model_10': ('fee_model', {'fee_window': 10, 'price_window': 10})}
+
+
+@pytest.fixture(scope='module')
+def panel():
+    return make_panel()
+
+
+@pytest.mark.parametrize('compact', COMPACT_MODES)
+def test_batch_matches_each_model_alone(panel, compact):
+    # Shared features must not change any variant's output, float32 included
+    out = score_fee_models(panel, VARIANTS, compact=compact)
+    for column, spec in VARIANTS.items():
+        model, params = (spec, {}) if isinstance(spec, str) else spec
+        alone = run_lean(model, panel, output='array', compact=compact, **params)
+        assert out[column].dtype == alone.dtype
+        np.testing.assert_array_equal(out[column].to_numpy(), alone, err_msg=column)
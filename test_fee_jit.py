@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from fee_jit import HAVE_NUMBA, spike_regime, zscore_regime
+from fee_lean import COMPACT_MODES, LEAN_MODELS, run_lean
+from test_fee_lean import make_panel
+
+pytestmark = pytest.mark.skipif(not HAVE_NUMBA, reason="numba not installed")
+
+
+@pytest.fixture(scope='module')
+def panel():
+    return make_panel(seed=5)
+
+
+@pytest.mark.parametrize('compact', COMPACT_MODES)
+@pytest.mark.parametrize('model', list(LEAN_MODELS))
+def test_backends_agree(panel, model, compact):
+    compiled = run_lean(model, panel, output='array', compact=compact, backend='numba')
+    plain = run_lean(model, panel, output='array', compact=compact, backend='numpy')
+    assert compiled.dtype == plain.dtype
+    np.testing.assert_array_equal(compiled, plain)
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+def test_state_machines_keep_the_working_dtype(dtype):
+    rng = np.random.default_rng(0)
+    n = 500
+    fee = rng.uniform(0.5, 3, n).astype(dtype)
+    fee[rng.random(n) < 0.05] = np.nan
+    fee_second = (fee * rng.uniform(0.8, 1.2, n)).astype(dtype)
+    fee_ref = rng.uniform(0.5, 1.5, n).astype(dtype)
+    starts = np.zeros(n, dtype=bool)
+    starts[::97] = True
+
+    for retro in (False, True):
+        out = [spike_regime(fee, fee_second, fee_ref, starts, 1.5, 2, 0.7, retro=retro,
+                            backend=b) for b in ('numba', 'numpy')]
+        assert out[0].dtype == out[1].dtype == dtype
+        np.testing.assert_array_equal(*out)
+
+    fee_z = ((fee - fee_ref) / dtype(0.5)).astype(dtype)
+    out = [zscore_regime(fee, fee_second, fee_z, fee_ref, starts, 1, 2, 0.7, backend=b)
+           for b in ('numba', 'numpy')]
+    assert out[0].dtype == out[1].dtype == dtype
+    np.testing.assert_array_equal(*out)
@@ -0,0 +1,62 @@
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fee_backtest import resolve_model
+from fee_lean import COMPACT_MODES, LEAN_MODELS, run_lean
+
+# Documented float32 bound (see COMPACT_MODES in fee_lean)
+FLOAT32_RTOL = 5e-6
+
+
+def make_panel(n_stocks=12, seed=3):
+    # Shuffled multi-stock panel of uneven lengths, with fee spikes and persistent regimes
+    rng = np.random.default_rng(seed)
+    rows = []
+    for s in range(n_stocks):
+        n = int(rng.integers(5, 200))
+        fee = np.abs(rng.normal(1, 0.3, n))
+        spikes = rng.random(n) < 0.1
+        fee[spikes] *= rng.uniform(2, 6, spikes.sum())
+        start = int(rng.integers(0, n))
+        fee[start:start + int(rng.integers(1, 8))] *= 4
+        price = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+        rows.append(pd.DataFrame({'stock': f'S{s:02d}',
+                                  'date': pd.bdate_range('2020-01-01', periods=n),
+                                  'fee': fee, 'fee_second': fee * rng.uniform(0.8, 1.2, n),
+                                  'price': price}))
+    df = pd.concat(rows, ignore_index=True)
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+@pytest.fixture(scope='module')
+def panel():
+    return make_panel()
+
+
+@pytest.fixture(scope='module')
+def reference(panel):
+    # Pandas model outputs in (stock, date) order, computed once per model
+    out = {}
+    for model in LEAN_MODELS:
+        func, out_col = resolve_model(model)
+        with contextlib.redirect_stdout(io.StringIO()):  # fofoswa prints on import
+            result = func(panel.copy())
+        out[model] = result.sort_values(['stock', 'date'])[out_col].to_numpy(dtype=float)
+    return out
+
+
+@pytest.mark.parametrize('compact', COMPACT_MODES)
+@pytest.mark.parametrize('model', list(LEAN_MODELS))
+def test_run_lean_matches_pandas_model(panel, reference, model, compact):
+    expected = reference[model]
+    got = run_lean(model, panel, output='array', compact=compact)
+    assert len(got) == len(expected)
+    if compact == 'float32':
+        assert got.dtype == np.float32
+        np.testing.assert_allclose(got.astype(float), expected, rtol=FLOAT32_RTOL, equal_nan=True)
+    else:
+        np.testing.assert_array_equal(got, expected)
@@ -0,0 +1,9 @@
+from fee_sweep import sweep_smooth_fee_with_signals
+from test_fee_lean import make_panel
+
+
+def test_grid_points_share_scoring_rows():
+    grid = {'rolling_window': [5, 20, 60], 'min_persistence': [1, 2]}
+    results = sweep_smooth_fee_with_signals(make_panel(), grid, max_workers=1)
+    assert len(results) == 6
+    assert results['n_obs'].nunique() == 1 and results['n_obs'].iat[0] > 0
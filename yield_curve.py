@@ -0,0 +1,260 @@
+import numpy as np
+import pandas as pd
+from scipy.interpolate import PchipInterpolator
+from scipy.optimize import brentq
+
+from bond_cashflows import ScheduleSet
+
+INTERPOLATIONS = ('loglinear', 'monotone_cubic')
+# Widest search around the extrapolated node, in log discount factor
+MAX_BRACKET = 50.0
+
+
+def _instrument_frame(instruments):
+    # Normalize quotes: maturity, dirty price, coupon_rate, frequency, face (bills: coupon 0)
+    q = pd.DataFrame(index=instruments.index)
+    q['maturity'] = instruments['maturity'].astype(float)
+    if 'price' in instruments:
+        q['price'] = instruments['price'].astype(float)
+    else:
+        # Clean quotes: dirty = clean + accrued interest
+        q['price'] = (instruments['clean'] + instruments.get('accrued', 0.0)).astype(float)
+    q['coupon_rate'] = instruments.get('coupon_rate', 0.0)
+    q['frequency'] = instruments.get('frequency', 2)
+    q['face'] = instruments.get('face', 100.0)
+    q = q.astype(float).sort_values('maturity', kind='stable')
+    if q['maturity'].duplicated().any():
+        raise ValueError("Instruments must have distinct maturities.")
+    if (q['maturity'] <= 0).any():
+        raise ValueError("Maturities must be positive.")
+    return q
+
+
+class YieldCurve:
+    """
+    Discount curve bootstrapped from bills and coupon bonds.
+
+    Nodes sit at the instrument maturities (plus t = 0, DF = 1); the curve
+    interpolates log discount factors, either linearly (piecewise-flat
+    forwards; each node solved once, shortest maturity first) or with a
+    monotone cubic (PCHIP, smooth forwards; the log-linear nodes refined by
+    a Newton solve over all nodes until every instrument reprices). Cash flows follow
+    bond_core: coupons at periods 1..ceil(N)-1, coupon + face at maturity.
+    Beyond the last node the curve extends with its end slope (flat forward).
+    """
+
+    def __init__(self, instruments, interpolation='loglinear', tol=1e-12, max_passes=50):
+        """
+        Parameters:
+        - instruments: DataFrame indexed by instrument id with 'maturity' (years),
+                       'price' (dirty) or 'clean' + 'accrued', and optional
+                       'coupon_rate' (0 / missing for bills), 'frequency' (2), 'face' (100)
+        - interpolation: 'loglinear' or 'monotone_cubic'
+        - tol: relative repricing tolerance
+        - max_passes: cap on Newton iterations for 'monotone_cubic'
+
+        Raises ValueError if an instrument cannot be repriced (no discount
+        factor in the search range fits its price, or the cubic refinement
+        misses tol after max_passes).
+        """
+        if interpolation not in INTERPOLATIONS:
+            raise ValueError(f"interpolation must be one of {INTERPOLATIONS}.")
+        self.interpolation = interpolation
+        self.tol = tol
+        self.max_passes = max_passes
+        self.quotes = _instrument_frame(instruments)
+        q = self.quotes
+        self.schedules = ScheduleSet(q['face'], q['coupon_rate'], q['maturity'], q['frequency'])
+        # Flat cash flows in years, grouped by instrument (maturity order)
+        self._flow_t = self.schedules.t / self.schedules.frequency[self.schedules.bond]
+        self._flow_bounds = np.searchsorted(self.schedules.bond, np.arange(len(q) + 1))
+        self.times = np.concatenate([[0.0], q['maturity'].to_numpy()])
+        self.log_df = np.zeros(len(self.times))
+        self._build()
+        self.last_solved = 0
+        self._solve(0)
+
+    # === Interpolation ===
+
+    def _build(self):
+        if self.interpolation == 'monotone_cubic' and len(self.times) > 2:
+            self._spline = PchipInterpolator(self.times, self.log_df, extrapolate=False)
+            self._end_slope = float(self._spline.derivative()(self.times[-1]))
+        else:
+            self._spline = None
+            if len(self.times) > 1:
+                self._end_slope = ((self.log_df[-1] - self.log_df[-2])
+                                   / (self.times[-1] - self.times[-2]))
+            else:
+                self._end_slope = 0.0
+
+    def log_discount(self, t):
+        """
+        Interpolated log discount factors at times t (years), vectorized.
+        """
+        t = np.asarray(t, dtype=float)
+        if self._spline is not None:
+            out = self._spline(np.minimum(t, self.times[-1]))
+        else:
+            out = np.interp(t, self.times, self.log_df)
+        beyond = t > self.times[-1]
+        return np.where(beyond, self.log_df[-1] + (t - self.times[-1]) * self._end_slope, out)
+
+    def discount(self, t):
+        """
+        Discount factors at times t (years).
+        """
+        return np.exp(self.log_discount(t))
+
+    def zero_rate(self, t, compounding='continuous'):
+        """
+        Zero rates at times t (years): continuously compounded, or with
+        `compounding` periods per year (e.g. 2 for bond-equivalent yields).
+        """
+        t = np.asarray(t, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            short = -self.log_discount(1e-6) / 1e-6
+            cont = np.where(t > 0, -self.log_discount(t) / t, short)
+        if compounding == 'continuous':
+            return cont
+        return compounding * np.expm1(cont / compounding)
+
+    def grid(self, t):
+        """
+        DataFrame of discount factors and continuous zero rates on a time grid.
+        """
+        t = np.asarray(t, dtype=float)
+        return pd.DataFrame({'t': t, 'df': self.discount(t), 'zero': self.zero_rate(t)})
+
+    # === Pricing ===
+
+    def price(self, schedules):
+        """
+        Dirty prices of a bond_cashflows.ScheduleSet discounted on this curve,
+        one pass over its flat cash flows.
+        """
+        t = schedules.t / schedules.frequency[schedules.bond]
+        return np.bincount(schedules.bond, weights=schedules.cf * self.discount(t),
+                           minlength=len(schedules))
+
+    def reprice(self):
+        """
+        Model prices of the bootstrap instruments (Series, maturity order).
+        """
+        return pd.Series(self.price(self.schedules), index=self.quotes.index, name='model')
+
+    # === Bootstrap ===
+
+    def _instrument_error(self, k):
+        lo, hi = self._flow_bounds[k], self._flow_bounds[k + 1]
+        pv = np.dot(self.schedules.cf[lo:hi], self.discount(self._flow_t[lo:hi]))
+        return pv - self.quotes['price'].iat[k]
+
+    def _solve_node(self, k):
+        # Node k + 1 (instrument k) such that instrument k reprices
+        node = k + 1
+
+        def error(x):
+            self.log_df[node] = x
+            self._build()
+            return self._instrument_error(k)
+
+        x0 = self.log_df[node - 1] + self._end_slope * (self.times[node] - self.times[node - 1])
+        lo, hi = x0 - 0.5, x0 + 0.5
+        while error(lo) > 0 and lo > x0 - MAX_BRACKET:
+            lo -= 1.0
+        while error(hi) < 0 and hi < x0 + MAX_BRACKET:
+            hi += 1.0
+        if error(lo) > 0 or error(hi) < 0:
+            # e.g. a price below the value of the coupons already fixed by earlier nodes
+            raise ValueError(f"No discount factor reprices instrument {self.quotes.index[k]!r} "
+                             f"at price {self.quotes['price'].iat[k]}.")
+        x = brentq(error, lo, hi, xtol=1e-15, rtol=4 * np.finfo(float).eps)
+        error(x)
+
+    def _refine(self):
+        # Newton on all node values at once: with a cubic, every node moves the
+        # curve over its neighbouring intervals, so instruments are coupled
+        price = self.quotes['price'].to_numpy()
+        h = 1e-7
+        for _ in range(self.max_passes):
+            self._build()
+            resid = self.price(self.schedules) - price
+            if np.all(np.abs(resid) <= self.tol * price):
+                return
+            base = self.log_df.copy()
+            jac = np.empty((len(price), len(price)))
+            for j in range(len(price)):
+                self.log_df[j + 1] += h
+                self._build()
+                jac[:, j] = (self.price(self.schedules) - price - resid) / h
+                self.log_df[:] = base
+            self.log_df[1:] -= np.linalg.solve(jac, resid)
+        self._build()
+        resid = self.price(self.schedules) - price
+        if not np.all(np.abs(resid) <= self.tol * price):
+            worst = int(np.argmax(np.abs(resid) / price))
+            raise ValueError(f"monotone_cubic bootstrap did not converge in {self.max_passes} "
+                             f"passes: instrument {self.quotes.index[worst]!r} misprices by "
+                             f"{resid[worst]:.3g}.")
+
+    def _solve(self, start):
+        # Log-linear: shortest maturity first from instrument `start`. Earlier
+        # nodes are final, as each instrument only sees nodes up to its maturity.
+        n = len(self.quotes)
+        if self.interpolation == 'monotone_cubic':
+            if start == 0:
+                # Start the cubic from the log-linear nodes
+                self.interpolation = 'loglinear'
+                self._solve(0)
+                self.interpolation = 'monotone_cubic'
+            self._refine()
+            self.last_solved = n
+            return
+        # Truncate to the solved prefix so the end slope extrapolates the new node
+        times, log_df = self.times, self.log_df
+        for k in range(start, n):
+            self.times, self.log_df = times[:k + 2], log_df[:k + 2]
+            self._build()
+            self._solve_node(k)
+        self.times, self.log_df = times, log_df
+        self._build()
+        self.last_solved = n - start
+
+    def update(self, prices):
+        """
+        Re-bootstrap after quotes tick.
+
+        With 'loglinear' only nodes from the shortest changed maturity onwards
+        are re-solved. With 'monotone_cubic' all nodes are refined, warm-started
+        from the current curve.
+
+        Parameters:
+        - prices: Series of new dirty prices indexed by instrument id (any subset)
+
+        Returns:
+        - self
+        """
+        prices = prices.astype(float)
+        current = self.quotes.loc[prices.index, 'price']
+        changed = prices.index[prices.to_numpy() != current.to_numpy()]
+        if not len(changed):
+            self.last_solved = 0
+            return self
+        self.quotes.loc[changed, 'price'] = prices[changed]
+        start = int(self.quotes.index.get_indexer(changed).min())
+        self._solve(start)
+        return self
+
+
+# -------------------------
+# Example usage:
+# -------------------------
+# quotes = pd.DataFrame({'maturity': [0.25, 0.5, 1.0, 2.0, 5.0, 10.0],
+#                        'price': [98.9, 97.8, 95.6, 99.1, 97.4, 94.8],
+#                        'coupon_rate': [0, 0, 0, 0.04, 0.04, 0.04]},
+#                       index=['B3M', 'B6M', 'B1Y', 'T2Y', 'T5Y', 'T10Y'])
+# curve = YieldCurve(quotes, interpolation='monotone_cubic')
+# curve.grid(np.arange(0.25, 10.25, 0.25))
+# curve.update(pd.Series({'T5Y': 97.55}))                # re-solves T5Y and T10Y only
+# prices = curve.price(schedules_for(100, universe['coupon'], universe['years']))